@@ -1,6 +1,6 @@
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import IntegerField, ModelSerializer
 
-from apps.books.models import Book, Edition
+from apps.books.models import Book, BookCopy, Edition
 
 
 class BookDetailSerializer(ModelSerializer):
@@ -21,3 +21,26 @@ class EditionSerializer(EditionBaseSerializer):
 
     class Meta:
         fields = EditionBaseSerializer.Meta.fields + ("title",)
+
+
+class EditionWithBookSerializer(ModelSerializer):
+    book_id = IntegerField(read_only=True)
+    book = BookDetailSerializer()
+
+    class Meta:
+        model = Edition
+        fields = ("id", "isbn", "isbn13", "title", "year", "pages", "book_id", "book")
+
+
+class EditionSyncSerializer(ModelSerializer):
+
+    class Meta:
+        model = Edition
+        fields = ("id", "book", "isbn", "isbn13", "title", "year", "pages")
+
+
+class BookCopySyncSerializer(ModelSerializer):
+
+    class Meta:
+        model = BookCopy
+        fields = ("id", "edition")
@@ -1,13 +1,14 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from .views import BookViewSet
+from .views import BookViewSet, IsbnViewSet
 
 
 app_name = "books"
 
 router = routers.DefaultRouter()
 router.register(r"books", BookViewSet)
+router.register(r"isbn", IsbnViewSet, basename="isbn")
 
 urlpatterns = [
     path("", include(router.urls)),
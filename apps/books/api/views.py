@@ -1,8 +1,11 @@
-from rest_framework import permissions
-from rest_framework.viewsets import ModelViewSet
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.viewsets import ModelViewSet, ViewSet
 
+from apps.books import core
+from apps.books.isbn import InvalidISBN
 from apps.books.models import Book
-from apps.books.api.serializers import BookDetailSerializer
+from apps.books.api.serializers import BookDetailSerializer, EditionWithBookSerializer
 
 
 class BookViewSet(ModelViewSet):
@@ -10,3 +13,22 @@ class BookViewSet(ModelViewSet):
     serializer_class = BookDetailSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
+
+class IsbnViewSet(ViewSet):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def retrieve(self, request, pk=None):
+        """Editions (and their Books) with the ISBN given (as ISBN-10 or ISBN-13) as 'pk'."""
+
+        try:
+            editions = core.editions_with_isbn(pk)
+        except InvalidISBN as e:
+            return Response(data={"isbn": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not editions:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(data={
+            "isbn13": editions[0].isbn13,
+            "editions": EditionWithBookSerializer(editions, many=True).data,
+        })
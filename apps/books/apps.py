@@ -5,3 +5,6 @@ from django.apps import AppConfig
 # Classes:
 class BooksConfig(AppConfig):
     name = 'apps.books'
+
+    def ready(self):
+        from . import signals  # noqa: F401 (registers signal receivers)
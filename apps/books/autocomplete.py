@@ -0,0 +1,187 @@
+"""
+Autocomplete of Book titles, Author names and Saga names, from a process-local index.
+
+The index holds the normalized names (see search.normalize) of the whole catalog, with
+the positions of their words and their trigrams in NumPy arrays: 2-5 MB per 10k names.
+It is built lazily, with three queries, and rebuilt when the catalog version changes
+(signals bump it on writes to Books, Authors and Sagas), so lookups don't touch the
+database.
+
+A query matches the names that have a word starting with it. If there are not enough of
+those, names sharing most trigrams with it are suggested too, which tolerates typos.
+"""
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from .models import Author, Book, Saga
+from .search import SearchResult, normalize
+from biblio.core import catalog_version
+
+
+KINDS = ("book", "author", "saga")
+LIMIT = 10
+MAX_PREFIX_MATCHES = 200  # candidates to rank, for very short queries
+MIN_SIMILARITY = 0.3  # Jaccard index of trigram sets
+
+_index = None
+
+
+class CatalogIndex:
+    """Index of names to suggest, with the kind and id of the object of each."""
+
+    def __init__(self, entries, version=None):
+        """Build from iterable of (kind, object id, name) tuples."""
+
+        self.version = version
+        self.names, self.keys, suffixes, trigrams = [], [], [], []
+        kinds, ids = [], []
+
+        for kind, object_id, name in entries:
+            words = _words(name)
+            if not words:
+                continue
+
+            n = len(self.names)
+            key = " ".join(words)
+            offsets = [match.start() for match in re.finditer(r"\S+", key)]
+            suffixes.extend((key[offset:], n, offset) for offset in offsets)
+            trigrams.extend((trigram, n) for trigram in _trigrams(key))
+            self.names.append(name)
+            self.keys.append(key)
+            kinds.append(KINDS.index(kind))
+            ids.append(object_id)
+
+        self.kinds = np.array(kinds, dtype=np.int8)
+        self.ids = np.array(ids, dtype=np.int32)
+
+        # Suffixes of keys from each word on, sorted, for prefix lookups with bisect. Only
+        # their entry and offset are kept, not the strings:
+        suffixes.sort()
+        self.suffix_entries = np.array([n for _, n, _ in suffixes], dtype=np.int32)
+        self.suffix_offsets = np.array([offset for _, _, offset in suffixes], dtype=np.int16)
+
+        # Entries of each trigram, as slices of a single array:
+        trigrams.sort()
+        self.trigram_entries = np.array([n for _, n in trigrams], dtype=np.int32)
+        self.trigram_slices = {}
+        for position, (trigram, _) in enumerate(trigrams):
+            previous = self.trigram_slices.get(trigram)
+            start = position if previous is None else previous.start
+            self.trigram_slices[trigram] = slice(start, position + 1)
+        self.n_trigrams = np.bincount(self.trigram_entries, minlength=len(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        """Approximate memory used by self."""
+
+        strings = sum(len(name) for name in self.names) + sum(len(key) for key in self.keys)
+        arrays = (self.kinds, self.ids, self.suffix_entries, self.suffix_offsets,
+                  self.trigram_entries, self.n_trigrams)
+        overhead = 60 * (len(self.names) + len(self.keys)) + 160 * len(self.trigram_slices)
+
+        return strings + sum(array.nbytes for array in arrays) + overhead
+
+    def suggest(self, query, limit=LIMIT):
+        """List of up to 'limit' SearchResults for 'query', best first."""
+
+        key = " ".join(_words(query))
+        if not key:
+            return []
+
+        entries = self._prefix_matches(key, limit)
+        if len(entries) < limit:
+            found = set(entries)
+            similar = [n for n in self._similar(key) if n not in found]
+            entries.extend(similar[:limit - len(entries)])
+
+        return [self._result(n) for n in entries]
+
+    def _prefix_matches(self, key, limit):
+        """Entries with a word starting with 'key'. Those starting with it first, then shorter."""
+
+        n_suffixes = len(self.suffix_entries)
+        position = bisect_left(range(n_suffixes), key, key=self._suffix)
+        found = {}
+        while (position < n_suffixes and self._suffix(position).startswith(key)
+               and len(found) < MAX_PREFIX_MATCHES):
+            n = int(self.suffix_entries[position])
+            found[n] = found.get(n, False) or self.suffix_offsets[position] == 0
+            position += 1
+
+        return sorted(found, key=lambda n: (not found[n], len(self.keys[n]), n))[:limit]
+
+    def _suffix(self, position):
+        return self.keys[self.suffix_entries[position]][self.suffix_offsets[position]:]
+
+    def _similar(self, key):
+        """Entries by decreasing similarity of their trigrams with those of 'key'."""
+
+        trigrams = _trigrams(key)
+        known = [self.trigram_slices[t] for t in trigrams if t in self.trigram_slices]
+        if not known:
+            return []
+
+        postings = np.concatenate([self.trigram_entries[indices] for indices in known])
+        shared = np.bincount(postings, minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        n_query = len(trigrams)
+        similarity = shared[candidates] / (n_query + self.n_trigrams[candidates]
+                                           - shared[candidates])
+        good = similarity >= MIN_SIMILARITY
+        candidates, similarity = candidates[good], similarity[good]
+
+        return candidates[np.argsort(-similarity, kind="stable")].tolist()
+
+    def _result(self, n):
+        kind, object_id = KINDS[self.kinds[n]], int(self.ids[n])
+        book_id = object_id if kind == "book" else None
+
+        return SearchResult(kind, object_id, book_id, self.names[n], 0.)
+
+
+def catalog_index():
+    """CatalogIndex of the current catalog, (re)built only if it changed."""
+
+    global _index
+
+    version = catalog_version()
+    if _index is None or _index.version != version:
+        _index = build_catalog_index(version)
+
+    return _index
+
+
+def build_catalog_index(version=None):
+    entries = [
+        *(("book", *row) for row in Book.objects.values_list("id", "title")),
+        *(("author", *row) for row in Author.objects.values_list("id", "name")),
+        *(("saga", *row) for row in Saga.objects.values_list("id", "name")),
+    ]
+
+    return CatalogIndex(entries, version)
+
+
+def suggest(query, limit=LIMIT):
+    """Up to 'limit' SearchResults (of Books, Authors or Sagas) for 'query', best first."""
+
+    return catalog_index().suggest(query, limit)
+
+
+def _words(text):
+    return re.findall(r"\w+", normalize(text))
+
+
+def _trigrams(key):
+    """Set of trigrams of the words in 'key', padded with spaces."""
+
+    return {
+        padded[i:i + 3]
+        for word in key.split()
+        for padded in [f" {word} "]
+        for i in range(len(padded) - 2)
+    }
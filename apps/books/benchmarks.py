@@ -0,0 +1,180 @@
+"""
+Benchmark cases for the heaviest pages, and the machinery to time them.
+
+Cases are plain functions taking a User, registered with the @benchmark decorator.
+Cached results are timed both as served (warm) and recomputed ("-uncached" cases).
+They are run by the 'benchmark' management command against generated datasets.
+"""
+import statistics as stats
+import time
+import tracemalloc
+
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import autocomplete, core, search, statistics
+from .generator import GeneratorSettings, LibraryGenerator
+from apps.readings.api.views import ReadingViewSet
+from biblio.core import bump_catalog_version, bump_data_version
+
+
+BENCHMARKS = {}
+DEFAULT_SCALES = (100, 10_000, 1_000_000)
+MAX_YEARS = 30  # of reading history: larger datasets read more books per year
+
+
+def benchmark(name):
+    """Register decorated function as benchmark case 'name'."""
+
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+@benchmark("sagas")
+def bench_sagas(user):
+    core.get_saga_data_for(user)
+
+
+@benchmark("stats")
+def bench_stats(user):
+    state = statistics.State(timezone.now().year, user)
+
+    return state.books_read, state.pages_read
+
+
+@benchmark("stats-uncached")
+def bench_stats_uncached(user):
+    bump_data_version(user.id)
+
+    return bench_stats(user)
+
+
+@benchmark("index")
+def bench_index(user):
+    list(core.current_readings_by(user))
+    for data in core.completed_readings_by_year_for(user):
+        list(data["readings"])
+
+
+@benchmark("progress")
+def bench_progress(user):
+    request = RequestFactory().get("/api/readings/progress/")
+    request.user = user
+    ReadingViewSet(request=request).progress()
+
+
+@benchmark("progress-uncached")
+def bench_progress_uncached(user):
+    bump_data_version(user.id)
+    bench_progress(user)
+
+
+@benchmark("search")
+def bench_search(user):
+    for query in ("the", "an", "saga of", "xyzzy"):
+        search.search(query)
+    search.search("the", kind="book", page=2)
+
+
+@benchmark("autocomplete")
+def bench_autocomplete(user):
+    for query in ("a", "the", "sag", "wizrd", "ursula le guin", "xyzzy"):
+        autocomplete.suggest(query)
+
+
+@benchmark("autocomplete-uncached")
+def bench_autocomplete_uncached(user):
+    bump_catalog_version()
+    bench_autocomplete(user)
+
+
+def run_case(name, user, repeat=10):
+    """Time benchmark case 'name' for 'user'. Return dict of measurements."""
+
+    func = BENCHMARKS[name]
+    func(user)  # warm up
+
+    with CaptureQueriesContext(connection) as ctx:
+        tracemalloc.start()
+        func(user)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(user)
+        timings.append(1000 * (time.perf_counter() - t0))
+
+    return {
+        "case": name,
+        "repeat": repeat,
+        "p50_ms": _percentile(timings, 50),
+        "p95_ms": _percentile(timings, 95),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "queries": len(ctx.captured_queries),
+        "peak_memory_kb": peak_memory / 1024,
+    }
+
+
+def compare(base, new, threshold=0.1, metric="p50_ms"):
+    """
+    Compare two benchmark results (as loaded from JSON). Return list of regressions,
+    as strings. A regression is 'metric' growing more than 'threshold' (a fraction),
+    or the amount of queries growing at all.
+    """
+    base_results = {(r["case"], r["scale"]): r for r in base["results"]}
+
+    regressions = []
+    for result in new["results"]:
+        key = (result["case"], result["scale"])
+        old = base_results.get(key)
+        if old is None:
+            continue
+
+        label = f"{result['case']} @ {result['scale']}"
+        if result[metric] > old[metric] * (1 + threshold):
+            regressions.append(f"{label}: {metric} {old[metric]:.2f} -> {result[metric]:.2f}")
+
+        if result["queries"] > old["queries"]:
+            regressions.append(f"{label}: queries {old['queries']} -> {result['queries']}")
+
+    return regressions
+
+
+def build_dataset(n_updates, seed=0):
+    """
+    Generate a reader with a reading history of about 'n_updates' ReadingUpdates,
+    over a catalog scaled accordingly. Return the reader.
+    """
+    updates_per_reading = 20
+    n_readings = max(1, n_updates // updates_per_reading)
+    years = min(MAX_YEARS, max(1, n_readings // 40))
+
+    settings = GeneratorSettings(
+        authors=max(5, n_readings // 10),
+        books=max(10, n_readings),
+        years=years,
+        books_per_year=max(1, n_readings // years),
+        updates_per_reading=updates_per_reading,
+        seed=seed,
+        prefix=f"benchmark-{n_updates}",
+    )
+    user, = LibraryGenerator(settings).run()
+
+    return user
+
+
+def _percentile(values, percent):
+    """Value below which 'percent' of 'values' fall."""
+
+    if len(values) == 1:
+        return values[0]
+
+    return stats.quantiles(values, n=100, method="inclusive")[percent - 1]
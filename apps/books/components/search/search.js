@@ -0,0 +1,38 @@
+// Suggest Books, Authors and Sagas while typing in the query field:
+document.querySelectorAll("form[data-autocomplete-url]").forEach(function (form) {
+    const input = form.querySelector("input[name='query']");
+    const list = form.querySelector(".autocomplete-list");
+    let timer = null;
+    let lastQuery = null;
+
+    input.setAttribute("autocomplete", "off");
+    input.addEventListener("input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(function () { suggest(input.value.trim()); }, 100);
+    });
+
+    function suggest(query) {
+        lastQuery = query;
+        if (!query) {
+            list.replaceChildren();
+            return;
+        }
+
+        fetch(form.dataset.autocompleteUrl + "?q=" + encodeURIComponent(query))
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                if (query !== lastQuery) {
+                    return;  // a newer request is on its way
+                }
+                list.replaceChildren(...data.results.map(function (result) {
+                    const item = document.createElement("li");
+                    const link = document.createElement("a");
+                    link.href = result.url;
+                    link.textContent = result.name;
+                    item.className = "autocomplete-" + result.kind;
+                    item.appendChild(link);
+                    return item;
+                }));
+            });
+    }
+});
@@ -6,6 +6,7 @@ from django_components.component import DataType
 class Search(Component):
     template_file = "search.html"
     css_file = "search.css"
+    js_file = "search.js"
 
     def get_context_data(self, form) -> DataType:
         return {
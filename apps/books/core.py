@@ -1,16 +1,27 @@
+from dataclasses import dataclass
 from datetime import timedelta
+from itertools import groupby
 
+from django.apps import apps as django_apps
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models.functions import Coalesce
-from django.db.models import Subquery, OuterRef, F
+from django.db.models.functions import Coalesce, Greatest
+from django.db import transaction
+from django.db.models import Subquery, OuterRef, F, Count, QuerySet
 import plotly.graph_objects as go
 from plotly.offline import plot as offplot
 
-from biblio.core import as_float
-from .models import Reading, ReadingUpdate, Saga, Edition
+from biblio.core import as_float, bump_catalog_version, catalog_version
+from . import search
+from .isbn import to_isbn13
+from .models import (Author, Reading, Saga, Book, Edition,
+                     SagaProgress)
 from ..readings.lib.custom_definitions import ReadingStatus
 
 
+CACHE_TIMEOUT = 86400  # entries are invalidated by catalog version anyway
+
+
 def get_book_progress_plot(points, total_pages, longest=0, pages_per_day=None):
     """Return <div> of Plotly plot area for book reading progress."""
 
@@ -85,16 +96,21 @@ def get_book_progress_plot(points, total_pages, longest=0, pages_per_day=None):
     return offplot(figure, output_type="div", include_plotlyjs=False, config=config)
 
 
-def current_readings_by(user):
+def current_readings_by(user, apps=django_apps):
+    Reading, ReadingUpdate = (apps.get_model("readings", name)
+                              for name in ("Reading", "ReadingUpdate"))
     latest_ru_subquery = ReadingUpdate.objects.filter(reading=OuterRef('id')).order_by("-date")[:1]
 
-    open_readings = Reading.objects.filter(reader=user, status=ReadingStatus.STARTED)
-    Edition.objects.filter(reading__in=open_readings, pages=0).update(pages=1)  # just in case
+    open_readings = Reading.objects.filter(
+        reader=user,
+        status=ReadingStatus.STARTED,
+    ).select_related("edition__book")
 
     return open_readings.annotate(
         pages_read=Coalesce(Subquery(latest_ru_subquery.values('page')), 0)
     ).annotate(
-        fraction_read=as_float(F('pages_read')) / as_float(F('edition__pages'))
+        # Just in case some Edition has 0 pages:
+        fraction_read=as_float(F('pages_read')) / as_float(Greatest(F('edition__pages'), 1))
     ).annotate(
         percent_read=as_float(F('fraction_read')) * 100.,
     ).order_by("-start")
@@ -104,56 +120,125 @@ def completed_readings_by_year_for(user):
     """
     Return list of books already read, sorted by finish date and grouped by year (recent first).
     """
-    my_readings = Reading.objects.filter(reader=user, status=ReadingStatus.COMPLETED)
+    my_readings = Reading.objects.filter(
+        reader=user,
+        status=ReadingStatus.COMPLETED,
+        end__isnull=False,
+    ).select_related("edition__book").order_by("-end")
+
+    return [
+        {"year": year, "readings": list(readings)}
+        for year, readings in groupby(my_readings, key=lambda r: timezone.localtime(r.end).year)
+    ]
+
+
+@dataclass
+class BibliographyBook:
+    """A Book in a bibliography: plain values, and its status for a user."""
+
+    id: int
+    title: str
+    year: int
+    index_in_saga: int
+    user_status: str = None
+
+
+def bibliography_of(author_id, user):
+    """
+    Books of Author with id 'author_id', grouped by Saga, as a list of (Saga name,
+    BibliographyBooks) tuples. Sagas by name, Books by index in Saga, and Books without Saga
+    last. The grouping (plain values, the same for all users) is cached per Author until
+    the catalog changes, and statuses for 'user' are queried every time.
+    """
+    key = f"bibliography:{author_id}:{catalog_version()}"
+    groups = cache.get(key)
+
+    if groups is None:
+        rows = Book.objects.filter(authors=author_id).order_by(
+            F("saga__name").asc(nulls_last=True), "saga_id", "index_in_saga", "year", "id",
+        ).values_list("saga_id", "saga__name", "id", "title", "year", "index_in_saga")
+        groups = []
+        for saga_id, saga_rows in groupby(rows, key=lambda row: row[0]):
+            saga_rows = list(saga_rows)
+            saga = saga_rows[0][1] if saga_id else "No saga"
+            groups.append((saga, [row[2:] for row in saga_rows]))
+        cache.set(key, groups, CACHE_TIMEOUT)
+
+    statuses = book_statuses_for([row[0] for _, rows in groups for row in rows], user)
+
+    return [
+        (saga, [BibliographyBook(*row, user_status=statuses[row[0]]) for row in rows])
+        for saga, rows in groups
+    ]
+
+
+def resolve_authors(names):
+    """
+    Authors with given 'names' (stripped, and without repetitions or empty ones), in the
+    same order. Those not existing are created, all in a bounded amount of queries.
+    """
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    authors = {author.name: author for author in Author.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in authors]
+
+    if missing:
+        # Another request may create some of them meanwhile, hence the ignored conflicts
+        # and the fetch (bulk_create() can't return ids of those on conflict):
+        Author.objects.bulk_create([Author(name=name) for name in missing], ignore_conflicts=True)
+        created = Author.objects.filter(name__in=missing)
+        authors.update((author.name, author) for author in created)
+
+        # Done by signals for single saves:
+        search.index("author", [author.id for author in created])
+        bump_catalog_version()
 
-    years_with_readings_qs = my_readings.order_by("-end__year").values_list(
-        "end__year",
-        flat=True,
-    ).distinct()
+    return [authors[name] for name in names]
 
-    data = []
-    for year in years_with_readings_qs:
-        readings = my_readings.filter(end__year=year).order_by("-end")
 
-        if readings:
-            data.append({"year": year, "readings": readings})
+def saga_named(name):
+    """
+    Saga with 'name', created (in a single INSERT) if there is none. That needs id sequences
+    in sync with the data, which the 'reset_sequences' command fixes.
+    """
+    saga = Saga.objects.filter(name=name).order_by("id").first()
 
-    return data
+    return saga or Saga.objects.create(name=name)
 
 
 def get_saga_data_for(user):
+    """
+    Return Sagas grouped by completion status for user. Each Saga comes with its Books,
+    and the status of each Book (read, owned or not-owned), all in a fixed amount of queries.
+    """
+    books = Book.objects.filter(saga__isnull=False).with_status_for(user).order_by(
+        "saga_id",
+        "index_in_saga",
+    )
+
+    books_by_saga = {}
+    for book in books:
+        books_by_saga.setdefault(book.saga_id, []).append(book)
+
+    progress_by_saga = {p.saga_id: p for p in SagaProgress.objects.filter(user=user)}
+
     sagas = {
         "read": [],
         "owned": [],
         "not_owned": [],
     }
     for saga in Saga.objects.order_by("name"):
+        saga_books = books_by_saga.get(saga.id, [])
+        progress = progress_by_saga.get(saga.id)
+        if progress is None:  # user has neither read nor owns any book of it
+            progress = SagaProgress(saga=saga, user=user, books_total=len(saga_books))
+
         saga_item = {
             "name": saga.name,
-            "books": [],
-            "is_completed": True,
-            "is_owned": True,
+            "books": [(book, _saga_book_status(book)) for book in saga_books],
+            "is_completed": progress.is_completed,
+            "is_owned": progress.is_owned,
         }
 
-        for book in saga.books:
-            book_read = book.is_already_read_by(user)
-            book_owned = book.is_owned_by(user)
-
-            if not book_read:
-                saga_item["is_completed"] = False
-
-            if not book_owned:
-                saga_item["is_owned"] = False
-
-            status = "not-owned"
-            if book_read:
-                status = "read"
-            elif book_owned:
-                status = "owned"
-
-            book_item = (book, status)
-            saga_item["books"].append(book_item)
-
         if saga_item["is_completed"]:
             sagas["read"].append(saga_item)
         elif saga_item["is_owned"]:
@@ -162,3 +247,121 @@ def get_saga_data_for(user):
             sagas["not_owned"].append(saga_item)
 
     return sagas
+
+
+def _saga_book_status(book):
+    """Status of a Book annotated by get_saga_data_for()."""
+
+    if book.is_read:
+        return "read"
+
+    if book.is_owned:
+        return "owned"
+
+    return "not-owned"
+
+
+def refresh_saga_progress(saga_ids, user_ids=None, apps=django_apps):
+    """
+    Recompute the SagaProgress rows of Sagas with ids in 'saga_ids', for users with ids
+    in 'user_ids' (default: all users that have read or own any book in those Sagas),
+    with the models of 'apps' (historical ones, in a migration). It takes a fixed amount
+    of queries, regardless of amount of Sagas, Books or users.
+    """
+    Saga, Book, BookCopy, SagaProgress = (apps.get_model("books", name) for name in
+                                          ("Saga", "Book", "BookCopy", "SagaProgress"))
+    Reading = apps.get_model("readings", "Reading")
+
+    saga_ids = set(Saga.objects.filter(id__in=saga_ids).values_list("id", flat=True))
+    if not saga_ids:
+        return
+
+    totals = dict(
+        Book.objects.filter(saga_id__in=saga_ids)
+        .values_list("saga_id")
+        .annotate(n=Count("id"))
+    )
+
+    readings = Reading.objects.filter(
+        edition__book__saga_id__in=saga_ids,
+        status=ReadingStatus.COMPLETED,
+    )
+    copies = BookCopy.objects.filter(edition__book__saga_id__in=saga_ids)
+    if user_ids is not None:
+        readings = readings.filter(reader_id__in=user_ids)
+        copies = copies.filter(owner_id__in=user_ids)
+
+    read = _count_books_per_user_and_saga(readings, "reader_id")
+    owned = _count_books_per_user_and_saga(copies, "owner_id")
+
+    existing = SagaProgress.objects.filter(saga_id__in=saga_ids)
+    if user_ids is None:
+        user_ids = set(existing.values_list("user_id", flat=True))
+        user_ids.update(user_id for user_id, _ in read)
+        user_ids.update(user_id for user_id, _ in owned)
+    else:
+        existing = existing.filter(user_id__in=user_ids)
+
+    new_rows = [
+        SagaProgress(
+            user_id=user_id,
+            saga_id=saga_id,
+            books_read=read.get((user_id, saga_id), 0),
+            books_owned=owned.get((user_id, saga_id), 0),
+            books_total=totals.get(saga_id, 0),
+        )
+        for user_id in user_ids
+        for saga_id in saga_ids
+        if (user_id, saga_id) in read or (user_id, saga_id) in owned
+    ]
+
+    with transaction.atomic():
+        existing.delete()
+        SagaProgress.objects.bulk_create(new_rows)
+
+
+def rebuild_saga_progress(apps=django_apps):
+    """
+    Recompute all SagaProgress rows from scratch, with the models of 'apps'. Return
+    amount of rows created.
+    """
+    Saga, SagaProgress = (apps.get_model("books", name) for name in ("Saga", "SagaProgress"))
+
+    with transaction.atomic():
+        SagaProgress.objects.all().delete()
+        refresh_saga_progress(Saga.objects.values_list("id", flat=True), apps=apps)
+
+    return SagaProgress.objects.count()
+
+
+def _count_books_per_user_and_saga(qs, user_field):
+    """Distinct Books in 'qs' (of Readings or BookCopies), as {(user id, saga id): count}."""
+
+    rows = qs.values_list(user_field, "edition__book__saga_id").annotate(
+        n=Count("edition__book", distinct=True),
+    )
+
+    return {(user_id, saga_id): n for user_id, saga_id, n in rows}
+
+
+def book_statuses_for(books, user):
+    """
+    Return {book id: status} of 'books' for 'user', in a single query. See
+    BookQuerySet.with_status_for() for possible statuses. 'books' can be a
+    QuerySet of Books, or an iterable of Books or Book ids.
+    """
+    if not isinstance(books, QuerySet):
+        ids = [getattr(book, "pk", book) for book in books]
+        books = Book.objects.filter(pk__in=ids)
+
+    return books.statuses_for(user)
+
+
+def editions_with_isbn(code):
+    """
+    Editions (with their Book) with ISBN 'code', in any ISBN-10 or ISBN-13 form, in a
+    single indexed query. Raise isbn.InvalidISBN if 'code' is not a valid ISBN.
+    """
+    editions = Edition.objects.filter(isbn13=to_isbn13(code)).select_related("book")
+
+    return list(editions.order_by("id"))
@@ -0,0 +1,215 @@
+"""
+Streaming export of the library of a user: the Books and Editions they read or own, their
+BookCopies, Readings and ReadingUpdates, one table at a time, as CSV, JSON Lines, or
+Parquet (if pyarrow is installed).
+
+Rows are read with values() and iterator(), and written out a chunk at a time, so memory
+use does not depend on the size of the history, and output starts with the first chunk.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
+
+from .models import Book, BookCopy, Edition
+from apps.readings.lib.sync import edition_ids_of
+from apps.readings.models import Reading, ReadingUpdate
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/jsonl",
+    "parquet": "application/vnd.apache.parquet",
+}
+FORMATS = tuple(f for f in CONTENT_TYPES if f != "parquet" or pyarrow is not None)
+
+
+@dataclass
+class Table:
+    """Columns of 'model' to export (lookups, as for values()), and rows of a user."""
+
+    model: type
+    columns: tuple
+    rows_of: callable  # user -> QuerySet
+
+    def values(self, user):
+        return self.rows_of(user).order_by("id").values(*self.columns)
+
+
+TABLES = {
+    "books": Table(
+        Book,
+        ("id", "title", "year", "saga__name", "index_in_saga"),
+        lambda user: Book.objects.filter(
+            id__in=Edition.objects.filter(id__in=edition_ids_of(user)).values("book_id"),
+        ),
+    ),
+    "editions": Table(
+        Edition,
+        ("id", "book_id", "isbn", "isbn13", "title", "year", "pages"),
+        lambda user: Edition.objects.filter(id__in=edition_ids_of(user)),
+    ),
+    "copies": Table(
+        BookCopy,
+        ("id", "edition_id"),
+        lambda user: BookCopy.objects.filter(owner=user),
+    ),
+    "readings": Table(
+        Reading,
+        ("id", "edition_id", "start", "end", "status", "current_page", "deadline",
+         "deadline_percent"),
+        lambda user: Reading.objects.filter(reader=user),
+    ),
+    "updates": Table(
+        ReadingUpdate,
+        ("id", "reading_id", "page", "date"),
+        lambda user: ReadingUpdate.objects.filter(reading__reader=user),
+    ),
+}
+
+
+def export(user, table, file_format, chunk_size=CHUNK_SIZE):
+    """Yield bytes of 'table' (a key of TABLES) of 'user' in 'file_format' (of FORMATS)."""
+
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format: {file_format}")
+
+    writer = {"csv": _csv, "jsonl": _jsonl, "parquet": _parquet}[file_format]
+
+    return writer(TABLES[table], _chunks_of(TABLES[table], user, chunk_size))
+
+
+def columns_of(table):
+    """Column names of 'table' (a Table), in order. Books also have their authors."""
+
+    return [*table.columns, "authors"] if table.model is Book else list(table.columns)
+
+
+def _chunks_of(table, user, chunk_size):
+    """Yield lists of up to 'chunk_size' rows (dicts) of 'table' of 'user'."""
+
+    rows = table.values(user).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        if table.model is Book:
+            _add_authors(chunk)
+        yield chunk
+
+
+def _add_authors(rows):
+    """Set "authors" of Book 'rows' to their names, comma separated, with one query."""
+
+    names = {row["id"]: [] for row in rows}
+    for book_id, name in (
+        Book.authors.through.objects.filter(book_id__in=names)
+        .order_by("id").values_list("book_id", "author__name")
+    ):
+        names[book_id].append(name)
+
+    for row in rows:
+        row["authors"] = ", ".join(names[row["id"]])
+
+
+def _csv(table, chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns_of(table))
+
+    writer.writeheader()
+    yield _drain(buffer).encode()
+
+    for chunk in chunks:
+        writer.writerows({k: _plain(v) for k, v in row.items()} for row in chunk)
+        yield _drain(buffer).encode()
+
+
+def _jsonl(table, chunks):
+    for chunk in chunks:
+        yield "".join(json.dumps(row, default=_plain) + "\n" for row in chunk).encode()
+
+
+def _parquet(table, chunks):
+    """Parquet file with a row group per chunk."""
+
+    schema = pyarrow.schema([(column, _arrow_type(table.model, column))
+                             for column in columns_of(table)])
+    sink = _Sink()
+
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+
+    yield sink.drain()
+
+
+def _arrow_type(model, column):
+    """Arrow type for values of 'column' (a values() lookup) of 'model'."""
+
+    *relations, name = column.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+
+    if model is Book and name == "authors":
+        return pyarrow.string()
+
+    field = model._meta.get_field(name.removesuffix("_id"))
+    if field.is_relation:
+        field = field.target_field
+
+    internal_type = field.get_internal_type()
+    if internal_type == "DateTimeField":
+        return pyarrow.timestamp("us", tz="UTC")
+    if internal_type == "FloatField":
+        return pyarrow.float64()
+    if internal_type == "BooleanField":
+        return pyarrow.bool_()
+    if "Integer" in internal_type or "AutoField" in internal_type:
+        return pyarrow.int64()
+
+    return pyarrow.string()
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _drain(buffer):
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    return text
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands out what was written so far (tell() keeps counting)."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts, self.position = [], 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+
+        return data
@@ -1,5 +1,7 @@
 from django import forms
 
+from .isbn import to_isbn13_or_blank
+
 
 class ReadingUpdateForm(forms.Form):
     pages_read = forms.IntegerField(label="Pages read", max_value=10000, required=False)
@@ -20,11 +22,29 @@ class AddEditionForm(forms.Form):
     year = forms.IntegerField(label="Year")
     pages = forms.IntegerField(label="Pages")
 
+    def __init__(self, *args, editions=None, **kwargs):
+        """'editions': QuerySet of the other Editions of the Book, whose ISBN can't be reused."""
+
+        super().__init__(*args, **kwargs)
+        self.editions = editions
+
+    def clean_isbn(self):
+        isbn = self.cleaned_data["isbn"]
+        isbn13 = to_isbn13_or_blank(isbn)
+
+        if isbn13 and self.editions is not None and self.editions.filter(isbn13=isbn13).exists():
+            raise forms.ValidationError("Another edition of this book has this ISBN.")
+
+        return isbn
+
 
 class SearchAuthorOrBookForm(forms.Form):
     CHOICES = [
-        ('author', 'Author'),
+        ('all', 'All'),
         ('book', 'Book'),
+        ('author', 'Author'),
+        ('saga', 'Saga'),
+        ('edition', 'Edition'),
     ]
 
     search_type = forms.ChoiceField(
@@ -41,3 +61,13 @@ class SearchAuthorOrBookForm(forms.Form):
         }),
         label="Search query",
     )
+
+
+class ImportLibraryForm(forms.Form):
+    FORMATS = [
+        ('csv', 'CSV (or Goodreads export)'),
+        ('json', 'JSON'),
+    ]
+
+    file = forms.FileField(label="Export file")
+    file_format = forms.ChoiceField(choices=FORMATS, label="Format")
@@ -0,0 +1,240 @@
+"""
+Deterministic generator of synthetic libraries and reading histories, for load testing.
+
+Everything is created with chunked bulk_create(), so no signals are fired: derived
+data (SagaProgress, YearlyReadingStats) is rebuilt once at the end.
+"""
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import core, search, statistics
+from .isbn import with_check_digit
+from .models import Author, Book, BookCopy, Edition, Saga
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.models import Reading, ReadingUpdate
+from biblio.core import bump_catalog_version
+
+
+FIRST_NAMES = (
+    "Ana", "Iñaki", "Ursula", "Isaac", "Terry", "José", "Frank", "Lois", "Miren", "Brandon",
+    "Ann", "Stanisław", "Octavia", "Joe", "N. K.", "Gene", "Robin", "Álvaro", "Ted", "Connie",
+)
+LAST_NAMES = (
+    "Asimov", "Le Guin", "Pratchett", "Saramago", "Herbert", "Bujold", "Sanderson", "Leckie",
+    "Lem", "Butler", "Abercrombie", "Jemisin", "Wolfe", "Hobb", "Cunqueiro", "Chiang", "Willis",
+    "Echevarría", "Núñez", "Zelazny",
+)
+TITLE_ADJECTIVES = (
+    "Broken", "Silent", "Last", "Hidden", "Burning", "Forgotten", "Crimson", "Endless", "Hollow",
+    "Golden", "Distant", "Shattered", "Left", "Dispossessed", "Ancient", "Final",
+)
+TITLE_NOUNS = (
+    "Empire", "Sword", "Tower", "Foundation", "Stars", "Hand", "Darkness", "Kingdom", "Sea",
+    "Road", "Storm", "Moon", "City", "Throne", "Gate", "Machine", "Dream", "Shadow", "Fire",
+)
+
+# Relative frequency of saga sizes: duologies and trilogies dominate, a few long series:
+SAGA_SIZE_WEIGHTS = {2: 20, 3: 35, 4: 15, 5: 10, 6: 6, 7: 5, 8: 3, 10: 3, 14: 2, 20: 1}
+
+
+@dataclass
+class GeneratorSettings:
+    users: int = 1
+    authors: int = 100
+    books: int = 1000
+    saga_fraction: float = 0.4
+    ownership: float = 0.6
+    years: int = 10
+    books_per_year: int = 40
+    updates_per_reading: int = 30
+    dnf_fraction: float = 0.08
+    open_readings: int = 2
+    seed: int = 0
+    prefix: str = "synthetic"
+    chunk_size: int = 10_000
+
+
+class LibraryGenerator:
+    """Create a catalog of Authors, Sagas, Books and Editions, and Users reading it."""
+
+    def __init__(self, settings=None, log=None):
+        self.settings = settings or GeneratorSettings()
+        self.rng = random.Random(self.settings.seed)
+        self.log = log or (lambda msg: None)
+        self.counts = {}
+
+    def run(self):
+        """Generate everything. Return list of created Users."""
+
+        editions = self.create_catalog()
+        users = [self.create_reader(i, editions) for i in range(self.settings.users)]
+
+        core.rebuild_saga_progress()
+        statistics.rebuild_yearly_stats()
+        search.rebuild_search_index()
+
+        return users
+
+    def create_catalog(self):
+        """Create Authors, Sagas, Books and one or two Editions per Book. Return Editions."""
+
+        s = self.settings
+        authors = self._bulk_create(Author, (  # names are unique, even across runs
+            Author(name=f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)} "
+                        f"{s.prefix}-{i}")
+            for i in range(s.authors)
+        ))
+
+        sagas, books = [], []
+        n_saga_books = int(s.books * s.saga_fraction)
+        sizes, weights = zip(*SAGA_SIZE_WEIGHTS.items())
+        while len(books) < n_saga_books:
+            size = min(self.rng.choices(sizes, weights)[0], n_saga_books - len(books))
+            saga = Saga(name=f"The {self._title()} Saga {len(sagas)}")
+            sagas.append(saga)
+            year = self.rng.randint(1950, 2020)
+            books.extend(
+                Book(title=self._title(), saga=saga, index_in_saga=index, year=year + index)
+                for index in range(1, size + 1)
+            )
+        self._bulk_create(Saga, sagas)
+
+        books.extend(
+            Book(title=self._title(), year=self.rng.randint(1900, 2024))
+            for _ in range(s.books - len(books))
+        )
+        books = self._bulk_create(Book, books)
+
+        Through = Book.authors.through
+        self._bulk_create(Through, (
+            Through(book_id=book.id, author_id=author.id)
+            for book in books
+            for author in self.rng.sample(authors, 1 if self.rng.random() < 0.9 else 2)
+        ))
+
+        bump_catalog_version()  # bulk creation skips signals
+
+        return self._bulk_create(Edition, (
+            Edition(
+                book=book,
+                isbn=isbn13,
+                isbn13=isbn13,  # bulk creation skips Edition.save()
+                title=book.title,
+                year=book.year + n_edition,
+                pages=max(50, int(self.rng.gauss(400, 150))),
+            )
+            for book in books
+            for n_edition in range(1 if self.rng.random() < 0.8 else 2)
+            for isbn13 in [with_check_digit(f"978{self.rng.randrange(10**9):09d}")]
+        ))
+
+    def create_reader(self, n_user, editions):
+        """Create a User owning some of 'editions', with a reading history over them."""
+
+        s = self.settings
+        user = User.objects.create_user(username=f"{s.prefix}-{n_user}")
+
+        self._bulk_create(BookCopy, (
+            BookCopy(edition=edition, owner=user)
+            for edition in editions
+            if self.rng.random() < s.ownership
+        ))
+
+        # Reading durations, scaled so that the whole history spans s.years, up to now:
+        n_readings = s.years * s.books_per_year
+        durations = [self.rng.expovariate(1.0) for _ in range(n_readings)]
+        scale = 365 * s.years / sum(durations)
+
+        now = timezone.now()
+        day = now - timedelta(days=365 * s.years)
+        readings = []
+        for n_reading, duration in enumerate(durations):
+            duration = timedelta(days=duration * scale)
+            if n_reading >= n_readings - s.open_readings:
+                status, end = ReadingStatus.STARTED, None
+            elif self.rng.random() < s.dnf_fraction:
+                status, end = ReadingStatus.DNF, day + duration
+            else:
+                status, end = ReadingStatus.COMPLETED, day + duration
+
+            readings.append(Reading(reader=user, edition=self.rng.choice(editions), start=day,
+                                    end=end, status=status, current_page=0))
+            day += duration
+
+        readings = self._bulk_create(Reading, readings)
+        self._bulk_create(ReadingUpdate, self._updates_of(readings, now), keep=False)
+
+        current_pages = [r for r in readings if r.current_page]
+        Reading.objects.bulk_update(current_pages, ["current_page"], batch_size=s.chunk_size)
+
+        self.log(f"Created reader '{user}' with {len(readings)} readings")
+
+        return user
+
+    def _updates_of(self, readings, now):
+        """Yield dense, monotonic ReadingUpdates for all 'readings'. Set their current_page."""
+
+        for reading in readings:
+            pages = reading.edition.pages
+            end = reading.end or now
+            span = (end - reading.start).total_seconds()
+            n_updates = max(1, int(self.rng.gauss(self.settings.updates_per_reading, 5)))
+
+            if reading.status == ReadingStatus.COMPLETED:
+                last_page = pages
+            else:
+                last_page = self.rng.randint(1, pages - 1)
+
+            offsets = sorted(self.rng.random() * span for _ in range(n_updates - 1)) + [span]
+            marks = sorted(self.rng.randint(1, last_page) for _ in range(n_updates - 1))
+            marks.append(last_page)
+
+            for offset, page in zip(offsets, marks):
+                yield ReadingUpdate(
+                    reading_id=reading.id,
+                    page=page,
+                    date=reading.start + timedelta(seconds=offset),
+                )
+
+            reading.current_page = last_page
+
+    def _title(self):
+        return f"{self.rng.choice(TITLE_ADJECTIVES)} {self.rng.choice(TITLE_NOUNS)}"
+
+    def _bulk_create(self, model, objects, keep=True):
+        """
+        Save 'objects' in chunks, each in its own transaction. Return list of them,
+        or an empty one if not 'keep' (to generate millions without holding them in memory).
+        """
+        chunk_size = self.settings.chunk_size
+        name = model.__name__
+        created, chunk = [], []
+        for obj in objects:
+            chunk.append(obj)
+            if len(chunk) >= chunk_size:
+                self._save_chunk(model, chunk)
+                if keep:
+                    created.extend(chunk)
+                self.counts[name] = self.counts.get(name, 0) + len(chunk)
+                chunk = []
+
+        self._save_chunk(model, chunk)
+        if keep:
+            created.extend(chunk)
+        self.counts[name] = self.counts.get(name, 0) + len(chunk)
+        self.log(f"{name}: {self.counts[name]} created")
+
+        return created
+
+    @staticmethod
+    def _save_chunk(model, chunk):
+        if not chunk:
+            return
+
+        with transaction.atomic():
+            model.objects.bulk_create(chunk)
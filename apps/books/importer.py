@@ -0,0 +1,455 @@
+"""
+Streaming import of a library (catalog, copies and reading history of a user) from an
+export file: CSV with the columns in FIELDS, a Goodreads CSV export (recognized by its
+header), or JSON (an array of objects with FIELDS, or one object per line).
+
+Rows are read one at a time and processed in batches. Authors, Sagas, Books and Editions
+(by ISBN-13) are matched against maps preloaded with one query each, and new rows are
+created with bulk_create(), one transaction per batch. Since that sends no signals,
+rollups, search index, caches and sync log are refreshed here.
+
+Uploads larger than SYNC_MAX_BYTES would outlast the request timeout: the import_library
+view rejects them, and they are imported with the import_library management command.
+"""
+import csv
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import core, search, statistics
+from .isbn import to_isbn13_or_blank
+from .models import Author, Book, BookCopy, Edition, Saga
+from apps.readings.lib import sync
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.lib.snapshot import invalidate_snapshot
+from apps.readings.models import Reading, ReadingUpdate
+from biblio.core import bump_catalog_version, bump_data_version
+
+
+FIELDS = ("title", "authors", "year", "saga", "index_in_saga", "isbn", "edition_title",
+          "edition_year", "pages", "owned", "status", "start", "end", "page")
+STATUSES = {"read": ReadingStatus.COMPLETED, "reading": ReadingStatus.STARTED,
+            "dnf": ReadingStatus.DNF}
+GOODREADS_SHELVES = {"read": "read", "currently-reading": "reading"}
+GOODREADS_SERIES = re.compile(r"^(?P<title>.+?)\s*\((?P<saga>[^()]+?),?\s*#(?P<index>\d+)\)$")
+BATCH_SIZE = 1000
+MAX_ERRORS = 100  # kept in ImportReport (all are counted)
+MAX_INT = 2 ** 31 - 1  # of IntegerFields
+SYNC_MAX_BYTES = 1_000_000  # about 10 s worth of rows
+
+
+@dataclass
+class ImportRow:
+    """A Book, with an Edition of it, and what the user did with it."""
+
+    title: str
+    authors: list
+    year: int = 1
+    saga: str = ""
+    index_in_saga: int = 1
+    isbn: str = ""
+    edition_title: str = ""
+    edition_year: int = None
+    pages: int = 1
+    owned: bool = False
+    status: str = ""  # one of STATUSES, or empty if not read
+    start: datetime = None
+    end: datetime = None
+    page: int = 0
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)  # (row number, error), up to MAX_ERRORS
+    created: dict = field(default_factory=dict)  # model name -> amount
+    seconds: float = 0.
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.
+
+    def __str__(self):
+        created = ", ".join(f"{n} {name}" for name, n in self.created.items()) or "nothing"
+
+        return (f"Imported {self.rows - self.failed} of {self.rows} rows in {self.seconds:.1f} s "
+                f"({self.rows_per_second:.0f} rows/s). Created {created}.")
+
+
+class LibraryImporter:
+    """Import rows of an export file as the library of 'user'."""
+
+    def __init__(self, user, batch_size=BATCH_SIZE, log=None):
+        self.user = user
+        self.batch_size = batch_size
+        self.log = log or (lambda msg: None)
+        self.report = ImportReport()
+        self.saga_ids, self.years = set(), set()
+        self._preload()
+
+    def run(self, stream, file_format="csv"):
+        """Import all rows in (text) 'stream', of 'file_format' ("csv" or "json")."""
+
+        t0 = time.perf_counter()
+        batch = []
+        try:
+            for number, raw in enumerate(read_rows(stream, file_format), start=1):
+                self.report.rows += 1
+                try:
+                    batch.append(row_from(raw))
+                except (AttributeError, KeyError, TypeError, ValueError, OverflowError) as e:
+                    self._fail(number, e)
+
+                if len(batch) >= self.batch_size:
+                    self._import(batch)
+                    batch = []
+                    self.report.seconds = time.perf_counter() - t0
+                    self.log(f"{self.report.rows} rows "
+                             f"({self.report.rows_per_second:.0f} rows/s)")
+        except (csv.Error, ValueError) as e:  # the rest of the file can't be read
+            self.report.rows += 1
+            self._fail(self.report.rows, e)
+
+        self._import(batch)
+        self._refresh_derived_data()
+        self.report.seconds = time.perf_counter() - t0
+
+        return self.report
+
+    def _preload(self):
+        """Maps to match rows against existing data, with one query each."""
+
+        self.authors = dict(Author.objects.values_list("name", "id"))
+        self.sagas = dict(Saga.objects.order_by("-id").values_list("name", "id"))  # first wins
+
+        # Books by (title, author), and by ISBN-13 (of any of their Editions):
+        self.books = {
+            _book_key(title, author): book_id
+            for book_id, title, author in Book.objects.order_by("-id").values_list(
+                "id", "title", "authors__name",
+            )
+        }
+        self.editions, self.first_editions = {}, {}
+        for edition_id, book_id, isbn13 in Edition.objects.order_by("-id").values_list(
+            "id", "book_id", "isbn13",
+        ):
+            if isbn13:
+                self.editions[isbn13] = (edition_id, book_id)
+            self.first_editions[book_id] = edition_id
+
+        self.owned = set(BookCopy.objects.filter(owner=self.user).values_list("edition_id",
+                                                                              flat=True))
+        self.readings = set(Reading.objects.filter(reader=self.user).values_list("edition_id",
+                                                                                 "end"))
+
+    def _import(self, rows):
+        if not rows:
+            return
+
+        with transaction.atomic():
+            self._create_authors({name for row in rows for name in row.authors})
+            self._create_sagas({row.saga for row in rows if row.saga})
+            edition_ids = self._create_books_and_editions(rows)
+            self._create_copies_and_readings(rows, edition_ids)
+
+    def _create_authors(self, names):
+        missing = [name for name in names if name not in self.authors]
+        if not missing:
+            return
+
+        Author.objects.bulk_create([Author(name=name) for name in missing], ignore_conflicts=True)
+        created = dict(Author.objects.filter(name__in=missing).values_list("name", "id"))
+        self.authors.update(created)
+        search.index("author", created.values())
+        self._count(Author, len(created))
+
+    def _create_sagas(self, names):
+        new = [Saga(name=name) for name in names if name not in self.sagas]
+        Saga.objects.bulk_create(new)
+        self.sagas.update((saga.name, saga.id) for saga in new)
+        search.index("saga", [saga.id for saga in new])
+        self._count(Saga, len(new))
+
+    def _create_books_and_editions(self, rows):
+        """Return list of Edition ids of 'rows', creating Books and Editions needed."""
+
+        # Books first, as Editions need their ids:
+        new_books, book_of_row = {}, []
+        for row in rows:
+            isbn13 = to_isbn13_or_blank(row.isbn)
+            keys = [_book_key(row.title, author) for author in row.authors[:1]]
+            book_id = self.editions.get(isbn13, (None, None))[1] if isbn13 else None
+            book_id = book_id or next((self.books[k] for k in keys if k in self.books), None)
+
+            if book_id is None:
+                key = keys[0] if keys else _book_key(row.title, "")
+                if key not in new_books:
+                    new_books[key] = Book(
+                        title=row.title,
+                        year=row.year,
+                        saga_id=self.sagas.get(row.saga),
+                        index_in_saga=row.index_in_saga,
+                    )
+                    new_books[key].author_ids = [self.authors[name] for name in row.authors]
+                book_of_row.append(new_books[key])
+            else:
+                book_of_row.append(book_id)
+
+        Book.objects.bulk_create(new_books.values())
+        Through = Book.authors.through
+        Through.objects.bulk_create([
+            Through(book_id=book.id, author_id=author_id)
+            for book in new_books.values()
+            for author_id in dict.fromkeys(book.author_ids)
+        ])
+        for key, book in new_books.items():
+            self.books[key] = book.id
+            if book.saga_id is not None:
+                self.saga_ids.add(book.saga_id)
+
+        # Editions, by ISBN-13, or the first one of the Book for rows without ISBN:
+        new_editions, edition_of_row = {}, []
+        for row, book in zip(rows, book_of_row):
+            book_id = getattr(book, "id", book)
+            isbn13 = to_isbn13_or_blank(row.isbn)
+            key = isbn13 or book_id
+            existing = self.editions.get(isbn13, (None,))[0] if isbn13 else None
+            existing = existing or (None if isbn13 else self.first_editions.get(book_id))
+
+            if existing is not None:
+                edition_of_row.append(existing)
+                continue
+
+            if key not in new_editions:
+                new_editions[key] = Edition(
+                    book_id=book_id,
+                    isbn=row.isbn,
+                    isbn13=isbn13,  # bulk creation skips Edition.save()
+                    title=row.edition_title or row.title,
+                    year=row.edition_year or row.year,
+                    pages=row.pages,
+                )
+            edition_of_row.append(new_editions[key])
+
+        Edition.objects.bulk_create(new_editions.values())
+        for edition in new_editions.values():
+            if edition.isbn13:
+                self.editions[edition.isbn13] = (edition.id, edition.book_id)
+            self.first_editions.setdefault(edition.book_id, edition.id)
+
+        search.index("book", [book.id for book in new_books.values()])
+        search.index("edition", [edition.id for edition in new_editions.values()])
+        sync.record_changes(new_editions.values(), None)
+        self._count(Book, len(new_books))
+        self._count(Edition, len(new_editions))
+
+        return [getattr(edition, "id", edition) for edition in edition_of_row]
+
+    def _create_copies_and_readings(self, rows, edition_ids):
+        copies, readings, updates = [], [], []
+        now = timezone.now()
+
+        for row, edition_id in zip(rows, edition_ids):
+            if row.owned and edition_id not in self.owned:
+                self.owned.add(edition_id)
+                copies.append(BookCopy(edition_id=edition_id, owner=self.user))
+
+            if not row.status or (edition_id, row.end) in self.readings:
+                continue
+
+            self.readings.add((edition_id, row.end))
+            status = STATUSES[row.status]
+            page = row.pages if status == ReadingStatus.COMPLETED else min(row.page, row.pages)
+            start = row.start or row.end or now
+            reading = Reading(reader=self.user, edition_id=edition_id, start=start,
+                              end=row.end if status != ReadingStatus.STARTED else None,
+                              status=status, current_page=page)
+            readings.append(reading)
+            if page > 0:
+                updates.append(ReadingUpdate(reading=reading, page=page,
+                                             date=max(reading.end or now, start)))
+            if reading.end is not None:
+                self.years.add(timezone.localtime(reading.end).year)
+
+        BookCopy.objects.bulk_create(copies)
+        Reading.objects.bulk_create(readings)
+        for update in updates:
+            update.reading_id = update.reading.id
+        ReadingUpdate.objects.bulk_create(updates)
+
+        sync.record_changes([*copies, *readings, *updates], self.user.id)
+        self.saga_ids.update(
+            Book.objects.filter(edition__in={r.edition_id for r in readings}
+                                | {c.edition_id for c in copies})
+            .exclude(saga=None).values_list("saga_id", flat=True)
+        )
+        self._count(BookCopy, len(copies))
+        self._count(Reading, len(readings))
+        self._count(ReadingUpdate, len(updates))
+
+    def _refresh_derived_data(self):
+        """Do what signals would have done, once for the whole import."""
+
+        core.refresh_saga_progress(self.saga_ids)
+        statistics.refresh_yearly_stats(self.user.id, self.years)
+        bump_catalog_version()
+        bump_data_version(self.user.id)
+        invalidate_snapshot()
+
+    def _count(self, model, n):
+        if n:
+            name = model.__name__
+            self.report.created[name] = self.report.created.get(name, 0) + n
+
+    def _fail(self, number, error):
+        self.report.failed += 1
+        if len(self.report.errors) < MAX_ERRORS:
+            self.report.errors.append((number, str(error)))
+
+
+def read_rows(stream, file_format):
+    """Yield rows of text 'stream', one at a time (dicts, unless JSON has other values)."""
+
+    if file_format == "json":
+        yield from _json_objects(stream)
+    else:
+        yield from csv.DictReader(stream)
+
+
+def row_from(raw):
+    """
+    ImportRow from dict 'raw', with (some of) FIELDS, or a row of a Goodreads export.
+    Raise ValueError if not valid.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError(f"Expected an object, not {type(raw).__name__}")
+
+    if "Exclusive Shelf" in raw:
+        raw = _from_goodreads(raw)
+
+    title = (raw.get("title") or "").strip()
+    authors = raw.get("authors") or []
+    if isinstance(authors, str):
+        authors = authors.split(",")
+    authors = list(dict.fromkeys(name.strip() for name in authors if name.strip()))
+    if not title or not authors:
+        raise ValueError("Title and authors are required")
+
+    status = (raw.get("status") or "").strip().lower()
+    if status and status not in STATUSES:
+        raise ValueError(f"Unknown status: {status}")
+
+    year = _int(raw.get("year"), 1)
+
+    return ImportRow(
+        title=title[:300],
+        authors=[name[:200] for name in authors],
+        year=year,
+        saga=(raw.get("saga") or "").strip()[:300],
+        index_in_saga=_int(raw.get("index_in_saga"), 1),
+        isbn=(raw.get("isbn") or "").strip()[:16],
+        edition_title=(raw.get("edition_title") or "").strip()[:300],
+        edition_year=_int(raw.get("edition_year"), year),
+        pages=max(_int(raw.get("pages"), 1), 1),
+        owned=str(raw.get("owned", "")).strip().lower() in ("1", "true", "yes", "y"),
+        status=status,
+        start=_datetime(raw.get("start")),
+        end=_datetime(raw.get("end")),
+        page=_int(raw.get("page"), 0),
+    )
+
+
+def _from_goodreads(raw):
+    """Row of a Goodreads export, as a dict with FIELDS."""
+
+    title, saga, index = raw.get("Title", ""), "", 1
+    if match := GOODREADS_SERIES.match(title):
+        title, saga, index = match["title"], match["saga"], match["index"]
+
+    authors = [raw.get("Author") or "", *(raw.get("Additional Authors") or "").split(",")]
+    isbn = (raw.get("ISBN13") or raw.get("ISBN") or "").strip('="')
+    status = GOODREADS_SHELVES.get(raw.get("Exclusive Shelf", ""), "")
+    end = raw.get("Date Read") if status == "read" else None
+
+    return {
+        "title": title,
+        "authors": authors,
+        "year": raw.get("Original Publication Year") or raw.get("Year Published"),
+        "saga": saga,
+        "index_in_saga": index,
+        "isbn": isbn,
+        "edition_year": raw.get("Year Published"),
+        "pages": raw.get("Number of Pages"),
+        "owned": "1" if _int(raw.get("Owned Copies"), 0) > 0 else "",
+        "status": status,
+        "start": raw.get("Date Started") or (None if end is None else raw.get("Date Added")),
+        "end": end,
+    }
+
+
+def _json_objects(stream, chunk_size=65536):
+    """Yield objects of a JSON array, or of JSON Lines, in 'stream', reading it in chunks."""
+
+    decoder = json.JSONDecoder()
+    buffer, eof = "", False
+    while True:
+        buffer = buffer.lstrip(" \t\r\n,[]")
+        if buffer:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Invalid JSON at end of file")
+            else:
+                yield obj
+                buffer = buffer[end:]
+                continue
+
+        if eof:
+            return
+
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def _book_key(title, author):
+    return search.normalize(title.strip()), search.normalize((author or "").strip())
+
+
+def _int(value, default):
+    if value is None or str(value).strip() == "":
+        return default
+
+    try:
+        number = int(float(value))
+    except OverflowError:  # inf
+        number = None
+    if number is None or abs(number) > MAX_INT:
+        raise ValueError(f"Number out of range: {value}")
+
+    return number
+
+
+def _datetime(value):
+    """Aware datetime from ISO 8601 (or Goodreads' YYYY/MM/DD) date or datetime. None if empty."""
+
+    if not value:
+        return None
+
+    value = str(value).strip().replace("/", "-")
+    dt = parse_datetime(value)
+    if dt is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        dt = datetime.combine(day, dt_time(12))
+
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
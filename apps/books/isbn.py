@@ -0,0 +1,100 @@
+"""
+ISBN canonicalization: any valid ISBN-10 or ISBN-13 (with or without hyphens or spaces)
+becomes the 13 digits of its ISBN-13, which is what Edition.isbn13 stores and lookups use.
+"""
+import re
+
+
+class InvalidISBN(ValueError):
+    pass
+
+
+def to_isbn13(code):
+    """ISBN-13 (as 13 digits) of ISBN 'code'. Raise InvalidISBN if not a valid ISBN."""
+
+    digits = re.sub(r"[\s-]", "", str(code)).upper()
+
+    if re.fullmatch(r"\d{9}[\dX]", digits):
+        if isbn10_check_digit(digits[:9]) != digits[9]:
+            raise InvalidISBN(f"Wrong check digit in ISBN-10: {code}")
+        return with_check_digit(f"978{digits[:9]}")
+
+    if re.fullmatch(r"97[89]\d{10}", digits):
+        if with_check_digit(digits[:12]) != digits:
+            raise InvalidISBN(f"Wrong check digit in ISBN-13: {code}")
+        return digits
+
+    raise InvalidISBN(f"Not an ISBN: {code}")
+
+
+def to_isbn13_or_blank(code):
+    """Like to_isbn13(), but return an empty string if 'code' is not a valid ISBN."""
+
+    try:
+        return to_isbn13(code)
+    except InvalidISBN:
+        return ""
+
+
+def with_check_digit(first_12):
+    """ISBN-13 made of its first 12 digits and the check digit they need."""
+
+    total = sum(int(digit) * (3 if n % 2 else 1) for n, digit in enumerate(first_12))
+
+    return f"{first_12}{-total % 10}"
+
+
+def isbn10_check_digit(first_9):
+    total = sum(int(digit) * (10 - n) for n, digit in enumerate(first_9))
+    check = -total % 11
+
+    return "X" if check == 10 else str(check)
+
+
+def normalize_editions(edition_model, chunk_size=1000):
+    """
+    Set 'isbn13' of all Editions ('edition_model' can be a historical model, in migrations),
+    'chunk_size' at a time, skipping signals. An Edition with the same ISBN-13 as a previous
+    one of its Book is left blank, to keep them unique per Book. Return dict with lists of
+    the ids of 'changed' and 'invalid' Editions, and of 'duplicates' (as (id, id of Edition
+    duplicated) tuples).
+    """
+    seen, changed, invalid, duplicates = {}, [], [], []
+    editions = edition_model.objects.order_by("id").only("id", "book_id", "isbn", "isbn13")
+
+    for chunk in _chunks(editions.iterator(chunk_size=chunk_size), chunk_size):
+        to_update = []
+        for edition in chunk:
+            isbn13 = to_isbn13_or_blank(edition.isbn)
+            if not isbn13:
+                invalid.append(edition.id)
+            elif (edition.book_id, isbn13) in seen:
+                duplicates.append((edition.id, seen[(edition.book_id, isbn13)]))
+                isbn13 = ""
+            else:
+                seen[(edition.book_id, isbn13)] = edition.id
+
+            if edition.isbn13 != isbn13:
+                edition.isbn13 = isbn13
+                to_update.append(edition)
+
+        edition_model.objects.bulk_update(to_update, ["isbn13"])
+        changed.extend(edition.id for edition in to_update)
+
+    return {
+        "changed": changed,
+        "invalid": invalid,
+        "duplicates": duplicates,
+    }
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
@@ -0,0 +1,106 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.books import benchmarks
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Time registered benchmark cases against generated datasets, in a throwaway "
+        "test database. Or compare two result files with --compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--cases",
+            nargs="+",
+            choices=sorted(benchmarks.BENCHMARKS),
+            default=sorted(benchmarks.BENCHMARKS),
+            help="Cases to run. Default: all.",
+        )
+        parser.add_argument(
+            "--scales",
+            nargs="+",
+            type=int,
+            default=benchmarks.DEFAULT_SCALES,
+            help="Dataset sizes, as amount of ReadingUpdates. Default: %(default)s.",
+        )
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for dataset generation.")
+        parser.add_argument("--output", help="Save results as JSON to this file.")
+        parser.add_argument(
+            "--compare",
+            nargs=2,
+            metavar=("BASE", "NEW"),
+            help="Compare two result files instead of running, and fail on regressions.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Relative slowdown considered a regression. Default: %(default)s.",
+        )
+        parser.add_argument(
+            "--metric",
+            choices=("p50_ms", "p95_ms", "min_ms"),
+            default="p50_ms",
+            help="Timing to compare. Default: %(default)s.",
+        )
+
+    def handle(self, *args, **options):
+        if options["compare"]:
+            return self._compare(*options["compare"], options["threshold"], options["metric"])
+
+        results = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "vendor": connection.vendor,
+                "repeat": options["repeat"],
+                "seed": options["seed"],
+            },
+            "results": self._run(options),
+        }
+
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
+
+    def _run(self, options):
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            results = []
+            for scale in options["scales"]:
+                user = benchmarks.build_dataset(scale, seed=options["seed"])
+                for case in options["cases"]:
+                    result = benchmarks.run_case(case, user, repeat=options["repeat"])
+                    result["scale"] = scale
+                    results.append(result)
+                    self.stderr.write(
+                        f"{case:>10} @ {scale:>8}: p50 {result['p50_ms']:8.1f} ms, "
+                        f"p95 {result['p95_ms']:8.1f} ms, {result['queries']:4d} queries"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        return results
+
+    def _compare(self, base_file, new_file, threshold, metric):
+        with open(base_file) as f:
+            base = json.load(f)
+        with open(new_file) as f:
+            new = json.load(f)
+
+        regressions = benchmarks.compare(base, new, threshold=threshold, metric=metric)
+        if regressions:
+            raise CommandError("Regressions found:\n" + "\n".join(regressions))
+
+        self.stdout.write("No regressions found.")
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from apps.readings.lib.compaction import (
+    chunks_of,
+    coalesce_window,
+    delete_reading_updates,
+    updates_to_coalesce,
+)
+from apps.readings.models import Reading, ReadingUpdate
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Coalesce existing ReadingUpdate histories: of each run of updates of a Reading "
+        "less than --minutes apart, keep only the first and last. Readings are processed, "
+        "and their updates deleted, a chunk at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes",
+            type=float,
+            default=None,
+            help="Coalesce window. Default: READING_UPDATE_COALESCE_MINUTES setting.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10_000,
+                            help="About how many ReadingUpdates to process at a time.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report.")
+
+    def handle(self, *args, **options):
+        if options["minutes"] is not None:
+            window = timedelta(minutes=options["minutes"])
+        else:
+            window = coalesce_window()
+
+        if not window:
+            self.stdout.write("Coalescing is disabled: nothing to do.")
+            return
+
+        # No cursor is left open over ReadingUpdates while deleting them:
+        readings = list(
+            Reading.objects.annotate(n_updates=Count("readingupdate"))
+            .filter(n_updates__gt=2)  # others are kept
+            .order_by("id")
+            .values_list("id", "reader_id", "n_updates")
+        )
+
+        n_removed = 0
+        for chunk in chunks_of(readings, options["chunk_size"]):
+            readers = {reading_id: reader_id for reading_id, reader_id, _ in chunk}
+            rows = ReadingUpdate.objects.filter(reading_id__in=readers).order_by(
+                "reading_id", "date", "id",
+            ).values_list("id", "reading_id", "date")
+
+            update_ids_by_user = {}
+            for update_id, reading_id, _ in updates_to_coalesce(rows, window):
+                update_ids_by_user.setdefault(readers[reading_id], []).append(update_id)
+            n_removed += sum(len(ids) for ids in update_ids_by_user.values())
+
+            if not options["dry_run"]:
+                delete_reading_updates(update_ids_by_user)  # in a transaction of its own
+
+        if options["dry_run"]:
+            self.stdout.write(f"Would remove {n_removed} ReadingUpdates.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Removed {n_removed} ReadingUpdates."))
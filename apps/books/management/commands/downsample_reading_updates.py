@@ -0,0 +1,99 @@
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.db.models import Count
+
+from apps.readings.lib.compaction import chunks_of, delete_reading_updates, updates_to_downsample
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.models import Reading, ReadingUpdate
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Downsample ReadingUpdate histories of closed (completed or DNF) Readings to the "
+        "first and last update of each day, which keeps their start, end and daily totals. "
+        "Readings are processed, and their updates deleted, a chunk at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=10_000,
+                            help="About how many ReadingUpdates to process at a time.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report.")
+
+    def handle(self, *args, **options):
+        n_rows = ReadingUpdate.objects.count()
+        bytes_per_row = self._table_bytes() / n_rows if n_rows else 0
+
+        # No cursor is left open over ReadingUpdates while deleting them:
+        readings = list(
+            Reading.objects.filter(status__in=(ReadingStatus.COMPLETED, ReadingStatus.DNF))
+            .annotate(n_updates=Count("readingupdate"))
+            .order_by("id")
+            .values_list("id", "reader_id", "n_updates")
+        )
+        n_closed = sum(n_updates for _, _, n_updates in readings)
+        readings = [reading for reading in readings if reading[2] > 2]  # others are kept
+
+        n_removed = 0
+        for chunk in chunks_of(readings, options["chunk_size"]):
+            ids, reading_ids, timestamps = self._arrays(chunk)
+            remove = updates_to_downsample(reading_ids, timestamps)
+            n_removed += int(remove.sum())
+
+            if not options["dry_run"] and remove.any():
+                readers = {reading_id: reader_id for reading_id, reader_id, _ in chunk}
+                update_ids_by_user = {}
+                for update_id, reading_id in zip(ids[remove].tolist(),
+                                                 reading_ids[remove].tolist()):
+                    update_ids_by_user.setdefault(readers[reading_id], []).append(update_id)
+                delete_reading_updates(update_ids_by_user)  # in a transaction of its own
+
+        percent = 100 * n_removed / n_closed if n_closed else 0
+        megabytes = n_removed * bytes_per_row / 2 ** 20
+        summary = (
+            f"{n_removed} of {n_closed} ReadingUpdates of closed Readings ({percent:.1f}%), "
+            f"about {megabytes:.1f} MB of table and index space"
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(f"Would remove {summary}.")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Removed {summary}. VACUUM (FULL, on PostgreSQL) returns it to the OS."
+            ))
+
+    @staticmethod
+    def _arrays(chunk):
+        """Ids, Reading ids and timestamps of the ReadingUpdates of Readings in 'chunk'."""
+
+        rows = ReadingUpdate.objects.filter(
+            reading_id__in=[reading_id for reading_id, _, _ in chunk],
+        ).order_by("reading_id", "date", "id").values_list("id", "reading_id", "date")
+        ids, reading_ids, dates = zip(*rows)
+
+        return (
+            np.array(ids, dtype=np.int64),
+            np.array(reading_ids, dtype=np.int64),
+            np.array([date.timestamp() for date in dates]),
+        )
+
+    @staticmethod
+    def _table_bytes():
+        """Size of the ReadingUpdate table and its indexes, in bytes, or 0 if unknown."""
+
+        table = ReadingUpdate._meta.db_table
+        sql = {
+            "sqlite": "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                      "(SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+            "postgresql": "SELECT pg_total_relation_size(%s)",
+        }.get(connection.vendor)
+        if sql is None:
+            return 0
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [table])
+                return cursor.fetchone()[0] or 0
+        except DatabaseError:  # e.g. SQLite built without dbstat
+            return 0
@@ -0,0 +1,38 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.books.exporter import CHUNK_SIZE, FORMATS, TABLES, export
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Export a table of the library of a user (Books, Editions, BookCopies, Readings or "
+        "ReadingUpdates) as CSV, JSON Lines or Parquet, streaming it in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=TABLES)
+        parser.add_argument("--user", required=True, help="Username of the reader.")
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--output", help="Default: standard output.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No such user: {options['user']}")
+
+        chunks = export(user, options["table"], options["format"], options["chunk_size"])
+
+        if options["output"] is None:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+
+        with open(options["output"], "wb") as output:
+            for chunk in chunks:
+                output.write(chunk)
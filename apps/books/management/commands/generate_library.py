@@ -0,0 +1,36 @@
+import time
+from dataclasses import fields
+
+from django.core.management.base import BaseCommand
+
+from apps.books.generator import GeneratorSettings, LibraryGenerator
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Populate the database with a deterministic, synthetic library: Authors, Sagas, "
+        "Books, Editions, and Users with years of Readings, ReadingUpdates and BookCopies."
+    )
+
+    def add_arguments(self, parser):
+        for field in fields(GeneratorSettings):
+            parser.add_argument(
+                f"--{field.name.replace('_', '-')}",
+                type=field.type,
+                default=field.default,
+                help="Default: %(default)s.",
+            )
+
+    def handle(self, *args, **options):
+        settings = GeneratorSettings(**{f.name: options[f.name] for f in fields(GeneratorSettings)})
+        generator = LibraryGenerator(settings, log=self.stdout.write)
+
+        t0 = time.perf_counter()
+        generator.run()
+        elapsed = time.perf_counter() - t0
+
+        n_rows = sum(generator.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {n_rows} rows in {elapsed:.1f} s ({n_rows / elapsed:.0f} rows/s)."
+        ))
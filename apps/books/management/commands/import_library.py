@@ -0,0 +1,37 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.books.importer import BATCH_SIZE, LibraryImporter
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Import a library export file (CSV, Goodreads CSV export, JSON or JSON Lines) as the "
+        "Books, Editions, BookCopies and Readings of a user, streaming it in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--user", required=True, help="Username of the reader.")
+        parser.add_argument("--format", choices=("csv", "json"), default=None,
+                            help="Default: from the file extension.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No such user: {options['user']}")
+
+        path = options["path"]
+        file_format = options["format"] or ("json" if path.endswith((".json", ".jsonl")) else "csv")
+        importer = LibraryImporter(user, options["batch_size"], log=self.stdout.write)
+
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            report = importer.run(stream, file_format)
+
+        for number, error in report.errors:
+            self.stdout.write(f"Row {number}: {error}")
+
+        self.stdout.write(self.style.SUCCESS(str(report)))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.books import search
+from apps.books.isbn import normalize_editions
+from apps.books.models import Edition
+from apps.readings.lib import sync
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Recompute the canonical ISBN-13 of all Editions, in chunks, and report invalid ISBNs "
+        "and Editions of the same Book with the same ISBN (left without ISBN-13)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        report = normalize_editions(Edition, options["chunk_size"])
+
+        # Editions were updated in bulk, without the signals that do this:
+        changed = report["changed"]
+        search.index("edition", changed)
+        sync.record_changes(Edition.objects.filter(id__in=changed).only("id"), None)
+
+        for edition_id, original_id in report["duplicates"]:
+            self.stdout.write(f"Edition {edition_id} duplicates the ISBN of Edition {original_id}")
+
+        self.stdout.write(
+            f"{len(changed)} Editions changed, {len(report['invalid'])} with invalid ISBN, "
+            f"{len(report['duplicates'])} duplicated."
+        )
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.readings.lib import sync
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Delete SyncChanges older than SYNC_RETENTION_DAYS. Clients with a token that old "
+        "must sync again from scratch."
+    )
+
+    def handle(self, *args, **kwargs):
+        n_rows = sync.prune_changes()
+        self.stdout.write(
+            f"Pruned {n_rows} SyncChanges older than {settings.SYNC_RETENTION_DAYS} days."
+        )
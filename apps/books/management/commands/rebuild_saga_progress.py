@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.books import core
+
+
+class Command(BaseCommand):
+
+    help = "Rebuild the per-user SagaProgress rollup from scratch."
+
+    def handle(self, *args, **kwargs):
+        n_rows = core.rebuild_saga_progress()
+        self.stdout.write(f"Rebuilt {n_rows} SagaProgress rows.")
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.books import search
+
+
+class Command(BaseCommand):
+
+    help = "Rebuild the full-text search index (SearchEntry rows) from scratch."
+
+    def handle(self, *args, **kwargs):
+        n_rows = search.rebuild_search_index()
+        self.stdout.write(f"Rebuilt {n_rows} SearchEntry rows.")
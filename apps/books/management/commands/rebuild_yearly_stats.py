@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.books import statistics
+
+
+class Command(BaseCommand):
+
+    help = "Rebuild the per-user, per-year YearlyReadingStats rollup from scratch."
+
+    def handle(self, *args, **kwargs):
+        n_rows = statistics.rebuild_yearly_stats()
+        self.stdout.write(f"Rebuilt {n_rows} YearlyReadingStats rows.")
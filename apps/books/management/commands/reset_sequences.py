@@ -0,0 +1,26 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Set the id sequences of all tables past the highest id in use, so that new rows get "
+        "free ids. PostgreSQL needs it after loading rows with explicit ids (e.g. restoring "
+        "a dump). SQLite doesn't."
+    )
+
+    def handle(self, *args, **kwargs):
+        statements = connection.ops.sequence_reset_sql(no_style(), apps.get_models())
+
+        if not statements:
+            self.stdout.write(f"No sequences to reset on {connection.vendor}.")
+            return
+
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+        self.stdout.write(f"Reset {len(statements)} sequences.")
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0024_remove_readingupdate_reading_delete_reading_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SagaProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('books_read', models.PositiveIntegerField(default=0, verbose_name='Books read')),
+                ('books_owned', models.PositiveIntegerField(default=0, verbose_name='Books owned')),
+                ('books_total', models.PositiveIntegerField(default=0, verbose_name='Books in saga')),
+                ('saga', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='books.saga')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'saga'), name='unique_saga_progress_per_user')],
+            },
+        ),
+    ]
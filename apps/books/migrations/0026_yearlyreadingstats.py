@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0025_sagaprogress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearlyReadingStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(verbose_name='Year')),
+                ('books_completed', models.PositiveIntegerField(default=0, verbose_name='Books completed')),
+                ('pages_completed', models.PositiveIntegerField(default=0, verbose_name='Pages of books completed')),
+                ('books_dnf', models.PositiveIntegerField(default=0, verbose_name='Books not finished')),
+                ('partial_books', models.FloatField(default=0.0, verbose_name='Fraction of open books read')),
+                ('partial_pages', models.PositiveIntegerField(default=0, verbose_name='Pages of open books read')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'year'), name='unique_yearly_stats_per_user')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:56
+
+from django.db import migrations, models
+
+
+# Full-text index of SearchEntry.text, which depends on the database:
+SQL = {
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE books_searchentry_fts
+        USING fts5(text, content='books_searchentry', content_rowid='id')
+        """,
+        """
+        CREATE TRIGGER books_searchentry_ai AFTER INSERT ON books_searchentry BEGIN
+            INSERT INTO books_searchentry_fts(rowid, text) VALUES (new.id, new.text);
+        END
+        """,
+        """
+        CREATE TRIGGER books_searchentry_ad AFTER DELETE ON books_searchentry BEGIN
+            INSERT INTO books_searchentry_fts(books_searchentry_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+        """,
+        """
+        CREATE TRIGGER books_searchentry_au AFTER UPDATE ON books_searchentry BEGIN
+            INSERT INTO books_searchentry_fts(books_searchentry_fts, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO books_searchentry_fts(rowid, text) VALUES (new.id, new.text);
+        END
+        """,
+    ],
+    "postgresql": [
+        """
+        CREATE INDEX books_searchentry_text_gin
+        ON books_searchentry USING GIN (to_tsvector('simple', text))
+        """,
+    ],
+}
+REVERSE_SQL = {
+    "sqlite": [
+        "DROP TRIGGER books_searchentry_ai",
+        "DROP TRIGGER books_searchentry_ad",
+        "DROP TRIGGER books_searchentry_au",
+        "DROP TABLE books_searchentry_fts",
+    ],
+    "postgresql": ["DROP INDEX books_searchentry_text_gin"],
+}
+
+
+def create_full_text_index(apps, schema_editor):
+    for sql in SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_full_text_index(apps, schema_editor):
+    for sql in REVERSE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0026_yearlyreadingstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=10, verbose_name='Kind')),
+                ('object_id', models.IntegerField(verbose_name='Object id')),
+                ('book_id', models.IntegerField(null=True, verbose_name='Book id')),
+                ('title', models.CharField(max_length=300, verbose_name='Title')),
+                ('text', models.TextField(verbose_name='Text')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_entry')],
+            },
+        ),
+        migrations.RunPython(create_full_text_index, drop_full_text_index),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:02
+
+from django.db import migrations, models
+
+from apps.books.isbn import normalize_editions
+
+
+def fill_isbn13(apps, schema_editor):
+    """Duplicates (within a Book) are left blank. See the 'normalize_isbns' command."""
+
+    normalize_editions(apps.get_model("books", "Edition"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0027_searchentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='edition',
+            name='isbn13',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=13, verbose_name='ISBN-13'),
+        ),
+        migrations.RunPython(fill_isbn13, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='edition',
+            constraint=models.UniqueConstraint(condition=models.Q(('isbn13', ''), _negated=True), fields=('book', 'isbn13'), name='unique_isbn13_per_book'),
+        ),
+    ]
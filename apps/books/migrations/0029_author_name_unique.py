@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:06
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicated_authors(apps, schema_editor):
+    """Books of Authors with the same name go to the first of them, and the rest are deleted."""
+
+    Author = apps.get_model("books", "Author")
+    Book = apps.get_model("books", "Book")
+    SearchEntry = apps.get_model("books", "SearchEntry")
+    Through = Book.authors.through
+
+    duplicated = Author.objects.values("name").annotate(n=Count("id"), first=Min("id")).filter(
+        n__gt=1,
+    )
+    for row in duplicated:
+        others = list(Author.objects.filter(name=row["name"]).exclude(id=row["first"]))
+        for other in others:
+            books_of_first = Through.objects.filter(author_id=row["first"]).values("book_id")
+            Through.objects.filter(author=other).exclude(book_id__in=books_of_first).update(
+                author_id=row["first"],
+            )
+
+        other_ids = [other.id for other in others]
+        Author.objects.filter(id__in=other_ids).delete()  # and links to Books of the first
+        SearchEntry.objects.filter(kind="author", object_id__in=other_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0028_edition_isbn13'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicated_authors, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='author',
+            name='name',
+            field=models.CharField(max_length=200, unique=True, verbose_name='Name'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:45
+
+from django.db import migrations
+
+from apps.books.search import rebuild_search_index
+
+
+def fill_search_index(apps, schema_editor):
+    """Index the existing catalog (after 0028, since Editions are found by their ISBN-13)."""
+
+    rebuild_search_index(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0029_author_name_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
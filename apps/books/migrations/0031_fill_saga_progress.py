@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:10
+
+from django.db import migrations
+
+from apps.books.core import rebuild_saga_progress
+
+
+def fill_saga_progress(apps, schema_editor):
+    """Compute SagaProgress of the existing Readings and BookCopies (0025 created it empty)."""
+
+    rebuild_saga_progress(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0030_fill_search_index'),
+        ('readings', '0009_syncchange_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_saga_progress, migrations.RunPython.noop),
+    ]
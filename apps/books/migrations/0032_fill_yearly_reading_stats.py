@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:20
+
+from django.db import migrations
+
+from apps.books.statistics import rebuild_yearly_stats
+
+
+def fill_yearly_reading_stats(apps, schema_editor):
+    """Compute YearlyReadingStats of the existing Readings (0026 created it empty)."""
+
+    rebuild_yearly_stats(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0031_fill_saga_progress'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_yearly_reading_stats, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,16 @@
 from django.db import models
+from django.db.models import Case, Exists, OuterRef, Q, Value, When
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from apps.books.isbn import to_isbn13_or_blank
 from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.lib.snapshot import current_snapshot, snapshot_for
 from apps.readings.models import Reading, ReadingUpdate
 
 
 class Author(models.Model):
-    name = models.CharField('Name', max_length=200)
+    name = models.CharField('Name', max_length=200, unique=True)
 
     objects = models.Manager()
 
@@ -32,17 +35,22 @@ class Saga(models.Model):
     def completed_by(self, user):
         """True if all books in saga read by user. False otherwise."""
 
-        return not Book.objects.filter(saga=self).exclude(reading__reader=user, reading__end__isnull=False).exists()
+        return self.progress_for(user).is_completed
 
     def owned_by(self, user):
-        """TODO
-        True if all books in saga owned (read or not) by user. False otherwise."""
+        """True if all books in saga owned (read or not) by user. False otherwise."""
 
-        for book in self.books:
-            if not book.owned:
-                return False
+        return self.progress_for(user).is_owned
 
-        return True
+    def progress_for(self, user):
+        """SagaProgress of user for self. An empty (unsaved) one if user has none."""
+
+        progress = SagaProgress.objects.filter(saga=self, user=user).first()
+
+        if progress is None:
+            progress = SagaProgress(saga=self, user=user, books_total=self.book_set.count())
+
+        return progress
 
     def __str__(self):
         return self.name
@@ -51,6 +59,35 @@ class Saga(models.Model):
         return self.__str__()
 
 
+class BookQuerySet(models.QuerySet):
+
+    def with_status_for(self, user):
+        """
+        Annotate Books with what 'user' did with them: 'is_read', 'is_reading' and 'is_owned'
+        booleans, and a 'user_status' summary ("read", "reading", "owned" or "not-owned").
+        """
+        user_readings = Reading.objects.filter(edition__book=OuterRef("id"), reader=user)
+
+        return self.annotate(
+            is_read=Exists(user_readings.filter(status=ReadingStatus.COMPLETED)),
+            is_reading=Exists(user_readings.filter(end=None)),
+            is_owned=Exists(BookCopy.objects.filter(edition__book=OuterRef("id"), owner=user)),
+        ).annotate(
+            user_status=Case(
+                When(is_read=True, then=Value("read")),
+                When(is_reading=True, then=Value("reading")),
+                When(is_owned=True, then=Value("owned")),
+                default=Value("not-owned"),
+                output_field=models.CharField(),
+            ),
+        )
+
+    def statuses_for(self, user):
+        """Return {book id: status} for user, for all Books in self. See with_status_for()."""
+
+        return dict(self.with_status_for(user).values_list("id", "user_status"))
+
+
 class Book(models.Model):
     authors = models.ManyToManyField(Author)
     saga = models.ForeignKey(Saga, blank=True, on_delete=models.CASCADE, default=None, null=True)
@@ -59,7 +96,14 @@ class Book(models.Model):
     index_in_saga = models.IntegerField("Index in saga", default=1)
     owned = models.BooleanField("Owned", default=True)
 
-    objects = models.Manager()
+    objects = BookQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_saga_id = instance.__dict__.get("saga_id")  # to detect saga changes
+
+        return instance
 
     def mark_started_by(self, user):
         """Mark self as started to read."""
@@ -74,30 +118,33 @@ class Book(models.Model):
             ReadingUpdate(reading=reading, page=pages, date=timezone.now()).save()
 
     def status(self, user):
-        """Whether book is not owned, owned but not read, reading, or read."""
-
-        if self.is_already_read_by(user):
-            return "read"
-
-        if self.is_currently_being_read_by(user):
-            return "reading"
+        """Whether book is not owned, owned but not read, reading, or read, by user."""
 
-        if self.owned:
-            return "owned"
-
-        return "not-owned"
+        return Book.objects.filter(pk=self.pk).statuses_for(user).get(self.pk)
 
     def is_currently_being_read_by(self, user):
         """Returns True if it is currently being read. False otherwise."""
 
+        snapshot = snapshot_for(user)
+        if snapshot is not None:
+            return snapshot.is_reading(self.pk)
+
         return Reading.objects.filter(edition__book=self, reader=user, end=None).exists()
 
     def is_already_read_by(self, user):
         """Returns True if it has already been read by user. False otherwise."""
 
+        snapshot = snapshot_for(user)
+        if snapshot is not None:
+            return snapshot.has_read(self.pk)
+
         return Reading.objects.filter(edition__book=self, reader=user, status=ReadingStatus.COMPLETED).exists()
 
     def is_owned_by(self, user):
+        snapshot = snapshot_for(user)
+        if snapshot is not None:
+            return snapshot.owns_book(self.pk)
+
         return BookCopy.objects.filter(edition__book=self, owner=user).exists()
 
     def pages_read_by(self, user):
@@ -137,14 +184,46 @@ class Book(models.Model):
 class Edition(models.Model):
     book = models.ForeignKey(Book, blank=True, on_delete=models.CASCADE)
     isbn = models.CharField("ISBN", max_length=16)
+    isbn13 = models.CharField("ISBN-13", max_length=13, blank=True, default="", db_index=True)
     title = models.CharField("Title", max_length=300)
     year = models.IntegerField("Year", default=1)
     pages = models.IntegerField("Pages", default=1)
 
     objects = models.Manager()
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["book", "isbn13"], condition=~Q(isbn13=""),
+                                    name="unique_isbn13_per_book"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_pages = instance.__dict__.get("pages")  # to detect page count changes
+
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Keep canonical ISBN-13 of 'isbn' (blank if it is not a valid ISBN) in 'isbn13'."""
+
+        self.isbn13 = to_isbn13_or_blank(self.isbn)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "isbn" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "isbn13"}
+
+        super().save(*args, **kwargs)
+
     @property
     def owned(self):
+        """
+        Whether the user of the current request owns a copy of self. Outside
+        of requests, whether anybody does.
+        """
+        snapshot = current_snapshot()
+        if snapshot is not None:
+            return snapshot.owns_edition(self.pk)
+
         return BookCopy.objects.filter(edition=self).exists()
 
     def __str__(self):
@@ -160,3 +239,97 @@ class BookCopy(models.Model):
 
     def __str__(self):
         return f"Copy of {self.edition}, owned by {self.owner}"
+
+
+class SagaProgress(models.Model):
+    """
+    How many Books of a Saga a User has read and owns. This is a rollup kept current
+    by signals (see signals.py), so that saga completion can be checked without
+    looking at each Book. Rebuild from scratch with the 'rebuild_saga_progress' command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    saga = models.ForeignKey(Saga, on_delete=models.CASCADE)
+    books_read = models.PositiveIntegerField("Books read", default=0)
+    books_owned = models.PositiveIntegerField("Books owned", default=0)
+    books_total = models.PositiveIntegerField("Books in saga", default=0)
+
+    objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "saga"], name="unique_saga_progress_per_user"),
+        ]
+
+    @property
+    def is_completed(self):
+        return self.books_read >= self.books_total
+
+    @property
+    def is_owned(self):
+        return self.books_owned >= self.books_total
+
+    def __str__(self):
+        return f"{self.books_read}/{self.books_total} of {self.saga} read by {self.user}"
+
+
+class YearlyReadingStats(models.Model):
+    """
+    Reading figures of a User in a year: Readings completed (and their pages) or
+    abandoned (DNF) that year, and the partial progress in still open Readings
+    (only in the row of the current year). This is a rollup kept current by signals
+    (see signals.py and statistics.py). Rebuild with the 'rebuild_yearly_stats' command.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    year = models.IntegerField("Year")
+    books_completed = models.PositiveIntegerField("Books completed", default=0)
+    pages_completed = models.PositiveIntegerField("Pages of books completed", default=0)
+    books_dnf = models.PositiveIntegerField("Books not finished", default=0)
+    partial_books = models.FloatField("Fraction of open books read", default=0.0)
+    partial_pages = models.PositiveIntegerField("Pages of open books read", default=0)
+
+    objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "year"], name="unique_yearly_stats_per_user"),
+        ]
+
+    @property
+    def books_read(self):
+        return self.books_completed + (self.partial_books if self.is_current else 0)
+
+    @property
+    def pages_read(self):
+        return self.pages_completed + (self.partial_pages if self.is_current else 0)
+
+    @property
+    def is_current(self):
+        """Partial progress only counts in the current year (a past row may keep it, stale)."""
+
+        return self.year == timezone.now().year
+
+    def __str__(self):
+        return f"{self.books_read:.1f} books read by {self.user} in {self.year}"
+
+
+class SearchEntry(models.Model):
+    """
+    Searchable text of a Book, Author, Saga or Edition ('kind'), indexed for full-text
+    search by the database (see search.py). Kept current by signals (see signals.py).
+    Rebuild with the 'rebuild_search_index' command.
+    """
+    kind = models.CharField("Kind", max_length=10)
+    object_id = models.IntegerField("Object id")
+    book_id = models.IntegerField("Book id", null=True)  # the Book of an Edition
+    title = models.CharField("Title", max_length=300)
+    text = models.TextField("Text")
+
+    objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="unique_search_entry"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
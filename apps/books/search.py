@@ -0,0 +1,207 @@
+"""
+Full-text search over the catalog: Books, Authors, Sagas and Editions.
+
+Each of them has a SearchEntry row with the text it can be found by (accents removed and
+lowercased), kept current by signals (see signals.py). The database indexes that text: an
+FTS5 table on SQLite, and a GIN index over its tsvector on PostgreSQL (both created by
+migration 0027, and filled by 0030). Results of all kinds come ranked together, a page at
+a time.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from django.apps import apps as django_apps
+from django.db import connection, transaction
+from django.urls import reverse
+
+from .models import SearchEntry
+
+
+KINDS = ("book", "author", "saga", "edition")
+PAGE_SIZE = 20
+BATCH_SIZE = 1000
+FTS_TABLE = "books_searchentry_fts"
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    object_id: int
+    book_id: int
+    title: str
+    rank: float
+    status: str = None  # of the Book, for the user searching
+
+    @property
+    def url(self):
+        if self.kind == "author":
+            return reverse("books:bibliography", args=[self.object_id])
+
+        if self.kind == "saga":
+            return reverse("books:sagas")
+
+        return reverse("books:book_detail", args=[self.book_id])
+
+
+@dataclass
+class SearchPage:
+    results: list
+    number: int
+    has_next: bool
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+
+def normalize(text):
+    """Lowercase 'text', without accents."""
+
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def search(query, kind=None, page=1, page_size=PAGE_SIZE):
+    """
+    SearchPage number 'page' of entries (of given 'kind', or of all if None) matching all
+    the words in 'query', the last of them as a prefix. Best ranked first.
+    """
+    words = re.findall(r"\w+", normalize(query))
+    if not words:
+        return SearchPage([], page, False)
+
+    offset = (page - 1) * page_size
+    if connection.vendor == "sqlite":
+        rows = _search_sqlite(words, kind, page_size + 1, offset)
+    elif connection.vendor == "postgresql":
+        rows = _search_postgresql(words, kind, page_size + 1, offset)
+    else:
+        rows = _search_fallback(words, kind, page_size + 1, offset)
+
+    results = [SearchResult(*row) for row in rows]
+
+    return SearchPage(results[:page_size], page, len(results) > page_size)
+
+
+def index(kind, object_ids):
+    """(Re)create the SearchEntries of objects of 'kind' with ids 'object_ids'."""
+
+    object_ids = set(object_ids)
+    if not object_ids:
+        return
+
+    with transaction.atomic():
+        remove(kind, object_ids)
+        SearchEntry.objects.bulk_create(_entries_of(kind, object_ids), batch_size=BATCH_SIZE)
+
+
+def remove(kind, object_ids):
+    SearchEntry.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def rebuild_search_index(apps=django_apps):
+    """
+    Recreate all SearchEntries from scratch, with the models of 'apps' (historical ones, in
+    a migration). Return amount of them.
+    """
+    entry_model = apps.get_model("books", "SearchEntry")
+    with transaction.atomic():
+        entry_model.objects.all().delete()
+        for kind in KINDS:
+            entry_model.objects.bulk_create(_entries_of(kind, apps=apps), batch_size=BATCH_SIZE)
+
+    return entry_model.objects.count()
+
+
+def _entries_of(kind, object_ids=None, apps=django_apps):
+    """Yield (unsaved) SearchEntries of objects of 'kind' with 'object_ids' (or all)."""
+
+    Book, Edition, Author, Saga = (apps.get_model("books", name)
+                                   for name in ("Book", "Edition", "Author", "Saga"))
+    entry_model = apps.get_model("books", "SearchEntry")
+
+    def entry(kind, object_id, book_id, title, words):
+        return entry_model(kind=kind, object_id=object_id, book_id=book_id, title=title[:300],
+                           text=normalize(" ".join(words)))
+
+    if kind == "book":
+        books = Book.objects.select_related("saga").prefetch_related("authors")
+        if object_ids is not None:
+            books = books.filter(id__in=object_ids)
+        for book in books.iterator(chunk_size=BATCH_SIZE):
+            words = [book.title, *(author.name for author in book.authors.all())]
+            if book.saga is not None:
+                words.append(book.saga.name)
+            yield entry(kind, book.id, book.id, book.title, words)
+
+    elif kind == "edition":
+        editions = Edition.objects.values_list("id", "book_id", "title", "isbn", "isbn13",
+                                               "book__title")
+        if object_ids is not None:
+            editions = editions.filter(id__in=object_ids)
+        for edition_id, book_id, title, isbn, isbn13, book_title in editions.iterator(BATCH_SIZE):
+            words = [title, isbn, isbn13, book_title]
+            yield entry(kind, edition_id, book_id, f"{title} ({isbn})", words)
+
+    else:
+        model = Author if kind == "author" else Saga
+        objects = model.objects.values_list("id", "name")
+        if object_ids is not None:
+            objects = objects.filter(id__in=object_ids)
+        for object_id, name in objects.iterator(BATCH_SIZE):
+            yield entry(kind, object_id, None, name, [name])
+
+
+def _search_sqlite(words, kind, limit, offset):
+    """Rows matching 'words' in the FTS5 table. bm25() is lower for better matches."""
+
+    match = " ".join(f'"{word}"' for word in words) + "*"
+    kind_filter = "AND e.kind = %s" if kind else ""
+    sql = f"""
+        SELECT e.kind, e.object_id, e.book_id, e.title, -bm25({FTS_TABLE}) AS rank
+        FROM {FTS_TABLE} JOIN books_searchentry e ON e.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s {kind_filter}
+        ORDER BY bm25({FTS_TABLE}), e.id
+        LIMIT %s OFFSET %s
+    """
+
+    return _fetch(sql, [match, *([kind] if kind else []), limit, offset])
+
+
+def _search_postgresql(words, kind, limit, offset):
+    """Rows matching 'words' with the GIN-indexed tsvector of their text."""
+
+    tsquery = " & ".join(words) + ":*"
+    kind_filter = "AND kind = %s" if kind else ""
+    sql = f"""
+        SELECT kind, object_id, book_id, title,
+               ts_rank(to_tsvector('simple', text), query) AS rank
+        FROM books_searchentry, to_tsquery('simple', %s) query
+        WHERE to_tsvector('simple', text) @@ query {kind_filter}
+        ORDER BY rank DESC, id
+        LIMIT %s OFFSET %s
+    """
+
+    return _fetch(sql, [tsquery, *([kind] if kind else []), limit, offset])
+
+
+def _search_fallback(words, kind, limit, offset):
+    """Unindexed and unranked substring search, for other databases."""
+
+    entries = SearchEntry.objects.all()
+    if kind:
+        entries = entries.filter(kind=kind)
+    for word in words:
+        entries = entries.filter(text__contains=word)
+
+    rows = entries.order_by("title", "id").values_list("kind", "object_id", "book_id", "title")
+
+    return [(*row, 0.) for row in rows[offset:offset + limit]]
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
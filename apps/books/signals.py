@@ -0,0 +1,286 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import core, search, statistics
+from .models import Author, Book, BookCopy, Edition, Saga
+from apps.readings.lib import sync
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.lib.snapshot import invalidate_snapshot
+from apps.readings.models import Reading, ReadingUpdate
+from biblio.core import bump_catalog_version, bump_data_version
+from biblio.models import UserPreferences
+
+
+@receiver(post_save, sender=Reading)
+@receiver(post_save, sender=ReadingUpdate)
+@receiver(post_save, sender=BookCopy)
+@receiver(post_delete, sender=Reading)
+@receiver(post_delete, sender=ReadingUpdate)
+@receiver(post_delete, sender=BookCopy)
+def library_changed(sender, **kwargs):
+    """Writes to the library of a user make the LibrarySnapshot of the request stale."""
+
+    invalidate_snapshot()
+
+
+@receiver(post_save, sender=Reading)
+@receiver(post_delete, sender=Reading)
+def reading_changed(sender, instance, **kwargs):
+    """Anything cached from the reading data of user is stale after writes to it."""
+
+    bump_data_version(instance.reader_id)
+
+
+@receiver(post_save, sender=ReadingUpdate)
+@receiver(post_delete, sender=ReadingUpdate)
+def reading_update_version(sender, instance, origin=None, **kwargs):
+    if _deleted_in_bulk(origin):
+        return
+
+    bump_data_version(instance.reading.reader_id)
+
+
+@receiver(post_save, sender=Reading)
+@receiver(post_delete, sender=Reading)
+def log_reading_change(sender, instance, signal, **kwargs):
+    """Log writes to synced models, for clients to fetch only what changed (see lib/sync.py)."""
+
+    sync.record_change(instance, instance.reader_id, deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=ReadingUpdate)
+@receiver(post_delete, sender=ReadingUpdate)
+def log_reading_update_change(sender, instance, signal, origin=None, **kwargs):
+    """
+    A saved ReadingUpdate moves its Reading too: both are logged with one query. Clients
+    drop the ReadingUpdates of a deleted Reading with it, so its tombstone is enough.
+    """
+
+    if _deleted_in_bulk(origin):
+        return
+
+    if signal is post_delete:
+        sync.record_change(instance, instance.reading.reader_id, deleted=True)
+    else:
+        sync.record_changes([instance, instance.reading], instance.reading.reader_id)
+
+
+@receiver(post_save, sender=Edition)
+@receiver(post_delete, sender=Edition)
+def log_edition_change(sender, instance, signal, **kwargs):
+    sync.record_change(instance, None, deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=BookCopy)
+@receiver(post_delete, sender=BookCopy)
+def log_book_copy_change(sender, instance, signal, **kwargs):
+    sync.record_change(instance, instance.owner_id, deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=UserPreferences)
+@receiver(post_delete, sender=UserPreferences)
+def user_preferences_changed(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    """A new User starts with a fresh data version, even if its id was used before."""
+
+    if created:
+        bump_data_version(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, **kwargs):
+    """Keep SagaProgress current when a Book enters, leaves or changes Saga."""
+
+    loaded_saga_id = getattr(instance, "_loaded_saga_id", None)
+
+    if created or loaded_saga_id != instance.saga_id:
+        saga_ids = {loaded_saga_id, instance.saga_id} - {None}
+        core.refresh_saga_progress(saga_ids)
+
+    instance._loaded_saga_id = instance.saga_id
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    if instance.saga_id is not None:
+        core.refresh_saga_progress([instance.saga_id])
+
+
+@receiver(post_save, sender=Reading)
+def reading_saved(sender, instance, created, **kwargs):
+    """Keep SagaProgress current when a Reading is created, finished or moved to another Edition."""
+
+    loaded_state = getattr(instance, "_loaded_state", None)
+
+    if created or loaded_state != instance.state_key:
+        # The Saga of the Edition it was of too, if the Reading moved to another Edition:
+        edition_ids = {instance.edition_id, loaded_state and loaded_state[0]} - {None}
+        _refresh_saga_progress_of_editions(edition_ids, instance.reader_id)
+
+        ends = (instance.end, loaded_state and loaded_state[2])
+        statistics.refresh_yearly_stats(instance.reader_id, _years_of(*ends))
+
+    instance._loaded_state = instance.state_key
+
+
+@receiver(post_delete, sender=Reading)
+def reading_deleted(sender, instance, **kwargs):
+    """Also refreshes the partial progress, for the ReadingUpdates deleted with it."""
+
+    _refresh_saga_progress_of_editions([instance.edition_id], instance.reader_id)
+    statistics.refresh_yearly_stats(instance.reader_id, _years_of(instance.end))
+
+
+@receiver(post_save, sender=ReadingUpdate)
+@receiver(post_delete, sender=ReadingUpdate)
+def reading_update_changed(sender, instance, origin=None, **kwargs):
+    """Progress in open Readings counts for YearlyReadingStats of current year."""
+
+    if _deleted_in_bulk(origin):
+        return
+
+    if instance.reading.status == ReadingStatus.STARTED:
+        statistics.refresh_open_readings_progress(instance.reading.reader_id)
+
+
+@receiver(post_save, sender=Edition)
+def edition_saved(sender, instance, created, **kwargs):
+    """Keep YearlyReadingStats current when the page count of an Edition is fixed."""
+
+    loaded_pages = getattr(instance, "_loaded_pages", None)
+
+    if not created and loaded_pages != instance.pages:
+        years_by_reader = {}
+        for reader_id, end in Reading.objects.filter(edition=instance).values_list("reader_id",
+                                                                                   "end"):
+            years_by_reader.setdefault(reader_id, set()).update(_years_of(end))
+
+        for reader_id, years in years_by_reader.items():
+            statistics.refresh_yearly_stats(reader_id, years)
+
+        if years_by_reader:
+            bump_data_version(*years_by_reader)
+
+    instance._loaded_pages = instance.pages
+
+
+@receiver(post_save, sender=BookCopy)
+def book_copy_saved(sender, instance, created, **kwargs):
+    _refresh_saga_progress_of_editions([instance.edition_id], instance.owner_id)
+
+
+@receiver(post_delete, sender=BookCopy)
+def book_copy_deleted(sender, instance, **kwargs):
+    _refresh_saga_progress_of_editions([instance.edition_id], instance.owner_id)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Saga)
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Saga)
+def catalog_changed(sender, **kwargs):
+    """Anything cached from the catalog (like the autocomplete index) is stale after writes."""
+
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, created, **kwargs):
+    """Keep SearchEntries current. Those of Editions include the title of their Book."""
+
+    search.index("book", [instance.pk])
+    if not created:
+        search.index("edition", instance.edition_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Edition)
+def index_edition(sender, instance, **kwargs):
+    search.index("edition", [instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def index_author(sender, instance, created, **kwargs):
+    """Entries of Books include the names of their Authors, and of their Saga."""
+
+    search.index("author", [instance.pk])
+    if not created:
+        search.index("book", instance.book_set.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Saga)
+def index_saga(sender, instance, created, **kwargs):
+    search.index("saga", [instance.pk])
+    if not created:
+        search.index("book", instance.book_set.values_list("id", flat=True))
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def index_authored_books(sender, instance, action, reverse, pk_set, **kwargs):
+    """Books gaining or losing Authors. When reversed, 'instance' is an Author."""
+
+    if action.startswith("post_"):
+        bump_catalog_version()
+
+    if not reverse:
+        if action.startswith("post_"):
+            search.index("book", [instance.pk])
+    elif action == "pre_clear":
+        instance._cleared_book_ids = list(instance.book_set.values_list("id", flat=True))
+    elif action == "post_clear":
+        search.index("book", instance.__dict__.pop("_cleared_book_ids", []))
+    elif action.startswith("post_"):
+        search.index("book", pk_set)
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    instance._book_ids = list(instance.book_set.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def unindex_author(sender, instance, **kwargs):
+    search.remove("author", [instance.pk])
+    search.index("book", instance.__dict__.pop("_book_ids", []))
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Edition)
+@receiver(post_delete, sender=Saga)
+def unindex(sender, instance, **kwargs):
+    search.remove(sender._meta.model_name, [instance.pk])
+
+
+def _refresh_saga_progress_of_editions(edition_ids, user_id):
+    """Refresh SagaProgress of user for the Sagas the Editions belong to, if any."""
+
+    saga_ids = set(
+        Book.objects.filter(edition__in=edition_ids).exclude(saga=None)
+        .values_list("saga_id", flat=True)
+    )
+
+    if saga_ids:
+        core.refresh_saga_progress(saga_ids, [user_id])
+
+
+def _deleted_in_bulk(origin):
+    """
+    Whether a ReadingUpdate is deleted along with what 'origin' of the delete is (its
+    Reading, Edition, Book or User), whose own post_delete takes care of it once, or by
+    QuerySet.delete(), whose caller does, as for other bulk writes (see lib/compaction.py).
+    """
+
+    return origin is not None and not isinstance(origin, ReadingUpdate)
+
+
+def _years_of(*datetimes):
+    """Set of (local time) years of given datetimes, ignoring Nones."""
+
+    return {timezone.localtime(dt).year for dt in datetimes if dt is not None}
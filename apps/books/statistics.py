@@ -1,27 +1,39 @@
+from dataclasses import dataclass
 from datetime import datetime
 
-from django.db.models import Sum
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, FloatField, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from . import core
-from .models import Reading
-from biblio.models import UserPreferences
+from .models import Reading, YearlyReadingStats
+from biblio.core import data_version, user_preferences_by_year, user_preferences_for
 from apps.readings.lib.custom_definitions import ReadingStatus
 
 
+CLOSED_READING_FIGURES = ("books_completed", "pages_completed", "books_dnf")
+
+
 class State(object):
     """Encapsulate all State stuff."""
 
+    CACHE_TIMEOUT = 86400  # entries are invalidated by data version anyway
+
     def __init__(self, year, user):
         self.year = year
         self.user = user
-        try:
-            self.goal = UserPreferences.objects.get(user=user).books_per_year
-        except UserPreferences.DoesNotExist:
-            self.goal = 1
 
         # Helpers for properties:
-        self._books_read = None
-        self._pages_read = None
+        self._figures = None
+
+    @property
+    def goal(self):
+        """How many books to read this year."""
+
+        return self._cached_figures()["goal"]
 
     @property
     def pages_per_book(self):
@@ -34,19 +46,13 @@ class State(object):
     def pages_read(self):
         """How many pages read this year."""
 
-        if not self._pages_read:
-            self._books_read, self._pages_read = self._books_and_pages_so_far()
-
-        return self._pages_read
+        return self._cached_figures()["pages_read"]
 
     @property
     def books_read(self):
         """How many books read this year."""
 
-        if not self._books_read:
-            self._books_read, self._pages_read = self._books_and_pages_so_far()
-
-        return self._books_read
+        return self._cached_figures()["books_read"]
 
     @property
     def expected_books_so_far(self):
@@ -142,15 +148,7 @@ class State(object):
     def year_fraction_passed(self):
         """Fraction of year already passed. 1.0 if not current year."""
 
-        now = datetime.now()
-
-        if self.year == now.year:
-            passed_seconds = (now - datetime(self.year, 1, 1)).total_seconds()
-
-            return passed_seconds / 31536000.  # 31536000 seconds in a year
-
-        else:
-            return 1.0
+        return year_fraction_passed(self.year)
 
     @property
     def days_so_far(self):
@@ -167,28 +165,224 @@ class State(object):
         """
         return self.book_superavit * self.pages_per_book
 
+    def _cached_figures(self):
+        """
+        Goal, and books and pages read, of the year. Cached until the reading data of user
+        changes. Time-dependent properties are derived from these, so they are always live.
+        """
+        if self._figures is None:
+            key = f"state:{self.user.id}:{self.year}:{data_version(self.user.id)}"
+            self._figures = cache.get(key)
+
+            if self._figures is None:
+                prefs = user_preferences_for(self.user, self.year)
+                books_read, pages_read = self._books_and_pages_so_far()
+                self._figures = {
+                    "goal": prefs.books_per_year if prefs is not None else 1,
+                    "books_read": books_read,
+                    "pages_read": pages_read,
+                }
+                cache.set(key, self._figures, self.CACHE_TIMEOUT)
+
+        return self._figures
+
     def _books_and_pages_so_far(self):
         """Number of books and pages read during year."""
 
-        # Stats from finished books:
-        finished_readings_qs = Reading.objects.filter(
-            end__year=self.year,
-            reader=self.user,
-            status=ReadingStatus.COMPLETED,
-        )
-
-        books_this_year = finished_readings_qs.count()
-        pages_this_year = finished_readings_qs.aggregate(
-            total_pages=Sum('edition__pages')
-        ).get('total_pages') or 0
-
-        # Stats from books currently being read:
-        current_readings_qs = core.current_readings_by(self.user)
-        data = current_readings_qs.aggregate(
-            total_pages=Sum('pages_read'),
-            total_fraction=Sum('fraction_read'),
-        )
-        books_this_year += data.get("total_fraction") or 0  # "total_fraction" exists, but is None
-        pages_this_year += data.get("total_pages") or 0  # "total_pages" exists, but is None
-
-        return books_this_year, pages_this_year
+        stats = YearlyReadingStats.objects.filter(user=self.user, year=self.year).first()
+        if stats is None:  # first time asked about this year
+            refresh_yearly_stats(self.user.id, [self.year])
+            stats = YearlyReadingStats.objects.get(user=self.user, year=self.year)
+
+        return stats.books_read, stats.pages_read
+
+
+@dataclass
+class YearSummary:
+    """Books and pages read in a year (in completed Readings), and the goals for that year."""
+
+    year: int
+    books: int
+    pages: int
+    goal_books: int
+    goal_pages: int
+
+    @property
+    def pages_per_book(self):
+        try:
+            return self.pages / self.books
+        except ZeroDivisionError:
+            return 0
+
+    @property
+    def books_delta(self):
+        """How many books ahead (or behind, if negative) of goal, at this point of the year."""
+
+        return self.books - self.goal_books * year_fraction_passed(self.year)
+
+    @property
+    def pages_delta(self):
+        """How many pages ahead (or behind, if negative) of goal, at this point of the year."""
+
+        return self.pages - self.goal_pages * year_fraction_passed(self.year)
+
+
+def yearly_history(user):
+    """
+    Return list of YearSummary for every year in which user completed any Reading,
+    most recent first. Takes two queries, regardless of the amount of years.
+    """
+    rows = Reading.objects.filter(reader=user, status=ReadingStatus.COMPLETED).values_list(
+        "end__year",
+    ).annotate(
+        books=Count("id"),
+        pages=Sum("edition__pages", default=0),
+    ).order_by("-end__year")
+
+    prefs_by_year = user_preferences_by_year(user)
+
+    history = []
+    for year, books, pages in rows:
+        prefs = prefs_by_year.get(year) or prefs_by_year.get(None)
+        history.append(YearSummary(
+            year=year,
+            books=books,
+            pages=pages,
+            goal_books=prefs.books_per_year if prefs else 1,
+            goal_pages=prefs.pages_per_year if prefs else 100,
+        ))
+
+    return history
+
+
+def year_fraction_passed(year):
+    """Fraction of 'year' already passed. 1.0 if not current year."""
+
+    now = datetime.now()
+
+    if year == now.year:
+        passed_seconds = (now - datetime(year, 1, 1)).total_seconds()
+
+        return passed_seconds / 31536000.  # 31536000 seconds in a year
+
+    else:
+        return 1.0
+
+
+def refresh_yearly_stats(user_id, years=()):
+    """
+    Recompute YearlyReadingStats of user with id 'user_id' for 'years', and the partial
+    progress of open Readings, which counts for the current year. Existing rows take a
+    single UPDATE each, with the partial progress computed in it.
+    """
+    current_year = timezone.now().year
+    years = set(years) | {current_year}
+
+    closed_readings = Reading.objects.filter(reader_id=user_id, end__year__in=years)
+    figures = {year: dict.fromkeys(CLOSED_READING_FIGURES, 0) for year in years}
+    for year, *values in _closed_reading_figures(closed_readings):
+        figures[year] = dict(zip(CLOSED_READING_FIGURES, values))
+    figures[current_year].update(_open_readings_progress_expressions(user_id))
+
+    rows = YearlyReadingStats.objects.filter(user_id=user_id)
+    missing = [year for year, values in figures.items()
+               if not rows.filter(year=year).update(**values)]
+    if not missing:
+        return
+
+    with transaction.atomic():  # first time for these years
+        for year in missing:
+            values = figures[year]
+            if year == current_year:
+                partial_books, partial_pages = _open_readings_progress(user_id)
+                values.update(partial_books=partial_books, partial_pages=partial_pages)
+
+                # Partial progress belongs to current year only (it could be in last year's row):
+                rows.exclude(year=current_year).filter(
+                    Q(partial_books__gt=0) | Q(partial_pages__gt=0),
+                ).update(partial_books=0, partial_pages=0)
+
+            rows.update_or_create(user_id=user_id, year=year, defaults=values)
+
+
+def refresh_open_readings_progress(user_id):
+    """
+    Recompute only the partial progress of open Readings of user with id 'user_id', which
+    is all a progress update changes, with a single UPDATE of the row of the current year.
+    If that row does not exist yet, fall back to refresh_yearly_stats(), which creates it.
+    """
+    rows = YearlyReadingStats.objects.filter(user_id=user_id, year=timezone.now().year)
+
+    if not rows.update(**_open_readings_progress_expressions(user_id)):
+        refresh_yearly_stats(user_id)
+
+
+def rebuild_yearly_stats(apps=django_apps):
+    """
+    Recompute all YearlyReadingStats from scratch, with the models of 'apps' (historical
+    ones, in a migration). Return amount of rows created.
+    """
+    Reading = apps.get_model("readings", "Reading")
+    YearlyReadingStats = apps.get_model("books", "YearlyReadingStats")
+
+    rows = {}
+    closed_readings = Reading.objects.filter(end__isnull=False)
+    for user_id, year, *values in _closed_reading_figures(closed_readings, "reader_id"):
+        rows[user_id, year] = YearlyReadingStats(user_id=user_id, year=year,
+                                                 **dict(zip(CLOSED_READING_FIGURES, values)))
+
+    current_year = timezone.now().year
+    open_readers = Reading.objects.filter(status=ReadingStatus.STARTED).values_list(
+        "reader_id",
+        flat=True,
+    ).distinct()
+    for user_id in open_readers:
+        stats = rows.setdefault((user_id, current_year),
+                                YearlyReadingStats(user_id=user_id, year=current_year))
+        stats.partial_books, stats.partial_pages = _open_readings_progress(user_id, apps)
+
+    with transaction.atomic():
+        YearlyReadingStats.objects.all().delete()
+        YearlyReadingStats.objects.bulk_create(rows.values())
+
+    return len(rows)
+
+
+def _closed_reading_figures(closed_readings, *group_by):
+    """
+    Group closed Readings by 'group_by' fields and year of end. Return rows of
+    grouping values, followed by CLOSED_READING_FIGURES.
+    """
+    completed = Q(status=ReadingStatus.COMPLETED)
+
+    return closed_readings.values_list(*group_by, "end__year").annotate(
+        books_completed=Count("id", filter=completed),
+        pages_completed=Sum("edition__pages", filter=completed, default=0),
+        books_dnf=Count("id", filter=Q(status=ReadingStatus.DNF)),
+    ).order_by()
+
+
+def _open_readings_progress_expressions(user_id):
+    """Like _open_readings_progress(), as expressions to set the fields in an UPDATE."""
+
+    open_readings = core.current_readings_by(user_id).order_by().values("reader_id")
+
+    def total(name):
+        return Subquery(open_readings.annotate(total=Sum(name)).values("total"))
+
+    return {
+        "partial_books": Coalesce(total("fraction_read"), 0., output_field=FloatField()),
+        "partial_pages": Coalesce(total("pages_read"), 0),
+    }
+
+
+def _open_readings_progress(user_id, apps=django_apps):
+    """Fraction of books, and pages, read in currently open Readings of user."""
+
+    data = core.current_readings_by(user_id, apps).aggregate(
+        total_pages=Sum('pages_read'),
+        total_fraction=Sum('fraction_read'),
+    )
+
+    # "total_fraction" and "total_pages" always exist, but are None if no open Readings:
+    return data.get("total_fraction") or 0, data.get("total_pages") or 0
@@ -0,0 +1,248 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.books import statistics, timeseries
+from apps.books.generator import GeneratorSettings, LibraryGenerator
+from apps.books.models import Book, Edition
+from apps.readings.lib import sync
+from apps.readings.lib.controllers import update_reading_progress
+from apps.readings.models import Reading, ReadingUpdate
+
+
+class TestCursorPagination(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        settings = GeneratorSettings(books=30, years=1, books_per_year=30, updates_per_reading=10)
+        cls.user, = LibraryGenerator(settings).run()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url):
+        """Follow 'next' links from 'url'. Return all results, and queries run per page."""
+
+        results, queries = [], []
+        url = f"{url}{'&' if '?' in url else '?'}page_size=50"
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                page = self.client.get(url).json()
+            results.extend(page["results"])
+            queries.append(ctx.captured_queries)
+            url = page["next"]
+
+        return results, queries
+
+    def test_updates_are_paged_in_order_at_constant_cost(self):
+        results, queries = self._walk("/api/readingupdates/")
+
+        expected = ReadingUpdate.objects.filter(reading__reader=self.user).order_by("date", "id")
+        self.assertEqual([r["id"] for r in results], list(expected.values_list("id", flat=True)))
+        self.assertGreater(len(queries), 2)
+        self.assertEqual({len(q) for q in queries}, {1})
+        self.assertFalse(any("COUNT(" in q["sql"] for page in queries for q in page))
+
+    def test_updates_of_a_reading(self):
+        reading = Reading.objects.filter(reader=self.user).first()
+
+        results, _ = self._walk(f"/api/readingupdates/?reading={reading.id}")
+
+        expected = reading.readingupdate_set.order_by("date", "id")
+        self.assertEqual([r["id"] for r in results], list(expected.values_list("id", flat=True)))
+
+    def test_readings_are_paged_newest_first(self):
+        results, _ = self._walk("/api/readings/")
+
+        expected = Reading.objects.filter(reader=self.user).order_by("-start", "-id")
+        self.assertEqual([r["id"] for r in results], list(expected.values_list("id", flat=True)))
+
+
+class TestBulkReadingUpdates(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+        other = User.objects.create_user(username="other", password="password")
+        book = Book.objects.create(title="A book")
+        edition = Edition.objects.create(book=book, title=book.title, pages=200)
+        self.readings = [Reading.objects.create(reader=self.user, edition=edition)
+                         for _ in range(2)]
+        self.foreign = Reading.objects.create(reader=other, edition=edition)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _post(self, updates):
+        return self.client.post("/api/readingupdates/bulk/", {"updates": updates}, format="json")
+
+    def test_updates_are_validated_and_applied_at_once(self):
+        first, second = self.readings
+        state = statistics.State(timezone.now().year, self.user)
+        self.assertEqual(state.pages_read, 0)
+
+        response = self._post([
+            {"reading": first.id, "pages": 10, "date": "2026-01-02T10:00:00Z"},
+            {"reading": second.id, "percent": 50},
+            {"reading": first.id, "pages": 5},  # backwards
+            {"reading": first.id, "pages": 30},
+            {"reading": first.id, "pages": 300},  # beyond the end
+            {"reading": self.foreign.id, "pages": 10},
+            {"reading": second.id, "pages": "many"},
+        ]).json()
+
+        self.assertEqual(response["applied"], 3)
+        self.assertEqual([r["index"] for r in response["rejected"]], [2, 4, 5, 6])
+        progress = {r["id"]: r["current_page"] for r in response["progress"]}
+        self.assertEqual(progress, {first.id: 30, second.id: 100})
+
+        pages = first.readingupdate_set.order_by("date").values_list("page", flat=True)
+        self.assertEqual(list(pages), [10, 30])
+        self.assertEqual(statistics.State(timezone.now().year, self.user).pages_read, 130)
+
+    def test_dates_and_current_page_are_checked(self):
+        first, second = self.readings
+        Reading.objects.filter(id=second.id).update(current_page=50)  # no ReadingUpdate yet
+        future = (timezone.now() + timedelta(days=1)).isoformat()
+
+        response = self._post([
+            {"reading": first.id, "pages": 10, "date": "2026-01-02T10:00:00"},
+            {"reading": first.id, "pages": 20, "date": "2026-01-01T10:00:00Z"},  # earlier
+            {"reading": first.id, "pages": 20, "date": future},
+            {"reading": second.id, "pages": 40},  # behind current_page
+        ]).json()
+
+        self.assertEqual([r["index"] for r in response["rejected"]], [1, 2, 3])
+        self.assertTrue(timezone.is_aware(first.readingupdate_set.get().date))
+
+    def test_concurrent_progress_is_not_overwritten(self):
+        first, _ = self.readings
+        bulk_create = ReadingUpdate.objects.bulk_create
+
+        def racing_bulk_create(updates):
+            Reading.objects.filter(id=first.id).update(current_page=150)  # another device
+            return bulk_create(updates)
+
+        with patch.object(ReadingUpdate.objects, "bulk_create", racing_bulk_create):
+            self._post([{"reading": first.id, "pages": 100}])
+
+        first.refresh_from_db()
+        self.assertEqual(first.current_page, 150)
+
+    def test_queries_do_not_depend_on_batch_size(self):
+        def post(first_page, n_updates):
+            updates = [
+                {"reading": reading.id, "pages": page}
+                for page in range(first_page, first_page + n_updates)
+                for reading in self.readings
+            ]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self._post(updates).json()["applied"], len(updates))
+            return len(ctx.captured_queries)
+
+        self.assertEqual(post(1, 2), post(3, 20))
+
+    def test_invalid_payload(self):
+        self.assertEqual(self._post("nope").status_code, 400)
+
+
+class TestUpdateReadingProgress(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username="reader", password="password")
+        book = Book.objects.create(title="A book")
+        edition = Edition.objects.create(book=book, title=book.title, pages=200)
+        self.reading = Reading.objects.create(reader=user, edition=edition)
+
+    def test_stale_writes_do_not_go_backwards(self):
+        stale = Reading.objects.select_related("edition").get(pk=self.reading.pk)
+
+        self.assertTrue(update_reading_progress(self.reading, pages=50))
+        self.assertFalse(update_reading_progress(stale, pages=30))
+
+        self.reading.refresh_from_db()
+        self.assertEqual(self.reading.current_page, 50)
+        self.assertEqual(list(self.reading.readingupdate_set.values_list("page", flat=True)), [50])
+
+    def test_invalid_updates(self):
+        self.assertFalse(update_reading_progress(self.reading, pages=201))
+        self.assertFalse(update_reading_progress(self.reading, pages=None, percent=None))
+        self.assertTrue(update_reading_progress(self.reading, percent=50))
+        self.assertEqual(self.reading.current_page, 100)
+
+    def test_bursts_are_coalesced(self):
+        for pages in (10, 20, 30, 40):
+            update_reading_progress(self.reading, pages=pages)
+
+        pages = self.reading.readingupdate_set.order_by("date").values_list("page", flat=True)
+        self.assertEqual(list(pages), [10, 40])
+
+    @override_settings(READING_UPDATE_COALESCE_MINUTES=0)
+    def test_coalescing_can_be_disabled(self):
+        for pages in (10, 20, 30):
+            update_reading_progress(self.reading, pages=pages)
+
+        self.assertEqual(self.reading.readingupdate_set.count(), 3)
+
+    def test_queries_of_an_update(self):
+        # Transaction (2), guarded UPDATE, latest updates to coalesce, ReadingUpdate write,
+        # sync log INSERT and partial progress UPDATE of YearlyReadingStats:
+        with self.assertNumQueries(7):
+            update_reading_progress(self.reading, pages=10)
+
+
+class TestCompactReadingUpdates(TestCase):
+
+    def test_command(self):
+        user = User.objects.create_user(username="reader", password="password")
+        book = Book.objects.create(title="A book")
+        edition = Edition.objects.create(book=book, title=book.title, pages=200)
+        reading = Reading.objects.create(reader=user, edition=edition)
+        start = timezone.now() - timedelta(days=1)
+        minutes = (0, 1, 2, 3, 60, 120, 121, 200)
+        ReadingUpdate.objects.bulk_create(
+            ReadingUpdate(reading=reading, page=page, date=start + timedelta(minutes=minute))
+            for page, minute in enumerate(minutes, start=1)
+        )
+        token = sync.changes_since(user).token
+
+        call_command("compact_reading_updates", minutes=5, stdout=StringIO())
+
+        pages = reading.readingupdate_set.order_by("date").values_list("page", flat=True)
+        self.assertEqual(list(pages), [1, 4, 5, 6, 7, 8])
+        self.assertEqual(len(sync.changes_since(user, token).deleted["readingupdate"]), 2)
+
+
+class TestDownsampleReadingUpdates(TestCase):
+
+    def test_command_keeps_daily_totals(self):
+        settings = GeneratorSettings(books=20, years=1, books_per_year=20, updates_per_reading=60,
+                                     open_readings=2)
+        user, = LibraryGenerator(settings).run()
+        open_updates = ReadingUpdate.objects.filter(reading__end=None).count()
+        total = ReadingUpdate.objects.count()
+        before = timeseries.build_daily_pages(user.id)
+
+        out = StringIO()
+        call_command("downsample_reading_updates", chunk_size=50, stdout=out)
+
+        after = timeseries.build_daily_pages(user.id)
+        self.assertEqual(after.first_day, before.first_day)
+        np.testing.assert_allclose(after.pages, before.pages, atol=1e-6)
+        self.assertEqual(ReadingUpdate.objects.filter(reading__end=None).count(), open_updates)
+        self.assertLess(ReadingUpdate.objects.count(), total)
+        self.assertRegex(out.getvalue(), r"Removed \d+ of \d+ .* about [\d.]+ MB")
+
+        # Nothing left to remove:
+        out = StringIO()
+        call_command("downsample_reading_updates", dry_run=True, stdout=out)
+        self.assertIn("Would remove 0 of", out.getvalue())
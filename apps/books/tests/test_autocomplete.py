@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from apps.books import autocomplete
+from apps.books.autocomplete import CatalogIndex
+from apps.books.generator import GeneratorSettings, LibraryGenerator
+from apps.books.models import Author, Book, Saga
+
+
+class TestCatalogIndex(TestCase):
+
+    def setUp(self):
+        self.index = CatalogIndex([
+            ("book", 1, "A Wizard of Earthsea"),
+            ("book", 2, "The Tombs of Atuan"),
+            ("author", 3, "Ursula K. Le Guin"),
+            ("saga", 4, "Earthsea"),
+            ("author", 5, "José Saramago"),
+        ])
+
+    def _suggest(self, query, limit=10):
+        return [(result.kind, result.object_id) for result in self.index.suggest(query, limit)]
+
+    def test_prefixes(self):
+        self.assertEqual(self._suggest("earth", limit=2), [("saga", 4), ("book", 1)])
+        self.assertEqual(self._suggest("k. le", limit=1), [("author", 3)])
+
+    def test_accents_and_typos(self):
+        self.assertEqual(self._suggest("jose", limit=1), [("author", 5)])
+        self.assertEqual(self._suggest("SARÁMAGO", limit=1), [("author", 5)])
+        self.assertEqual(self._suggest("tombs of atuam", limit=1), [("book", 2)])
+        self.assertEqual(self._suggest("   "), [])
+
+
+class TestAutocomplete(TestCase):
+
+    def setUp(self):
+        self.saga = Saga.objects.create(name="Earthsea")
+        Author.objects.create(name="Ursula K. Le Guin")
+
+    def test_index_follows_catalog(self):
+        self.assertEqual([r.kind for r in autocomplete.suggest("earth")], ["saga"])
+
+        with self.assertNumQueries(0):
+            autocomplete.suggest("guin")
+
+        Book.objects.create(title="A Wizard of Earthsea", saga=self.saga)
+
+        self.assertEqual([r.kind for r in autocomplete.suggest("earth")], ["saga", "book"])
+
+    def test_endpoint(self):
+        self.client.force_login(User.objects.create_user(username="reader"))
+
+        results = self.client.get("/books/autocomplete", {"q": "ursu"}).json()["results"]
+
+        self.assertEqual([r["name"] for r in results], ["Ursula K. Le Guin"])
+
+    def test_index_is_small(self):  # lookup times are in the "autocomplete" benchmark
+        settings = GeneratorSettings(users=0, authors=300, books=3000, prefix="ac")
+        LibraryGenerator(settings).run()
+
+        self.assertLess(autocomplete.catalog_index().nbytes, 2_000_000)
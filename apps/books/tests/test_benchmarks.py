@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from apps.books import benchmarks
+
+
+class TestBenchmarks(TestCase):
+
+    def test_all_cases_run(self):
+        user = benchmarks.build_dataset(100)
+
+        for case in benchmarks.BENCHMARKS:
+            result = benchmarks.run_case(case, user, repeat=2)
+            self.assertLessEqual(result["p50_ms"], result["p95_ms"])
+            if case in ("stats", "progress", "autocomplete"):  # served from memory after warm up
+                self.assertEqual(result["queries"], 0)
+            else:
+                self.assertGreater(result["queries"], 0)
+
+    def test_compare(self):
+        base = {"results": [{"case": "sagas", "scale": 100, "p50_ms": 10.0, "queries": 3}]}
+        same = {"results": [{"case": "sagas", "scale": 100, "p50_ms": 10.5, "queries": 3}]}
+        slower = {"results": [{"case": "sagas", "scale": 100, "p50_ms": 12.0, "queries": 4}]}
+
+        self.assertEqual(benchmarks.compare(base, same, threshold=0.1), [])
+        self.assertEqual(len(benchmarks.compare(base, slower, threshold=0.1)), 2)
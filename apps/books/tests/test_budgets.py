@@ -0,0 +1,225 @@
+"""
+Query count and wall time budgets for every endpoint of the books and readings apps
+(pages and REST API), measured against generated libraries.
+
+Every named URL must have a Budget here, so new endpoints can't slip in unmeasured.
+Budgets are measured cold (with caches of user and catalog data invalidated), and query
+counts must not grow with the size of the library. Failures list the SQL run more than
+once, which is what N+1 problems look like.
+"""
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.books.generator import GeneratorSettings, LibraryGenerator
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.models import Reading
+from biblio.core import bump_catalog_version, bump_data_version
+
+
+NAMESPACES = ("books", "readings", "api-books", "api-readings")
+GROWTH = 10
+
+
+@dataclass
+class Budget:
+    queries: int
+    ms: float = 1000.
+    method: str = "get"
+    data: dict = field(default_factory=dict)  # or a callable, given the URL kwargs values
+    format: str = None
+    grows: bool = False  # known to depend on the size of the data, pending a fix
+
+
+BUDGETS = {
+    # Pages:
+    "books:stats": Budget(queries=5),
+    "books:reading_and_read": Budget(queries=4),
+    "books:sagas": Budget(queries=5),
+    "books:bibliography": Budget(queries=4),
+    "books:history": Budget(queries=4),
+    "books:book_detail": Budget(queries=9),
+    "books:author_detail": Budget(queries=3),
+    "books:add_book": Budget(queries=2),
+    "books:modify_book": Budget(queries=5),
+    "books:add_edition": Budget(queries=3),
+    "books:modify_edition": Budget(queries=4),
+    "books:find_book": Budget(queries=4, data={"query": "saga", "search_type": "all"}),
+    "books:autocomplete": Budget(queries=5, data={"q": "sag"}),  # 3 to build the index
+    "books:isbn_lookup": Budget(queries=3),
+    "books:import_library": Budget(queries=2),
+    "books:export_library": Budget(queries=4, data={"table": "books", "format": "csv"}),
+    "books:update_reading": Budget(queries=7),
+    "books:update_book_reading": Budget(queries=3),
+    "books:mark_reading_done": Budget(queries=20),
+    "books:mark_reading_dnf": Budget(queries=20),
+    "books:mark_edition_owned": Budget(queries=15),
+    "books:mark_reading_started": Budget(queries=17),
+    "books:mark_reading_pages": Budget(queries=6, method="post", data={"new_pages": 1}),
+    "books:mark_reading_finished": Budget(queries=18, method="post"),
+    "books:mark_reading_dnf_rest": Budget(queries=18, method="post"),
+    "readings:set_deadline": Budget(queries=5, method="post", data={"deadline": "2100-01-01"}),
+
+    # REST API:
+    "api-books:api-root": Budget(queries=0),
+    "api-books:book-list": Budget(queries=2),
+    "api-books:book-detail": Budget(queries=1),
+    "api-books:isbn-detail": Budget(queries=1),
+    "api-readings:api-root": Budget(queries=0),
+    "api-readings:readings-list": Budget(queries=1),
+    "api-readings:readings-detail": Budget(queries=1),
+    "api-readings:readings-progress": Budget(queries=1),
+    "api-readings:readings-rates": Budget(queries=1),
+    "api-readings:readings-heatmap": Budget(queries=1),
+    "api-readings:readings-set-deadline": Budget(queries=1, method="post"),
+    "api-readings:readingupdates-list": Budget(queries=1),
+    "api-readings:readingupdates-detail": Budget(queries=1),
+    "api-readings:readingupdates-bulk": Budget(
+        queries=9,
+        method="post",
+        format="json",
+        data=lambda v: {"updates": [{"reading": v["reading_id"], "percent": p} for p in (98, 99)]},
+    ),
+    "api-readings:sync-list": Budget(queries=5),
+}
+
+
+def named_urls():
+    """Dict of namespaced URL name -> set of tuples of its arguments, for NAMESPACES."""
+
+    urls = {}
+    for resolver in get_resolver().url_patterns:
+        if isinstance(resolver, URLResolver) and resolver.namespace in NAMESPACES:
+            _collect(resolver, resolver.namespace, urls)
+
+    return urls
+
+
+def _collect(resolver, namespace, urls):
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace is None:  # nested namespaces (like DRF login) are not ours
+                _collect(pattern, namespace, urls)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            arguments = tuple(pattern.pattern.regex.groupindex)
+            if "format" not in arguments:  # DRF format suffixes are the same views
+                urls.setdefault(f"{namespace}:{pattern.name}", set()).add(arguments)
+
+
+def duplicated_sql(queries):
+    """SQL run more than once among 'queries' (with literals stripped), and how many times."""
+
+    normalized = Counter(
+        re.sub(r"'[^']*'|\b\d+\b", "?", query["sql"]) for query in queries
+    )
+
+    return {sql: count for sql, count in normalized.items() if count > 1}
+
+
+class TestBudgets(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        small = GeneratorSettings(authors=10, books=50, years=2, books_per_year=10,
+                                  updates_per_reading=5, prefix="small", seed=1)
+        large = GeneratorSettings(authors=10 * GROWTH, books=50 * GROWTH, years=2 * GROWTH,
+                                  books_per_year=10, updates_per_reading=5 * GROWTH,
+                                  prefix="large", seed=2)
+        cls.small_user, = LibraryGenerator(small).run()
+        cls.large_user, = LibraryGenerator(large).run()
+
+    def test_every_endpoint_has_a_budget(self):
+        self.assertEqual(set(named_urls()) - set(BUDGETS), set())
+        self.assertEqual(set(BUDGETS) - set(named_urls()), set())
+
+    def test_budgets(self):
+        for name, budget in BUDGETS.items():
+            for arguments in named_urls()[name]:
+                with self.subTest(endpoint=name, arguments=arguments):
+                    queries, ms = self._measure(self.small_user, name, arguments, budget)
+                    report = self._report(queries)
+
+                    self.assertLessEqual(len(queries), budget.queries, report)
+                    self.assertLessEqual(ms, budget.ms)
+
+    def test_queries_do_not_grow_with_data(self):
+        for name, budget in BUDGETS.items():
+            if budget.grows:
+                continue
+
+            for arguments in named_urls()[name]:
+                with self.subTest(endpoint=name, arguments=arguments):
+                    small, _ = self._measure(self.small_user, name, arguments, budget)
+                    large, _ = self._measure(self.large_user, name, arguments, budget)
+
+                    self.assertEqual(len(large), len(small), self._report(large))
+
+    def _measure(self, user, name, arguments, budget):
+        """Request endpoint 'name' as 'user', rolling back any write. Return queries and ms."""
+
+        client = APIClient()
+        client.force_login(user)
+        client.force_authenticate(user)
+        values = self._values_for(user, name, arguments)
+        url = reverse(name, kwargs={argument: values[argument] for argument in arguments})
+        request = getattr(client, budget.method)
+        data = budget.data(values) if callable(budget.data) else budget.data
+        extra = {"format": budget.format} if budget.format else {}
+
+        bump_data_version(user.id)  # measure without cached data
+        bump_catalog_version()
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                response = request(url, data, **extra)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                ms = 1000 * (time.perf_counter() - t0)
+            transaction.set_rollback(True)
+
+        self.assertLess(response.status_code, 400, f"{name}: {response.status_code}")
+
+        return ctx.captured_queries, ms
+
+    @staticmethod
+    def _values_for(user, name, arguments):
+        """Values for URL kwargs of endpoint 'name', pointing to objects of 'user'."""
+
+        reading = Reading.objects.filter(reader=user, status=ReadingStatus.STARTED).first()
+        book = reading.edition.book
+        values = {
+            "reading_id": reading.id,
+            "edition_id": reading.edition_id,
+            "book_id": book.id,
+            "author_id": book.authors.first().id,
+            "year": timezone.now().year,
+            "code": reading.edition.isbn13,
+        }
+        if "pk" in arguments:
+            if "isbn" in name:
+                values["pk"] = reading.edition.isbn13
+            elif "book" in name:
+                values["pk"] = book.id
+            elif "readingupdates" in name:
+                values["pk"] = reading.readingupdate_set.first().id
+            else:
+                values["pk"] = reading.id
+
+        return values
+
+    @staticmethod
+    def _report(queries):
+        duplicates = duplicated_sql(queries)
+        lines = [f"{len(queries)} queries. Duplicated SQL:"]
+        lines.extend(f"  {count}x {sql}" for sql, count in duplicates.items())
+
+        return "\n".join(lines)
@@ -0,0 +1,235 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.books import core
+from apps.books.models import Author, Book, Saga, Edition, BookCopy, SagaProgress
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.models import Reading
+
+
+class SagaTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+        self.other = User.objects.create_user(username="other", password="password")
+
+        self.read_saga = self._create_saga("Read saga", 2)
+        self.owned_saga = self._create_saga("Owned saga", 2)
+        self.empty_saga = Saga.objects.create(name="Empty saga")
+        self.other_saga = self._create_saga("Other saga", 3)
+
+        for book in self.read_saga.books:
+            self._read(book, self.user)
+        for book in self.owned_saga.books:
+            self._own(book, self.user)
+        for book in self.other_saga.books:
+            self._read(book, self.other)
+            self._own(book, self.other)
+        self._own(self.other_saga.books.first(), self.user)
+
+    @staticmethod
+    def _create_saga(name, n_books):
+        saga = Saga.objects.create(name=name)
+        for index in range(n_books, 0, -1):
+            book = Book.objects.create(title=f"{name} {index}", saga=saga, index_in_saga=index)
+            Edition.objects.create(book=book, isbn="", title=book.title, pages=100)
+
+        return saga
+
+    @staticmethod
+    def _read(book, user):
+        edition = book.edition_set.first()
+        Reading.objects.create(reader=user, edition=edition, status=ReadingStatus.COMPLETED)
+
+    @staticmethod
+    def _own(book, user):
+        BookCopy.objects.create(edition=book.edition_set.first(), owner=user)
+
+
+class TestSagaData(SagaTestCase):
+
+    def test_sagas_are_bucketed_by_status(self):
+        sagas = core.get_saga_data_for(self.user)
+
+        self.assertEqual([s["name"] for s in sagas["read"]], ["Empty saga", "Read saga"])
+        self.assertEqual([s["name"] for s in sagas["owned"]], ["Owned saga"])
+        self.assertEqual([s["name"] for s in sagas["not_owned"]], ["Other saga"])
+
+    def test_books_are_sorted_and_have_status(self):
+        sagas = core.get_saga_data_for(self.user)
+        other_saga = sagas["not_owned"][0]
+
+        self.assertEqual([b.index_in_saga for b, _ in other_saga["books"]], [1, 2, 3])
+        self.assertEqual([s for _, s in other_saga["books"]], ["owned", "not-owned", "not-owned"])
+
+    def test_query_count_does_not_depend_on_catalog_size(self):
+        with self.assertNumQueries(3):
+            core.get_saga_data_for(self.user)
+
+        self._create_saga("Another saga", 10)
+
+        with self.assertNumQueries(3):
+            core.get_saga_data_for(self.user)
+
+
+class TestBibliography(SagaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = Author.objects.create(name="Author")
+        for saga in (self.read_saga, self.other_saga):
+            for book in saga.books:
+                book.authors.add(self.author)
+        Book.objects.create(title="Standalone").authors.add(self.author)
+
+    def test_books_are_grouped_by_saga_and_sorted(self):
+        with self.assertNumQueries(2):
+            bibliography = core.bibliography_of(self.author.id, self.user)
+
+        self.assertEqual([saga for saga, _ in bibliography], ["Other saga", "Read saga", "No saga"])
+        self.assertEqual([b.index_in_saga for b in bibliography[0][1]], [1, 2, 3])
+        self.assertEqual([b.user_status for b in bibliography[1][1]], ["read", "read"])
+
+    def test_grouping_is_cached_until_catalog_changes(self):
+        core.bibliography_of(self.author.id, self.user)
+
+        with self.assertNumQueries(1):  # only statuses of user
+            bibliography = core.bibliography_of(self.author.id, self.other)
+        self.assertEqual([b.user_status for b in bibliography[0][1]], ["read"] * 3)
+
+        self.read_saga.name = "A saga"
+        self.read_saga.save()
+
+        bibliography = core.bibliography_of(self.author.id, self.user)
+        self.assertEqual(bibliography[0][0], "A saga")
+
+
+class TestSagaProgress(SagaTestCase):
+
+    def test_rollup_is_kept_current(self):
+        progress = self.other_saga.progress_for(self.user)
+        self.assertEqual(
+            (progress.books_read, progress.books_owned, progress.books_total),
+            (0, 1, 3),
+        )
+
+        for book in self.other_saga.books:
+            self._read(book, self.user)
+
+        self.assertTrue(self.other_saga.completed_by(self.user))
+        self.assertFalse(self.other_saga.owned_by(self.user))
+
+    def test_moving_a_book_to_another_saga(self):
+        book = self.owned_saga.books.first()
+        book.saga = self.read_saga
+        book.save()
+
+        self.assertFalse(self.read_saga.completed_by(self.user))
+        self.assertEqual(self.read_saga.progress_for(self.user).books_total, 3)
+        self.assertEqual(self.owned_saga.progress_for(self.user).books_owned, 1)
+
+    def test_moving_a_reading_to_another_edition(self):
+        reading = Reading.objects.get(reader=self.user, edition__book=self.read_saga.books.first())
+        reading.edition = self.other_saga.books.last().edition_set.first()
+        reading.save()
+
+        self.assertEqual(self.read_saga.progress_for(self.user).books_read, 1)
+        self.assertEqual(self.other_saga.progress_for(self.user).books_read, 1)
+
+    def test_deleting_a_copy(self):
+        copies = BookCopy.objects.filter(owner=self.user, edition__book__saga=self.owned_saga)
+        copies.first().delete()
+
+        self.assertFalse(self.owned_saga.owned_by(self.user))
+
+    def test_rebuild(self):
+        expected = set(SagaProgress.objects.values_list(
+            "user_id", "saga_id", "books_read", "books_owned", "books_total",
+        ))
+        SagaProgress.objects.all().delete()
+
+        core.rebuild_saga_progress()
+
+        rebuilt = set(SagaProgress.objects.values_list(
+            "user_id", "saga_id", "books_read", "books_owned", "books_total",
+        ))
+        self.assertEqual(rebuilt, expected)
+
+
+class TestBookStatuses(SagaTestCase):
+
+    def test_statuses_in_one_query(self):
+        reading_book = self.other_saga.books.last()
+        Reading.objects.create(reader=self.user, edition=reading_book.edition_set.first())
+        books = list(Book.objects.all())
+
+        with self.assertNumQueries(1):
+            statuses = core.book_statuses_for(books, self.user)
+
+        self.assertEqual(len(statuses), len(books))
+        self.assertEqual(statuses[self.read_saga.books.first().id], "read")
+        self.assertEqual(statuses[self.owned_saga.books.first().id], "owned")
+        self.assertEqual(statuses[reading_book.id], "reading")
+        self.assertEqual(statuses[self.other_saga.books[1].id], "not-owned")
+
+    def test_status_uses_copies_of_user(self):
+        book = self.other_saga.books.last()
+
+        self.assertTrue(book.owned)
+        self.assertEqual(book.status(self.user), "not-owned")
+        self.assertEqual(book.status(self.other), "read")
+
+    def test_queryset_annotation(self):
+        ids = [b.id for b in self.owned_saga.books]
+        books = Book.objects.filter(id__in=ids).with_status_for(self.user)
+
+        self.assertEqual({b.user_status for b in books}, {"owned"})
+
+
+class TestAddBook(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username="reader"))
+        Author.objects.create(name="Existing")
+
+    def _add_book(self, authors, saga=""):
+        data = {"title": "A book", "author": authors, "year": 2000, "saga": saga, "index": 1}
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post("/books/add_book", data)
+
+        return len(ctx.captured_queries)
+
+    def test_resolve_authors(self):
+        authors = core.resolve_authors([" New ", "Existing", "", "New"])
+
+        self.assertEqual([a.name for a in authors], ["New", "Existing"])
+        self.assertEqual(Author.objects.count(), 2)
+
+    def test_query_count_does_not_depend_on_amount_of_authors(self):
+        few = self._add_book("Existing, New 1", saga="Saga 1")
+        many = self._add_book(", ".join(["Existing"] + [f"New {n}" for n in range(2, 12)]),
+                              saga="Saga 2")
+
+        self.assertEqual(many, few)
+        self.assertEqual(Book.objects.get(saga__name="Saga 2").authors.count(), 11)
+
+    def test_modify_book_replaces_authors(self):
+        self._add_book("Existing, Other")
+        book = Book.objects.get()
+
+        self.client.post(f"/books/modify_book/{book.id}",
+                         {"title": "A book", "author": "Other", "year": 2000})
+
+        self.assertEqual(book.list_of_authors, ["Other"])
+
+    def test_reset_sequences(self):
+        out = StringIO()
+        call_command("reset_sequences", stdout=out)
+
+        self.assertIn("sqlite", out.getvalue())
@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.books import exporter
+from apps.books.models import Author, Book, BookCopy, Edition
+from apps.readings.lib.controllers import update_reading_progress
+from apps.readings.models import Reading
+
+
+class TestExporter(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+        other = User.objects.create_user(username="other", password="password")
+
+        self.books = [Book.objects.create(title=f"Book {n}", year=2000 + n) for n in range(3)]
+        author = Author.objects.create(name="Ann Author")
+        for book in self.books:
+            book.authors.add(author)
+        editions = [Edition.objects.create(book=book, title=book.title, pages=100)
+                    for book in self.books]
+
+        self.reading = Reading.objects.create(reader=self.user, edition=editions[0])
+        update_reading_progress(self.reading, pages=10)
+        BookCopy.objects.create(edition=editions[1], owner=self.user)
+        Reading.objects.create(reader=other, edition=editions[2])
+
+    def _export(self, table, file_format, chunk_size=exporter.CHUNK_SIZE):
+        return b"".join(exporter.export(self.user, table, file_format, chunk_size))
+
+    def test_csv(self):
+        data = self._export("books", "csv", chunk_size=1).decode()
+        rows = list(csv.DictReader(io.StringIO(data)))
+
+        self.assertEqual([row["title"] for row in rows], ["Book 0", "Book 1"])
+        self.assertEqual(rows[0]["authors"], "Ann Author")
+
+    def test_jsonl(self):
+        lines = self._export("updates", "jsonl").decode().splitlines()
+
+        self.assertEqual([json.loads(line)["page"] for line in lines], [10])
+        self.assertEqual(json.loads(lines[0])["reading_id"], self.reading.id)
+
+    @skipIf(exporter.pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        def read(table):
+            data = self._export(table, "parquet", chunk_size=1)  # a row group per row
+            return exporter.pyarrow.parquet.read_table(exporter.pyarrow.BufferReader(data))
+
+        books = read("books")
+        self.assertEqual(books.column("title").to_pylist(), ["Book 0", "Book 1"])
+        self.assertEqual(books.column("saga__name").to_pylist(), [None, None])
+
+        readings = read("readings")
+        self.assertEqual(readings.column("start").to_pylist(), [self.reading.start])
+
+    def test_view(self):
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse("books:export_library"),
+                                   {"table": "copies", "format": "csv"})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content).decode().splitlines()[0],
+                         "id,edition_id")
+        self.assertEqual(self.client.get(reverse("books:export_library"),
+                                         {"table": "users"}).status_code, 400)
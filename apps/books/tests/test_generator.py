@@ -0,0 +1,38 @@
+from django.db.models import Max
+from django.test import TestCase
+
+from apps.books.generator import GeneratorSettings, LibraryGenerator
+from apps.books.models import Book, SagaProgress
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.models import Reading, ReadingUpdate
+
+
+class TestLibraryGenerator(TestCase):
+
+    SETTINGS = GeneratorSettings(users=2, authors=10, books=50, years=2, books_per_year=10,
+                                 updates_per_reading=10, chunk_size=100)
+
+    def test_generated_library(self):
+        generator = LibraryGenerator(self.SETTINGS)
+        user, _ = generator.run()
+
+        self.assertEqual(Book.objects.count(), 50)
+        self.assertEqual(Reading.objects.filter(reader=user).count(), 20)
+        self.assertEqual(
+            Reading.objects.filter(reader=user, status=ReadingStatus.STARTED).count(),
+            self.SETTINGS.open_readings,
+        )
+        self.assertEqual(generator.counts["ReadingUpdate"], ReadingUpdate.objects.count())
+        self.assertTrue(SagaProgress.objects.filter(user=user).exists())
+
+        for reading in Reading.objects.annotate(last_page=Max("readingupdate__page")):
+            self.assertEqual(reading.current_page, reading.last_page)
+
+    def test_generator_is_deterministic(self):
+        LibraryGenerator(self.SETTINGS).run()
+        titles = list(Book.objects.order_by("id").values_list("title", flat=True))
+        Book.objects.all().delete()
+
+        LibraryGenerator(GeneratorSettings(**{**vars(self.SETTINGS), "prefix": "again"})).run()
+
+        self.assertEqual(list(Book.objects.order_by("id").values_list("title", flat=True)), titles)
@@ -0,0 +1,153 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.books import importer, search
+from apps.books.importer import LibraryImporter
+from apps.books.models import Author, Book, BookCopy, Edition, SagaProgress, YearlyReadingStats
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.models import Reading, ReadingUpdate
+
+
+CSV = """title,authors,year,saga,index_in_saga,isbn,pages,owned,status,start,end,page
+First,"Ann Author, Bo Writer",2001,The Saga,1,0-306-40615-2,300,yes,read,2024-01-01,2024-01-20,
+Second,Ann Author,2003,The Saga,2,,250,,reading,2024-02-01,,100
+Third,Cy Penman,1999,,,,120,1,,,,
+,Nobody,2000,,,,,,,,,
+"""
+
+GOODREADS = '''Book Id,Title,Author,Additional Authors,ISBN,ISBN13,Number of Pages,\
+Year Published,Original Publication Year,Date Read,Date Added,Exclusive Shelf,Owned Copies
+1,"First (The Saga, #1)",Ann Author,,"=""0306406152""","=""9780306406157""",300,2005,2001,\
+2024/01/20,2024/01/01,read,1
+2,Fourth,Di Scribe,"Ann Author, Bo Writer",,,400,2010,2010,,2024/03/01,to-read,0
+'''
+
+
+class TestLibraryImporter(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+
+    def _import(self, text, file_format="csv", batch_size=1000):
+        return LibraryImporter(self.user, batch_size).run(StringIO(text), file_format)
+
+    def test_csv(self):
+        report = self._import(CSV)
+
+        self.assertEqual((report.rows, report.failed), (4, 1))
+        self.assertEqual(report.errors[0][0], 4)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.count(), 3)
+        self.assertEqual(BookCopy.objects.filter(owner=self.user).count(), 2)
+
+        first = Book.objects.get(title="First")
+        self.assertEqual(sorted(first.authors.values_list("name", flat=True)),
+                         ["Ann Author", "Bo Writer"])
+        self.assertEqual(first.saga.name, "The Saga")
+        self.assertEqual(first.edition_set.get().isbn13, "9780306406157")
+
+        read = Reading.objects.get(edition__book=first)
+        self.assertEqual((read.status, read.current_page), (ReadingStatus.COMPLETED, 300))
+        reading = Reading.objects.get(edition__book__title="Second")
+        self.assertEqual((reading.status, reading.end), (ReadingStatus.STARTED, None))
+        self.assertEqual(ReadingUpdate.objects.filter(reading=reading).get().page, 100)
+
+        # What signals would have done:
+        self.assertEqual(YearlyReadingStats.objects.get(user=self.user, year=2024)
+                         .books_completed, 1)
+        self.assertEqual(SagaProgress.objects.get(user=self.user).books_read, 1)
+        self.assertEqual([r.title for r in search.search("Penman", kind="book").results], ["Third"])
+
+    def test_json(self):
+        rows = [{"title": "First", "authors": ["Ann Author"], "isbn": "9780306406157",
+                 "status": "dnf", "start": "2024-01-01T10:00:00", "end": "2024-01-02", "page": 20},
+                {"title": "Second", "authors": "Ann Author", "pages": 10}]
+        array = json.dumps(rows)
+        lines = "\n".join(json.dumps(row) for row in rows)
+
+        self._import(array, "json")
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Reading.objects.get().status, ReadingStatus.DNF)
+
+        self._import(lines, "json")  # same rows, as JSON Lines: nothing new
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(Reading.objects.count(), 1)
+
+    def test_invalid_rows_fail_alone(self):
+        rows = [1, ["First"], {"title": "First", "authors": "Ann Author", "pages": "inf"},
+                {"title": "First", "authors": "Ann Author", "year": 1e20},
+                {"title": ["First"], "authors": "Ann Author"},
+                {"title": "First", "authors": "Ann Author"}]
+
+        report = self._import(json.dumps(rows) + '{"title": "Trunc', "json")
+
+        self.assertEqual((report.rows, report.failed), (7, 6))
+        self.assertEqual([number for number, _ in report.errors], [1, 2, 3, 4, 5, 7])
+        self.assertEqual(Book.objects.get().title, "First")
+
+    def test_goodreads(self):
+        self._import(GOODREADS)
+
+        first = Book.objects.get(title="First")
+        self.assertEqual((first.saga.name, first.index_in_saga, first.year), ("The Saga", 1, 2001))
+        self.assertEqual(Reading.objects.get().edition.book, first)
+        self.assertEqual(BookCopy.objects.get().edition.book, first)
+        self.assertEqual(Book.objects.get(title="Fourth").authors.count(), 3)
+
+    def test_reimport_dedupes(self):
+        self._import(CSV)
+        report = self._import(CSV)
+
+        self.assertEqual(report.created, {})
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Edition.objects.count(), 3)
+        self.assertEqual(Reading.objects.count(), 2)
+
+        # Goodreads row matches the Edition by ISBN-13:
+        self._import(GOODREADS)
+        self.assertEqual(Book.objects.filter(title="First").count(), 1)
+        self.assertEqual(Reading.objects.count(), 2)
+
+    def test_queries_per_batch_are_bounded(self):
+        def n_queries(n_rows):
+            text = "title,authors,year,saga,isbn,pages,owned,status,end\n" + "".join(
+                f"Book {n_rows}.{n},Author {n_rows}.{n % 7},2000,Saga {n_rows}.{n % 3},,100,1,read,"
+                f"2024-01-{n % 28 + 1}\n"
+                for n in range(n_rows)
+            )
+            user = User.objects.create_user(username=f"reader{n_rows}")
+            with CaptureQueriesContext(connection) as ctx:
+                LibraryImporter(user).run(StringIO(text))
+            return len(ctx.captured_queries)
+
+        self.assertEqual(n_queries(20), n_queries(40))
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile("library.csv", CSV.encode())
+
+        response = self.client.post(reverse("books:import_library"),
+                                    {"file": upload, "file_format": "csv"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Imported 3 of 4 rows")
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_view_rejects_large_files(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile("library.csv", CSV.encode())
+
+        with patch.object(importer, "SYNC_MAX_BYTES", 10):
+            response = self.client.post(reverse("books:import_library"),
+                                        {"file": upload, "file_format": "csv"})
+
+        self.assertContains(response, "import_library management command")
+        self.assertEqual(Book.objects.count(), 0)
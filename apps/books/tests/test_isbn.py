@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.books import isbn
+from apps.books.models import Book, Edition
+
+
+class TestIsbn(TestCase):
+
+    def test_canonicalization(self):
+        self.assertEqual(isbn.to_isbn13("978-0-306-40615-7"), "9780306406157")
+        self.assertEqual(isbn.to_isbn13("0-306-40615-2"), "9780306406157")
+        self.assertEqual(isbn.to_isbn13("0 8044 2957 x"), "9780804429573")
+
+    def test_invalid(self):
+        for code in ("978-0-306-40615-8", "0-306-40615-3", "12345", "xxx", "1234567890123"):
+            with self.subTest(code=code), self.assertRaises(isbn.InvalidISBN):
+                isbn.to_isbn13(code)
+
+        self.assertEqual(isbn.to_isbn13_or_blank("xxx"), "")
+
+
+class TestEditionIsbn(TestCase):
+
+    def setUp(self):
+        self.book = Book.objects.create(title="A book")
+        self.edition = Edition.objects.create(book=self.book, title="A book", isbn="0-306-40615-2")
+
+    def test_isbn13_is_computed_on_save(self):
+        self.assertEqual(self.edition.isbn13, "9780306406157")
+
+        self.edition.isbn = "not an isbn"
+        self.edition.save(update_fields=["isbn"])
+        self.edition.refresh_from_db()
+
+        self.assertEqual(self.edition.isbn13, "")
+
+    def test_unique_per_book(self):
+        Edition.objects.create(book=Book.objects.create(title="Other"), isbn="9780306406157")
+        Edition.objects.create(book=self.book, isbn="xxx")
+        Edition.objects.create(book=self.book, isbn="xxx")
+
+        with self.assertRaises(IntegrityError):
+            Edition.objects.create(book=self.book, isbn="9780306406157")
+
+    def test_lookups(self):
+        user = User.objects.create_user(username="reader")
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with self.assertNumQueries(1):
+            data = client.get("/api/isbn/0306406152/").json()
+        self.assertEqual(data["editions"][0]["book_id"], self.book.id)
+
+        self.assertEqual(client.get("/api/isbn/9780804429573/").status_code, 404)
+        self.assertEqual(client.get("/api/isbn/garbage/").status_code, 400)
+
+        self.client.force_login(user)
+        response = self.client.get("/books/isbn/978-0-306-40615-7")
+        self.assertRedirects(response, f"/books/book/{self.book.id}", fetch_redirect_response=False)
+
+    def test_normalize_command(self):
+        duplicate = Edition.objects.create(book=self.book, isbn="xxx")
+        Edition.objects.filter(pk=duplicate.pk).update(isbn="978-0-306-40615-7")
+
+        out = StringIO()
+        call_command("normalize_isbns", chunk_size=1, stdout=out)
+
+        self.assertIn(f"Edition {duplicate.id} duplicates the ISBN of Edition {self.edition.id}",
+                      out.getvalue())
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.isbn13, "")
+
+    def test_edition_form_rejects_isbn_of_another_edition(self):
+        other = Edition.objects.create(book=self.book, title="Other", isbn="9780804429573")
+        self.client.force_login(User.objects.create_user(username="reader"))
+        data = {"isbn": "0-306-40615-2", "title": "Other", "year": 2000, "pages": 100}
+
+        response = self.client.post(f"/books/modify_edition/{other.id}", data)
+
+        self.assertIn("isbn", response.context["form"].errors)
+        other.refresh_from_db()
+        self.assertEqual(other.isbn13, "9780804429573")
@@ -0,0 +1,81 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.books import search
+from apps.books.models import Author, Book, BookCopy, Edition, Saga, SearchEntry
+
+
+class TestSearch(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+
+        self.author = Author.objects.create(name="Ursula K. Le Guin")
+        self.saga = Saga.objects.create(name="Earthsea")
+        self.book = Book.objects.create(title="A Wizard of Earthsea", saga=self.saga)
+        self.book.authors.add(self.author)
+        self.edition = Edition.objects.create(book=self.book, title="Un mago de Terramar",
+                                              isbn="9788445076149", pages=200)
+        BookCopy.objects.create(edition=self.edition, owner=self.user)
+
+        other = Book.objects.create(title="The Dispossessed")
+        other.authors.add(self.author)
+
+    @staticmethod
+    def _found(query, **kwargs):
+        return [(r.kind, r.object_id) for r in search.search(query, **kwargs).results]
+
+    def test_mixed_results(self):
+        found = self._found("earthsea")
+
+        self.assertCountEqual(found, [("book", self.book.id), ("saga", self.saga.id),
+                                      ("edition", self.edition.id)])
+
+    def test_prefix_accents_and_kinds(self):
+        self.assertIn(("author", self.author.id), self._found("le gu"))
+        self.assertEqual(self._found("ÚRSULA", kind="author"), [("author", self.author.id)])
+        self.assertEqual(self._found("9788445076149"), [("edition", self.edition.id)])
+        self.assertEqual(self._found("  ?! "), [])
+
+    def test_index_is_kept_in_sync(self):
+        self.saga.name = "Terramar"
+        self.saga.save()
+        self.assertIn(("book", self.book.id), self._found("terramar", kind="book"))
+
+        self.book.authors.clear()
+        self.assertEqual(self._found("guin wizard"), [])
+
+        self.book.delete()
+        self.assertEqual(self._found("wizard"), [])
+
+    def test_pagination(self):
+        for n in range(5):
+            Book.objects.create(title=f"Wizard {n}")
+
+        first = search.search("wizard", kind="book", page_size=4)
+        second = search.search("wizard", kind="book", page=2, page_size=4)
+
+        self.assertTrue(first.has_next)
+        self.assertFalse(second.has_next)
+        self.assertEqual(len(first.results) + len(second.results), 6)
+
+    def test_rebuild(self):
+        n_entries = SearchEntry.objects.count()
+        SearchEntry.objects.all().delete()
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertEqual(SearchEntry.objects.count(), n_entries)
+        self.assertEqual(self._found("dispossessed"), [("book", self.book.id + 1)])
+
+    def test_view(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post("/books/find_book", {"query": "wizard", "search_type": "all"})
+
+        results = response.context["results"].results
+        self.assertEqual({(r.kind, r.status) for r in results},
+                         {("book", "owned"), ("edition", "owned")})
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.books.models import Book, BookCopy, Edition
+from apps.readings.lib.snapshot import library_snapshot
+from apps.readings.models import Reading, ReadingUpdate
+
+
+class TestLibrarySnapshot(TestCase):
+
+    USERNAME = "random_user"
+    PASSWORD = "random_password"
+
+    def setUp(self):
+        self.user = User.objects.create_user(username=self.USERNAME, password=self.PASSWORD)
+        self.book = Book.objects.create(title="A book")
+        self.edition = self._add_edition()
+
+    def _add_edition(self):
+        return Edition.objects.create(book=self.book, isbn="", title=self.book.title, pages=300)
+
+    def _count_book_detail_queries(self):
+        url = reverse("books:book_detail", args=(self.book.id,))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        return len(ctx.captured_queries)
+
+    def test_book_detail_queries_do_not_grow_with_editions(self):
+        self.client.login(username=self.USERNAME, password=self.PASSWORD)
+        n_queries = self._count_book_detail_queries()
+
+        for _ in range(5):
+            self._add_edition()
+
+        self.assertEqual(self._count_book_detail_queries(), n_queries)
+
+    def test_snapshot_is_loaded_once(self):
+        reading = Reading.objects.create(reader=self.user, edition=self.edition)
+        ReadingUpdate.objects.create(reading=reading, page=42)
+
+        with library_snapshot(self.user):
+            with self.assertNumQueries(2):
+                self.assertTrue(self.book.is_currently_being_read_by(self.user))
+                self.assertFalse(self.book.is_already_read_by(self.user))
+                self.assertFalse(self.book.is_owned_by(self.user))
+                self.assertFalse(self.edition.owned)
+                self.assertEqual(reading.page_progress, 42)
+
+    def test_snapshot_is_invalidated_by_writes(self):
+        with library_snapshot(self.user):
+            self.assertFalse(self.book.is_owned_by(self.user))
+            BookCopy.objects.create(edition=self.edition, owner=self.user)
+            self.assertTrue(self.book.is_owned_by(self.user))
+            self.assertTrue(self.edition.owned)
+
+    def test_snapshot_of_other_user_is_ignored(self):
+        other = User.objects.create_user(username="other")
+        BookCopy.objects.create(edition=self.edition, owner=other)
+
+        with library_snapshot(self.user):
+            self.assertTrue(self.book.is_owned_by(other))
+            self.assertFalse(self.book.is_owned_by(self.user))
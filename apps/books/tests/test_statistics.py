@@ -0,0 +1,208 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.books import statistics
+from apps.books.models import Book, Edition, YearlyReadingStats
+from apps.readings.api.serializers import ReadingBaseSerializer, ReadingProgressSerializer
+from apps.readings.lib.controllers import update_reading_progress
+from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.models import Reading
+from biblio.core import data_version, save_user_preferences
+from biblio.models import UserPreferences
+
+
+class StatisticsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+        self.year = timezone.now().year
+        self.last_year = self.year - 1
+
+        self.editions = []
+        for pages in (100, 200, 300, 400):
+            book = Book.objects.create(title=f"Book of {pages} pages")
+            self.editions.append(Edition.objects.create(book=book, title=book.title, pages=pages))
+
+        a_year_ago = timezone.now() - timedelta(days=366)
+        Reading.objects.create(reader=self.user, edition=self.editions[0], end=a_year_ago,
+                               status=ReadingStatus.COMPLETED)
+        self.done = Reading.objects.create(reader=self.user, edition=self.editions[1])
+        self.done.mark_read()
+        self.dnf = Reading.objects.create(reader=self.user, edition=self.editions[2])
+        self.dnf.mark_dnf()
+        self.open = Reading.objects.create(reader=self.user, edition=self.editions[3])
+        update_reading_progress(self.open, pages=100)
+
+
+class TestYearlyReadingStats(StatisticsTestCase):
+
+    def _figures(self, year):
+        stats = YearlyReadingStats.objects.get(user=self.user, year=year)
+
+        return stats.books_completed, stats.pages_completed, stats.books_dnf, stats.books_read, \
+            stats.pages_read
+
+    def test_rollup_is_kept_current(self):
+        self.assertEqual(self._figures(self.last_year), (1, 100, 0, 1, 100))
+        self.assertEqual(self._figures(self.year), (1, 200, 1, 1.25, 300))
+
+        self.open.mark_read()
+
+        self.assertEqual(self._figures(self.year), (2, 600, 1, 2, 600))
+
+    def test_progress_updates_one_row(self):
+        with CaptureQueriesContext(connection) as ctx:
+            update_reading_progress(self.open, pages=200)
+
+        stats_queries = [q for q in ctx.captured_queries if "yearlyreadingstats" in q["sql"]]
+        self.assertEqual(len(stats_queries), 1)
+        self.assertEqual(self._figures(self.year), (1, 200, 1, 1.5, 400))
+
+    def test_partial_progress_only_counts_in_current_year(self):
+        YearlyReadingStats.objects.filter(user=self.user, year=self.last_year).update(
+            partial_books=0.5,
+            partial_pages=50,
+        )
+
+        self.assertEqual(self._figures(self.last_year), (1, 100, 0, 1, 100))
+
+    def test_fixing_pages_of_an_edition(self):
+        edition = Edition.objects.get(pk=self.editions[1].pk)
+        edition.pages = 250
+        edition.save()
+
+        self.assertEqual(self._figures(self.year), (1, 250, 1, 1.25, 350))
+
+    def test_rebuild(self):
+        fields = ("user_id", "year", "books_completed", "pages_completed", "books_dnf",
+                  "partial_books", "partial_pages")
+        expected = set(YearlyReadingStats.objects.values_list(*fields))
+        YearlyReadingStats.objects.all().delete()
+
+        statistics.rebuild_yearly_stats()
+
+        self.assertEqual(set(YearlyReadingStats.objects.values_list(*fields)), expected)
+
+    def test_state_reads_one_row(self):
+        state = statistics.State(self.year, self.user)
+
+        with self.assertNumQueries(2):  # the row, and the UserPreferences
+            self.assertEqual(state.books_read, 1.25)
+            self.assertEqual(state.pages_read, 300)
+
+    def test_state_of_a_year_without_readings(self):
+        state = statistics.State(self.year - 10, self.user)
+
+        self.assertEqual((state.books_read, state.pages_read), (0, 0))
+
+
+class TestYearlyHistory(StatisticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        UserPreferences.objects.create(user=self.user, books_per_year=10, pages_per_year=1000)
+        UserPreferences.objects.create(user=self.user, books_per_year=1, pages_per_year=200,
+                                       year=self.last_year)
+
+    def test_history(self):
+        with self.assertNumQueries(2):
+            history = statistics.yearly_history(self.user)
+
+        self.assertEqual([s.year for s in history], [self.year, self.last_year])
+        this_year, last_year = history
+        self.assertEqual((this_year.books, this_year.pages, this_year.goal_books), (1, 200, 10))
+        self.assertEqual((last_year.books, last_year.pages, last_year.goal_books), (1, 100, 1))
+        self.assertEqual((last_year.books_delta, last_year.pages_delta), (0, -100))
+
+    def test_state_honors_goal_of_year(self):
+        self.assertEqual(statistics.State(self.last_year, self.user).goal, 1)
+        self.assertEqual(statistics.State(self.year, self.user).goal, 10)
+
+    def test_history_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/books/history")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, str(self.last_year))
+
+    def test_one_preferences_per_year(self):
+        save_user_preferences({"books_per_year": 20, "pages_per_year": 4000}, self.user)
+        self.assertEqual(statistics.State(self.year, self.user).goal, 20)
+
+        for year in (None, self.last_year):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                UserPreferences.objects.create(user=self.user, year=year)
+
+
+class TestCachedState(StatisticsTestCase):
+
+    def test_repeated_state_is_cached(self):
+        statistics.State(self.year, self.user).books_read
+
+        with self.assertNumQueries(0):
+            state = statistics.State(self.year, self.user)
+            self.assertEqual((state.books_read, state.pages_read, state.goal), (1.25, 300, 1))
+            state.book_superavit
+
+    def test_writes_invalidate_cache(self):
+        self.assertEqual(statistics.State(self.year, self.user).pages_read, 300)
+
+        update_reading_progress(self.open, pages=150)
+        self.assertEqual(statistics.State(self.year, self.user).pages_read, 350)
+
+        UserPreferences.objects.create(user=self.user, books_per_year=12, pages_per_year=5000)
+        self.assertEqual(statistics.State(self.year, self.user).goal, 12)
+
+    def test_data_version_is_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            update_reading_progress(self.open, pages=150)
+            statistics.State(self.year, self.user).pages_read  # as a concurrent request would
+            version = data_version(self.user.id)
+
+        self.assertNotEqual(data_version(self.user.id), version)
+
+    def test_progress_endpoint_is_cached(self):
+        self.open.deadline = timezone.now() + timedelta(days=10)
+        self.open.save()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get("/api/readings/progress/")
+
+        with self.assertNumQueries(0):
+            response = client.get("/api/readings/progress/")
+
+        reading, = response.json()
+        self.assertEqual(reading["current_page"], 100)
+        self.assertAlmostEqual(reading["pages_per_day_to_meet_deadline"], 30, delta=0.1)
+
+        update_reading_progress(self.open, pages=150)
+        reading, = client.get("/api/readings/progress/").json()
+        self.assertEqual(reading["current_page"], 150)
+
+    def test_progress_queries_do_not_depend_on_open_readings(self):
+        def serialize():
+            qs = ReadingBaseSerializer.setup_eager_loading(Reading.objects.filter(
+                reader=self.user, status=ReadingStatus.STARTED,
+            ))
+            return ReadingProgressSerializer(qs, many=True).data
+
+        self.open.deadline = timezone.now() + timedelta(days=10)
+        self.open.save()
+
+        with self.assertNumQueries(1):
+            reading, = serialize()
+        self.assertAlmostEqual(reading["pages_per_day_to_meet_deadline"], 30, delta=0.1)
+
+        for edition in self.editions:
+            reading = Reading.objects.create(reader=self.user, edition=edition,
+                                             deadline=self.open.deadline)
+            update_reading_progress(reading, pages=10)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(serialize()), 5)
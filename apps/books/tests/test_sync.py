@@ -0,0 +1,133 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.books.models import Book, BookCopy, Edition
+from apps.readings.lib import sync
+from apps.readings.lib.controllers import update_reading_progress
+from apps.readings.models import Reading, ReadingUpdate, SyncChange
+
+
+class TestSync(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+        self.other = User.objects.create_user(username="other", password="password")
+
+        book = Book.objects.create(title="A book")
+        self.edition = Edition.objects.create(book=book, title=book.title, pages=300)
+        self.other_edition = Edition.objects.create(book=book, title="Other", pages=200)
+        self.reading = Reading.objects.create(reader=self.user, edition=self.edition)
+        Reading.objects.create(reader=self.other, edition=self.other_edition)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _sync(self, token=None):
+        response = self.client.get("/api/sync/", {"token": token} if token else {})
+        self.assertEqual(response.status_code, 200)
+
+        return response.json()
+
+    @staticmethod
+    def _ids(delta, name):
+        return [row["id"] for row in delta["saved"][name]]
+
+    def test_first_sync_returns_everything_of_user(self):
+        delta = self._sync()
+
+        self.assertEqual(self._ids(delta, "reading"), [self.reading.id])
+        self.assertEqual(self._ids(delta, "edition"), [self.edition.id])
+        self.assertFalse(delta["more"])
+
+    @override_settings(SYNC_OVERLAP_SECONDS=0)
+    def test_only_changes_are_returned(self):
+        token = self._sync()["token"]
+
+        update_reading_progress(self.reading, pages=50)
+        BookCopy.objects.create(edition=self.other_edition, owner=self.other)
+        self.other_edition.pages = 210
+        self.other_edition.save()
+
+        delta = self._sync(token)
+
+        self.assertEqual(self._ids(delta, "reading"), [self.reading.id])
+        self.assertEqual([r["page"] for r in delta["saved"]["readingupdate"]], [50])
+        self.assertEqual(delta["saved"]["bookcopy"], [])
+        self.assertEqual(delta["saved"]["edition"], [])
+
+        self.assertEqual(self._sync(delta["token"])["saved"]["reading"], [])
+
+    def test_deletions_are_tombstones(self):
+        copy = BookCopy.objects.create(edition=self.edition, owner=self.user)
+        token = self._sync()["token"]
+        update_reading_progress(self.reading, pages=50)
+        copy_id, reading_id = copy.id, self.reading.id
+        copy.delete()
+        self.reading.delete()
+
+        delta = self._sync(token)
+
+        self.assertEqual(delta["deleted"]["bookcopy"], [copy_id])
+        self.assertEqual(delta["deleted"]["reading"], [reading_id])
+        self.assertEqual(len(delta["deleted"]["readingupdate"]), 1)
+
+    def test_deleting_a_reading_does_not_depend_on_its_updates(self):
+        ReadingUpdate.objects.bulk_create(
+            ReadingUpdate(reading=self.reading, page=page) for page in range(1, 201)
+        )
+
+        # Two DELETEs of 100 updates, not queries per update (receivers skip cascades):
+        with self.assertNumQueries(8):
+            self.reading.delete()
+
+        tombstones = SyncChange.objects.filter(deleted=True)
+        self.assertEqual(list(tombstones.values_list("model", flat=True)), ["reading"])
+
+    @override_settings(READING_UPDATE_COALESCE_MINUTES=0, SYNC_OVERLAP_SECONDS=0)
+    def test_changes_are_batched(self):
+        token = self._sync()["token"]
+        for page in (10, 20, 30):
+            update_reading_progress(self.reading, pages=page)
+
+        delta = sync.changes_since(self.user, token, limit=2)
+        self.assertTrue(delta.more)
+
+        delta = sync.changes_since(self.user, delta.token, limit=10)
+        self.assertFalse(delta.more)
+        self.assertEqual([u.page for u in delta.saved["readingupdate"]], [20, 30])
+
+    def test_late_commits_are_sent(self):
+        update_reading_progress(self.reading, pages=50)
+        late = SyncChange.objects.filter(model="readingupdate").get()
+        # A client synced up to a later change, before this one was committed:
+        token = sync.encode_token(late.id + 1, timezone.now())
+
+        delta = sync.changes_since(self.user, token)
+        self.assertEqual([u.page for u in delta.saved["readingupdate"]], [50])
+
+        with override_settings(SYNC_OVERLAP_SECONDS=0):
+            self.assertEqual(sync.changes_since(self.user, token).saved["readingupdate"], [])
+
+    @override_settings(SYNC_RETENTION_DAYS=30)
+    def test_old_changes_are_pruned(self):
+        update_reading_progress(self.reading, pages=50)
+        month_ago = timezone.now() - timedelta(days=31)
+        SyncChange.objects.exclude(model="readingupdate").update(date=month_ago)
+
+        call_command("prune_sync_changes", stdout=StringIO())
+
+        self.assertEqual(list(SyncChange.objects.values_list("model", flat=True)),
+                         ["readingupdate"])
+        token = sync.encode_token(0, month_ago)
+        self.assertEqual(self.client.get("/api/sync/", {"token": token}).status_code, 400)
+
+    def test_invalid_token(self):
+        response = self.client.get("/api/sync/", {"token": "garbage"})
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.books import timeseries
+from apps.books.models import Book, Edition
+from apps.readings.api.views import MAX_ROLLING_DAYS
+from apps.readings.lib.controllers import update_reading_progress
+from apps.readings.models import Reading, ReadingUpdate
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class TestDailyPages(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="password")
+        book = Book.objects.create(title="A book")
+        self.edition = Edition.objects.create(book=book, title=book.title, pages=500)
+
+        # 100 pages over two days (from noon to noon), then 50 more in an instant:
+        self.reading = Reading.objects.create(reader=self.user, edition=self.edition,
+                                              start=local(2024, 3, 1, 12))
+        self._update(self.reading, 100, local(2024, 3, 3, 12))
+        self._update(self.reading, 150, local(2024, 3, 3, 12))
+
+        # Another reading, from a day without updates:
+        other = Reading.objects.create(reader=self.user, edition=self.edition,
+                                       start=local(2024, 3, 5, 18))
+        self._update(other, 30, local(2024, 3, 6, 6))
+
+    @staticmethod
+    def _update(reading, page, when):
+        ReadingUpdate.objects.create(reading=reading, page=page, date=when)
+
+    def test_pages_are_spread_over_days(self):
+        series = timeseries.build_daily_pages(self.user.id)
+
+        self.assertEqual(series.first_day, date(2024, 3, 1))
+        np.testing.assert_allclose(series.pages, [25, 50, 75, 0, 15, 15])
+
+    def test_window(self):
+        series = timeseries.build_daily_pages(self.user.id)
+
+        np.testing.assert_allclose(series.window(date(2024, 2, 28), date(2024, 3, 2)),
+                                   [0, 0, 25, 50])
+        np.testing.assert_allclose(series.window(date(2024, 3, 6), date(2024, 3, 8)), [15, 0, 0])
+
+    def test_rolling_rates(self):
+        rates = timeseries.rolling_rates(np.array([7., 0., 14.]), windows=(1, 2))
+
+        np.testing.assert_allclose(rates[1], [7, 0, 14])
+        np.testing.assert_allclose(rates[2], [3.5, 3.5, 7])
+
+    def test_user_without_updates(self):
+        other = User.objects.create_user(username="other", password="password")
+
+        self.assertEqual(timeseries.current_rates(other), {7: 0., 30: 0., 365: 0.})
+
+    def test_series_is_cached_until_updated(self):
+        reading = Reading.objects.create(reader=self.user, edition=self.edition,
+                                         start=timezone.now() - timedelta(hours=1))
+        self.assertEqual(timeseries.current_rates(self.user)[7], 0)
+
+        with self.assertNumQueries(0):
+            timeseries.current_rates(self.user)
+
+        update_reading_progress(reading, pages=70)
+
+        self.assertAlmostEqual(timeseries.current_rates(self.user)[7], 10)
+
+    def test_endpoints(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        heatmap = client.get("/api/readings/heatmap/", {"year": 2024}).json()
+        self.assertEqual(len(heatmap["pages"]), 366)
+        self.assertEqual(heatmap["pages"][60:66], [25, 50, 75, 0, 15, 15])
+        self.assertEqual(heatmap["max"], 75)
+
+        rates = client.get("/api/readings/rates/", {"days": 10}).json()
+        self.assertEqual(set(rates["pages_per_day"]), {"7", "30", "365"})
+        self.assertEqual(len(rates["rolling"]["30"]), 10)
+
+        rates = client.get("/api/readings/rates/", {"days": 10 ** 8}).json()
+        self.assertEqual(len(rates["rolling"]["30"]), MAX_ROLLING_DAYS)
+
+        for year in (0, 10000, 10 ** 12):
+            response = client.get("/api/readings/heatmap/", {"year": year})
+            self.assertEqual(response.status_code, 400)
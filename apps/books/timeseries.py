@@ -0,0 +1,166 @@
+"""
+Daily time series of pages read, built from the ReadingUpdate history of a user.
+
+ReadingUpdates hold cumulative page counts. The difference between consecutive ones (or
+from page 0 at the start of the Reading, for the first one) is the amount of pages read in
+between, which is spread evenly over that time span and summed per calendar (local) day.
+It is all done with NumPy, over arrays filled by a single query.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ReadingUpdate
+from biblio.core import data_version
+
+
+ROLLING_WINDOWS = (7, 30, 365)
+CACHE_TIMEOUT = 86400  # entries are invalidated by data version anyway
+
+
+@dataclass
+class DailySeries:
+    """Pages read each day, from 'first_day' on (one element of 'pages' per day)."""
+
+    first_day: date
+    pages: np.ndarray
+
+    def window(self, first, last):
+        """Pages read each day from 'first' to 'last' (both included). Zero outside self."""
+
+        n_days = (last - first).days + 1
+        if n_days <= 0:
+            return np.zeros(0)
+
+        offset = (first - self.first_day).days
+        window = np.zeros(n_days)
+        lo, hi = max(offset, 0), min(offset + n_days, len(self.pages))
+        if lo < hi:
+            window[lo - offset:hi - offset] = self.pages[lo:hi]
+
+        return window
+
+
+def daily_pages(user):
+    """DailySeries of 'user', cached until their reading data changes."""
+
+    key = f"daily-pages:{user.id}:{data_version(user.id)}"
+    series = cache.get(key)
+
+    if series is None:
+        series = build_daily_pages(user.id)
+        cache.set(key, series, CACHE_TIMEOUT)
+
+    return series
+
+
+def build_daily_pages(user_id):
+    """Compute DailySeries of User with id 'user_id', from scratch."""
+
+    rows = list(
+        ReadingUpdate.objects.filter(reading__reader_id=user_id)
+        .order_by("reading_id", "date", "id")
+        .values_list("reading_id", "reading__start", "date", "page")
+    )
+    if not rows:
+        return DailySeries(timezone.localdate(), np.zeros(0))
+
+    reading_ids, starts, dates, pages = zip(*rows)
+    reading_ids = np.array(reading_ids)
+    ends = np.array([dt.timestamp() for dt in dates])
+    starts = np.minimum(np.array([dt.timestamp() for dt in starts]), ends)
+    pages = np.array(pages, dtype=float)
+
+    # Each update closes a span opened by the previous update of the same Reading, or by
+    # the start of the Reading (at page 0) if it is the first one:
+    is_first = np.ones(len(rows), dtype=bool)
+    is_first[1:] = reading_ids[1:] != reading_ids[:-1]
+    begins = np.where(is_first, starts, np.roll(ends, 1))
+    deltas = pages - np.where(is_first, 0., np.roll(pages, 1))
+
+    first_day, midnights = local_midnights(begins.min(), ends.max())
+
+    # Work relative to the first midnight, for precision:
+    origin = midnights[0]
+    midnights, begins, ends = midnights - origin, begins - origin, ends - origin
+
+    spans = ends - begins
+    spread = spans > 0
+    rates = deltas[spread] / spans[spread]
+    cumulative = _sum_of_ramps(midnights, begins[spread], ends[spread], rates)
+    daily = np.diff(cumulative)
+
+    # Updates with no time span since the previous one count whole in their day:
+    days = np.searchsorted(midnights, ends[~spread], side="right") - 1
+    np.add.at(daily, days, deltas[~spread])
+
+    return DailySeries(first_day, daily)
+
+
+def rolling_rates(pages, windows=ROLLING_WINDOWS):
+    """
+    Dict of window -> array with mean pages per day over the 'window' days ending on each
+    day of 'pages' (days before the first one count as zero).
+    """
+    cumulative = np.concatenate(([0.], np.cumsum(pages)))
+    ends = np.arange(1, len(pages) + 1)
+
+    return {
+        window: (cumulative[ends] - cumulative[np.maximum(ends - window, 0)]) / window
+        for window in windows
+    }
+
+
+def current_rates(user, windows=ROLLING_WINDOWS):
+    """Dict of window -> mean pages per day read by 'user' over the last 'window' days."""
+
+    today = timezone.localdate()
+    longest = max(windows)
+    pages = daily_pages(user).window(today - timedelta(days=longest - 1), today)
+
+    return {window: float(pages[-window:].sum() / window) for window in windows}
+
+
+def calendar_heatmap(user, year):
+    """Pages read by 'user' each day of 'year', as an array."""
+
+    return daily_pages(user).window(date(year, 1, 1), date(year, 12, 31))
+
+
+def local_midnights(first_timestamp, last_timestamp):
+    """
+    First local day spanned by given timestamps, and array of timestamps of local
+    midnights from the start of that day to the end of the last one.
+    """
+    first_day, last_day = (
+        timezone.localtime(datetime.fromtimestamp(ts, tz=dt_timezone.utc)).date()
+        for ts in (first_timestamp, last_timestamp)
+    )
+    n_days = (last_day - first_day).days + 1
+    midnights = np.array([
+        timezone.make_aware(datetime.combine(first_day + timedelta(days=n), time())).timestamp()
+        for n in range(n_days + 1)
+    ])
+
+    return first_day, midnights
+
+
+def _sum_of_ramps(t, begins, ends, rates):
+    """Sum over i of rates[i] * (clip(t, begins[i], ends[i]) - begins[i]), for each 't'."""
+
+    return _sum_of_hinges(t, begins, rates) - _sum_of_hinges(t, ends, rates)
+
+
+def _sum_of_hinges(t, onsets, slopes):
+    """Sum over i of slopes[i] * max(t - onsets[i], 0), for each 't'."""
+
+    order = np.argsort(onsets)
+    onsets, slopes = onsets[order], slopes[order]
+    cumulative_slopes = np.concatenate(([0.], np.cumsum(slopes)))
+    cumulative_moments = np.concatenate(([0.], np.cumsum(slopes * onsets)))
+    active = np.searchsorted(onsets, t, side="right")
+
+    return t * cumulative_slopes[active] - cumulative_moments[active]
@@ -15,6 +15,7 @@ urlpatterns = [
     path('sagas', views.sagas, name="sagas"),
     path('bibliography/<int:author_id>', views.bibliography, name="bibliography"),
     path('stats/<int:year>', views.stats, name="stats"),
+    path('history', views.history, name="history"),
 
     # Details:
     path('book/<int:book_id>', views.book_detail, name='book_detail'),
@@ -26,6 +27,10 @@ urlpatterns = [
     path('add_edition/<int:book_id>', views.add_edition, name='add_edition'),
     path('modify_edition/<int:edition_id>', views.modify_edition, name='modify_edition'),
     path('find_book', views.find_book, name='find_book'),
+    path('autocomplete', views.autocomplete_catalog, name='autocomplete'),
+    path('isbn/<str:code>', views.isbn_lookup, name='isbn_lookup'),
+    path('import', views.import_library, name='import_library'),
+    path('export', views.export_library, name='export_library'),
     path('update_reading/<int:reading_id>', views.update_reading, name='update_reading'),
     path(
         'update_book_reading/<int:book_id>',
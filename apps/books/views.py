@@ -1,15 +1,20 @@
+import io
 from typing import Optional
+from urllib.parse import urlencode
 
 from django.utils import timezone
 from django.shortcuts import render, redirect
-from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
-
-from . import core, statistics
-from .models import Book, Author, Saga, Edition, BookCopy
-from .forms import ReadingUpdateForm, AddBookForm, AddEditionForm, SearchAuthorOrBookForm
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+
+from . import autocomplete, core, exporter, importer, search, statistics
+from .models import Book, Author, Edition, BookCopy
+from .forms import (
+    ReadingUpdateForm, AddBookForm, AddEditionForm, SearchAuthorOrBookForm, ImportLibraryForm,
+)
+from .isbn import InvalidISBN
 from apps.readings.api.views import ReadingViewSet
 from apps.readings.lib.controllers import update_reading_progress
 from apps.readings.models import Reading
@@ -36,6 +41,19 @@ def stats(request, year: Optional[int] = None):
     return render(request, "books/stats.html", context)
 
 
+@login_required
+def history(request):
+    """View with statistics for all years with readings."""
+
+    context = {
+        "banner": "History",
+        "books_history_active": True,
+        "history": statistics.yearly_history(request.user),
+    }
+
+    return render(request, "books/history.html", context)
+
+
 @login_required
 def reading_and_read(request):
     """Index view."""
@@ -69,23 +87,8 @@ def sagas(request):
 def bibliography(request, author_id: int):
     """Bibliography of an author."""
 
-    author = Author.objects.filter(id=author_id).first()
-    books = Book.objects.filter(authors=author)
-
-    author_sagas = {}
-    for book in books:
-        if book.saga not in author_sagas:
-            author_sagas[book.saga] = []
-        author_sagas[book.saga].append(book)
-
-    bg = {}
-    for saga, books in author_sagas.items():
-        dsu = sorted([(b.index_in_saga, b) for b in books])
-        key = saga or "No saga"
-        bg[key] = [b for _, b in dsu]
-
     context = {
-        "bibliography": bg,
+        "bibliography": core.bibliography_of(author_id, request.user),
     }
 
     return render(request, "books/bibliography.html", context)
@@ -169,31 +172,13 @@ def add_book(request):
                 # Saga info:
                 saga_name = form.cleaned_data.get("saga")
                 if saga_name:
-                    try:
-                        book.saga = Saga.objects.get(name=saga_name)
-                    except ObjectDoesNotExist:
-                        # Horrible hack to assign to new Saga object the first available id,
-                        # because PostgreSQL at Heroku fails to assign an automatic one that
-                        # is not duplicated if we simply do saga = Saga(name=saga_name)
-                        saga_id = 1
-                        for saga_id in range(1, 10000):  # max try 10000 sagas
-                            if not Saga.objects.filter(id=saga_id):
-                                break
-                        saga = Saga(name=saga_name, id=saga_id)
-                        saga.save()
-                        book.saga = saga
+                    book.saga = core.saga_named(saga_name)
                     book.index_in_saga = form.cleaned_data.get("index")
                 book.save()  # we must save BEFORE we add many-to-many field items (author(s) below)
 
                 # Add author data:
-                author_names = [a.strip() for a in form.cleaned_data.get("author", "").split(",")]
-                for author_name in author_names:
-                    try:
-                        author = Author.objects.get(name=author_name)
-                    except Author.DoesNotExist:
-                        author = Author(name=author_name)
-                        author.save()
-                    book.authors.add(author)
+                authors = core.resolve_authors(form.cleaned_data.get("author", "").split(","))
+                book.authors.add(*authors)
 
                 return redirect("books:book_detail", book_id=book.id)
 
@@ -229,24 +214,13 @@ def modify_book(request, book_id=None):
                 # Saga info:
                 saga_name = form.cleaned_data.get("saga")
                 if saga_name:
-                    try:
-                        book.saga = Saga.objects.get(name=saga_name)
-                    except ObjectDoesNotExist:
-                        saga_name = Saga(name=saga_name)
-                        saga_name.save()
-                        book.saga = saga_name
+                    book.saga = core.saga_named(saga_name)
                     book.index_in_saga = form.cleaned_data.get("index")
                 book.save()  # we must save BEFORE we add many-to-many field items (author(s) below)
 
-                # Add author data:
-                author_names = [a.strip() for a in form.cleaned_data.get("author", "").split(",")]
-                for author_name in author_names:
-                    try:
-                        author = Author.objects.get(name=author_name)
-                    except Author.DoesNotExist:  # noqa
-                        author = Author(name=author_name)
-                        author.save()
-                    book.authors.add(author)
+                # Author data (replacing previous ones):
+                authors = core.resolve_authors(form.cleaned_data.get("author", "").split(","))
+                book.authors.set(authors)
 
                 return redirect("books:book_detail", book_id=book.id)
 
@@ -274,9 +248,10 @@ def add_edition(request, book_id=None):
     """Form to create an Edition."""
 
     book = Book.objects.get(id=book_id)
+    form = None
 
     if request.method == "POST":
-        form = AddEditionForm(request.POST or None)
+        form = AddEditionForm(request.POST or None, editions=book.edition_set.all())
         if form.is_valid():
             data = form.cleaned_data
             title = data.get("title")
@@ -299,7 +274,7 @@ def add_edition(request, book_id=None):
     }
     context = {
         "banner": f"Edition of '{book}'",
-        "form": AddEditionForm(initial=initial),
+        "form": form if form is not None else AddEditionForm(initial=initial),
         "book": book,
         "action": "add",
     }
@@ -312,9 +287,11 @@ def modify_edition(request, edition_id):
     """Form to modify an Edition."""
 
     edition = Edition.objects.get(id=edition_id)
+    form = None
 
     if request.method == "POST":
-        form = AddEditionForm(request.POST or None)
+        form = AddEditionForm(request.POST or None,
+                              editions=edition.book.edition_set.exclude(pk=edition.pk))
         if form.is_valid():
             data = form.cleaned_data
             title = data.get("title")
@@ -325,7 +302,7 @@ def modify_edition(request, edition_id):
                 edition.pages = data["pages"]
                 edition.save()
 
-        return redirect("books:book_detail", book_id=edition.book.id)
+            return redirect("books:book_detail", book_id=edition.book.id)
 
     initial = {
         "title": edition.title,
@@ -335,7 +312,7 @@ def modify_edition(request, edition_id):
     }
     context = {
         "banner": f"Edition of '{edition.book}'",
-        "form": AddEditionForm(initial=initial),
+        "form": form if form is not None else AddEditionForm(initial=initial),
         "book": edition.book,
         "action": "modify",
     }
@@ -345,36 +322,122 @@ def modify_edition(request, edition_id):
 
 @login_required
 def find_book(request):
-    """View to find a Book."""
-
-    # Default for GET:
-    matching_books = Book.objects.none()
-    matching_authors = Author.objects.none()
-    form = SearchAuthorOrBookForm(initial={"query": "", "search_type": "book"})
+    """
+    View to find Books, Authors, Sagas and Editions. Searches come POSTed from the form,
+    and further pages of results are GETs with the same fields, plus 'page'.
+    """
+    form = SearchAuthorOrBookForm(initial={"query": "", "search_type": "all"})
+    results = None
+    data = request.POST if request.method == "POST" else request.GET
 
-    if request.method == "POST":
-        posted_form = SearchAuthorOrBookForm(request.POST or None)
+    if "query" in data:
+        posted_form = SearchAuthorOrBookForm(data)
 
         if posted_form.is_valid():
-            search_for = posted_form.cleaned_data.get("query")
+            query = posted_form.cleaned_data.get("query")
             search_type = posted_form.cleaned_data.get("search_type")
-            if search_type == "book":
-                matching_books = Book.objects.filter(title__icontains=search_for)
-            else:
-                matching_authors = Author.objects.filter(name__icontains=search_for)
+            results = search.search(
+                query,
+                kind=None if search_type == "all" else search_type,
+                page=_page_number(data),
+            )
+            book_ids = {result.book_id for result in results.results if result.book_id}
+            statuses = core.book_statuses_for(book_ids, request.user) if book_ids else {}
+            for result in results.results:
+                result.status = statuses.get(result.book_id, "not-owned")
+
             form = posted_form
 
     context = {
         "banner": None,
         "find_book_active": True,
         "form": form,
-        "matching_books": matching_books,
-        "matching_authors": matching_authors,
+        "results": results,
     }
+    if results is not None:
+        fields = {"query": query, "search_type": search_type}
+        context["previous_page"] = urlencode({**fields, "page": results.number - 1})
+        context["next_page"] = urlencode({**fields, "page": results.number + 1})
 
     return render(request, "books/find_book.html", context)
 
 
+@login_required
+def isbn_lookup(request, code):
+    """Go to the Book of the Edition with ISBN 'code' (as scanned), or search for it if none."""
+
+    try:
+        editions = core.editions_with_isbn(code)
+    except InvalidISBN:
+        editions = []
+
+    if editions:
+        return redirect("books:book_detail", book_id=editions[0].book_id)
+
+    query = urlencode({"query": code, "search_type": "all"})
+
+    return redirect(f"{reverse('books:find_book')}?{query}")
+
+
+@login_required
+def import_library(request):
+    """Form to upload an export file (see importer.py), imported as the library of the user."""
+
+    form = ImportLibraryForm(request.POST or None, request.FILES or None)
+    report = None
+
+    if request.method == "POST" and form.is_valid():
+        upload, file_format = form.cleaned_data["file"], form.cleaned_data["file_format"]
+        if upload.size > importer.SYNC_MAX_BYTES:  # would outlast the request timeout
+            form.add_error("file", f"Files over {importer.SYNC_MAX_BYTES // 1_000_000} MB are "
+                                   "imported with the import_library management command.")
+        else:
+            # Read the upload as a stream, without loading it all in memory:
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            report = importer.LibraryImporter(request.user).run(stream, file_format)
+
+    context = {
+        "banner": "Import library",
+        "form": form,
+        "report": report,
+    }
+
+    return render(request, "books/import_library.html", context)
+
+
+@login_required
+def export_library(request):
+    """Stream GET 'table' of the library of the user (see exporter.py), in GET 'format'."""
+
+    table = request.GET.get("table", "readings")
+    file_format = request.GET.get("format", "csv")
+    if table not in exporter.TABLES or file_format not in exporter.FORMATS:
+        return HttpResponseBadRequest(f"Tables: {', '.join(exporter.TABLES)}. "
+                                      f"Formats: {', '.join(exporter.FORMATS)}.")
+
+    response = StreamingHttpResponse(
+        exporter.export(request.user, table, file_format),
+        content_type=exporter.CONTENT_TYPES[file_format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{table}.{file_format}"'
+
+    return response
+
+
+@login_required
+def autocomplete_catalog(request):
+    """JSON with Books, Authors and Sagas whose names complete (or resemble) GET 'q'."""
+
+    results = autocomplete.suggest(request.GET.get("q", ""))
+
+    return JsonResponse({
+        "results": [
+            {"kind": result.kind, "id": result.object_id, "name": result.title, "url": result.url}
+            for result in results
+        ],
+    })
+
+
 @login_required
 def mark_reading_done(request, reading_id):
     """
@@ -404,7 +467,7 @@ def mark_reading_dnf(request, reading_id):
 def mark_reading_pages(request, reading_id):
     """Come here with a POST to mark 'pages' pages read on a book."""
 
-    reading = Reading.objects.get(pk=reading_id)
+    reading = Reading.objects.select_related("edition").get(pk=reading_id)
     new_pages = request.POST.get("new_pages")
 
     if new_pages is not None:
@@ -468,3 +531,12 @@ def author_detail(request, author_id=None):
     }
 
     return render(request, "books/author_detail.html", context)
+
+
+def _page_number(data):
+    """Page number asked for in 'data' (1 if none or invalid)."""
+
+    try:
+        return max(int(data.get("page", 1)), 1)
+    except ValueError:
+        return 1
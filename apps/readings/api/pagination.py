@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination: no COUNT(*), and no OFFSET growing with the page number,
+    so every page costs the same. Ordering must be backed by an index, ending in a unique
+    field for stable cursors.
+    """
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class ReadingPagination(KeysetPagination):
+    ordering = ("-start", "-id")  # index on (reader, start)
+
+
+class ReadingUpdatePagination(KeysetPagination):
+    ordering = ("date", "id")  # index on (date, id), or on (reading, date) with ?reading=
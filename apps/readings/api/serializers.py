@@ -20,7 +20,16 @@ class ReadingBaseSerializer(ModelSerializer):
 
     @classmethod
     def setup_eager_loading(cls, queryset, *args, **kwargs):
-        return queryset.order_by("-start")
+        latest_update = ReadingUpdate.objects.filter(reading=OuterRef("id")).order_by("-date")
+
+        return queryset.select_related("edition__book").annotate(
+            latest_page=Coalesce(Subquery(latest_update.values("page")[:1]), 0),
+        ).annotate(
+            pages_to_deadline=(
+                as_float(F("deadline_percent")) * as_float(F("edition__pages")) / 100.
+                - F("latest_page")
+            ),
+        ).order_by("-start")
 
     @staticmethod
     def get_fraction_read(obj) -> float:
@@ -91,20 +100,43 @@ class ReadingProgressSerializer(ReadingBaseSerializer):
         Given the current progress in the Reading and the deadline date (and percent), if any,
         calculate the amount of pages per day one would have to read to meet the deadline.
         """
+        return pages_per_day_to_meet_deadline(
+            obj.deadline,
+            ReadingProgressSerializer.pages_to_deadline(obj),
+        )
+
+    @staticmethod
+    def pages_to_deadline(obj) -> Optional[float]:
+        """
+        Pages left to read in the Reading to reach its deadline percent, if any deadline.
+        Annotated by setup_eager_loading(), or computed otherwise.
+        """
         if obj.deadline is None:
             return None
 
-        dt = obj.deadline - timezone.now()
+        if hasattr(obj, "pages_to_deadline"):
+            return obj.pages_to_deadline
 
-        if dt < timedelta(seconds=0):
-            return None
+        return obj.deadline_percent*obj.edition.pages/100 - obj.page_progress
 
-        dp = obj.deadline_percent*obj.edition.pages/100 - obj.page_progress
 
-        if dp <= 0:
-            return None
+def pages_per_day_to_meet_deadline(deadline, pages_left) -> Optional[float]:
+    """
+    Pages per day one would have to read, from now on, to read 'pages_left' pages
+    by 'deadline'. None if there is no deadline, it has passed, or nothing is left.
+    """
+    if deadline is None:
+        return None
+
+    dt = deadline - timezone.now()
+
+    if dt < timedelta(seconds=0):
+        return None
+
+    if pages_left <= 0:
+        return None
 
-        return 86400*dp/dt.total_seconds()
+    return 86400*pages_left/dt.total_seconds()
 
 
 class ReadingUpdateBaseSerializer(ModelSerializer):
@@ -119,3 +151,18 @@ class ReadingUpdateBaseSerializer(ModelSerializer):
 
 class ReadingUpdateSerializer(ReadingUpdateBaseSerializer):
     pass
+
+
+class ReadingSyncSerializer(ModelSerializer):
+
+    class Meta:
+        model = Reading
+        fields = ("id", "edition", "start", "end", "status", "deadline", "deadline_percent",
+                  "current_page")
+
+
+class ReadingUpdateSyncSerializer(ModelSerializer):
+
+    class Meta:
+        model = ReadingUpdate
+        fields = ("id", "reading", "page", "date")
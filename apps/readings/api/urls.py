@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from .views import ReadingViewSet, ReadingUpdateViewSet
+from .views import ReadingViewSet, ReadingUpdateViewSet, SyncViewSet
 
 
 app_name = "readings"
@@ -10,6 +10,7 @@ app_name = "readings"
 router = routers.DefaultRouter()
 router.register(r"readings", ReadingViewSet, basename="readings")
 router.register(r"readingupdates", ReadingUpdateViewSet, basename="readingupdates")
+router.register(r"sync", SyncViewSet, basename="sync")
 
 urlpatterns = [
     path("", include(router.urls)),
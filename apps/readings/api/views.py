@@ -1,25 +1,43 @@
+from datetime import MAXYEAR, MINYEAR, date, timedelta
 from typing import Optional
 
-from rest_framework import permissions
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.viewsets import ModelViewSet, ViewSet
 
-from apps.readings.lib.controllers import update_reading_progress
+from apps.books import timeseries
+from apps.books.api.serializers import BookCopySyncSerializer, EditionSyncSerializer
+from apps.readings.lib import sync
+from apps.readings.lib.controllers import bulk_update_reading_progress, update_reading_progress
 from apps.readings.lib.custom_definitions import ReadingStatus
 from apps.readings.models import Reading, ReadingUpdate
+from apps.readings.api.pagination import ReadingPagination, ReadingUpdatePagination
 from apps.readings.api.serializers import (
     ReadingSerializer,
     ReadingProgressSerializer,
     ReadingBaseSerializer,
     ReadingUpdateSerializer,
     ReadingUpdateBaseSerializer,
+    ReadingSyncSerializer,
+    ReadingUpdateSyncSerializer,
+    pages_per_day_to_meet_deadline,
 )
+from biblio.core import data_version
+
+
+MAX_ROLLING_DAYS = 3650
 
 
 class ReadingViewSet(ModelViewSet):
     serializer_class = ReadingSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = ReadingPagination
+
+    PROGRESS_CACHE_TIMEOUT = 86400  # entries are invalidated by data version anyway
 
     def get_queryset(self):
         user = self.request.user
@@ -34,13 +52,76 @@ class ReadingViewSet(ModelViewSet):
         """
         Return Readings that are ongoing, and what progress it has been made on them.
         """
-        qs = self.get_queryset()
-        qs = qs.filter(status=ReadingStatus.STARTED)
+        user = self.request.user
+        key = f"progress:{user.id}:{data_version(user.id)}"
+        cached = cache.get(key)
+
+        if cached is None:
+            qs = self.get_queryset()
+            qs = qs.filter(status=ReadingStatus.STARTED)
+
+            data = list(ReadingProgressSerializer(qs, many=True).data)
+            deadlines = {
+                reading.id: (reading.deadline, ReadingProgressSerializer.pages_to_deadline(reading))
+                for reading in qs
+                if reading.deadline is not None
+            }
+            cached = data, deadlines
+            cache.set(key, cached, self.PROGRESS_CACHE_TIMEOUT)
+
+        data, deadlines = cached
+
+        # Time-dependent, so never served from cache:
+        for item in data:
+            if item["id"] in deadlines:
+                item["pages_per_day_to_meet_deadline"] = pages_per_day_to_meet_deadline(
+                    *deadlines[item["id"]]
+                )
+
+        return Response(data=data)
 
-        data = ReadingProgressSerializer(qs, many=True).data
+    @action(detail=False, methods=['GET'], url_path="rates")
+    def rates(self, request=None):
+        """
+        Return mean pages per day read over the last 7, 30 and 365 days and, if a 'days'
+        parameter is given, those rolling means for each of the last 'days' days (at most
+        MAX_ROLLING_DAYS).
+        """
+        user = self.request.user
+        data = {"pages_per_day": timeseries.current_rates(user)}
+
+        days = min(_int_param(self.request, "days", 0), MAX_ROLLING_DAYS)
+        if days > 0:
+            today = timezone.localdate()
+            first = today - timedelta(days=days - 1)
+            longest = max(timeseries.ROLLING_WINDOWS)
+            pages = timeseries.daily_pages(user).window(first - timedelta(days=longest), today)
+            data["start"] = first.isoformat()
+            data["rolling"] = {
+                window: np.round(rates[-days:], 2).tolist()
+                for window, rates in timeseries.rolling_rates(pages).items()
+            }
 
         return Response(data=data)
 
+    @action(detail=False, methods=['GET'], url_path="heatmap")
+    def heatmap(self, request=None):
+        """Return pages read each day of the year given as 'year' parameter (default: current)."""
+
+        year = _int_param(self.request, "year", timezone.localdate().year)
+        if not MINYEAR <= year <= MAXYEAR:
+            return Response(data={"year": f"Expected a year from {MINYEAR} to {MAXYEAR}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        pages = timeseries.calendar_heatmap(self.request.user, year)
+
+        return Response(data={
+            "year": year,
+            "start": date(year, 1, 1).isoformat(),
+            "pages": np.round(pages, 1).tolist(),
+            "max": float(pages.max(initial=0)),
+        })
+
     @action(detail=True, methods=['POST'], url_path="set_deadline_drf")
     def set_deadline(self, request=None, pk: Optional[int] = None):
         """
@@ -58,11 +139,14 @@ class ReadingViewSet(ModelViewSet):
 class ReadingUpdateViewSet(ModelViewSet):
     serializer_class = ReadingUpdateSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = ReadingUpdatePagination
 
     def get_queryset(self):
         user = self.request.user
 
-        qs = ReadingUpdate.objects.filter(reading__reader=user).order_by("date")
+        qs = ReadingUpdate.objects.filter(reading__reader=user).order_by("date", "id")
+        if reading_id := _int_param(self.request, "reading", None):
+            qs = qs.filter(reading_id=reading_id)
         qs = ReadingUpdateBaseSerializer.setup_eager_loading(qs)
 
         return qs
@@ -84,3 +168,67 @@ class ReadingUpdateViewSet(ModelViewSet):
             data = ReadingProgressSerializer(reading).data
 
         return Response(data)
+
+    @action(detail=False, methods=['POST'], url_path="bulk")
+    def bulk(self, request=None):
+        """
+        Apply a list of updates ({reading, pages, percent, date}) given as 'updates', in
+        order. Return how many were applied, which were rejected (by index, with reason),
+        and the progress of the Readings updated.
+        """
+        updates = self.request.data.get("updates")
+        if not isinstance(updates, list) or not all(isinstance(u, dict) for u in updates):
+            return Response(data={"updates": "Expected a list of updates."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        readings, rejected = bulk_update_reading_progress(self.request.user, updates)
+
+        qs = Reading.objects.filter(id__in=[reading.id for reading in readings])
+        qs = ReadingBaseSerializer.setup_eager_loading(qs)
+
+        return Response(data={
+            "applied": len(updates) - len(rejected),
+            "rejected": rejected,
+            "progress": ReadingProgressSerializer(qs, many=True).data,
+        })
+
+
+class SyncViewSet(ViewSet):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    SERIALIZERS = {
+        "reading": ReadingSyncSerializer,
+        "readingupdate": ReadingUpdateSyncSerializer,
+        "edition": EditionSyncSerializer,
+        "bookcopy": BookCopySyncSerializer,
+    }
+
+    def list(self, request):
+        """
+        Return Readings, ReadingUpdates, Editions and BookCopies of user saved or deleted
+        since the sync token given as 'token' parameter (all of them, if none), and the
+        token to ask with next time. If 'more' is true, ask again right away.
+        """
+        try:
+            delta = sync.changes_since(request.user, request.query_params.get("token"))
+        except ValueError as e:
+            return Response(data={"token": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(data={
+            "token": delta.token,
+            "more": delta.more,
+            "saved": {
+                name: self.SERIALIZERS[name](rows, many=True).data
+                for name, rows in delta.saved.items()
+            },
+            "deleted": delta.deleted,
+        })
+
+
+def _int_param(request, name, default):
+    """Query parameter 'name' of 'request', as an int, or 'default' if missing or invalid."""
+
+    try:
+        return int(request.query_params.get(name, default))
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,106 @@
+"""
+Compaction of ReadingUpdate histories:
+- Bursts of updates (e.g. from dragging a progress slider) are coalesced: of each run
+  of updates less than READING_UPDATE_COALESCE_MINUTES apart, only the first and last
+  are kept.
+- Histories of closed Readings are downsampled to the first and last update of each
+  (local) day.
+Neither changes the start, the end or the daily totals of the time series of pages read.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from apps.books import timeseries
+from apps.readings.lib.sync import record_changes
+from apps.readings.models import ReadingUpdate
+from biblio.core import bump_data_version
+
+
+def coalesce_window():
+    """Time span within which updates of a Reading are coalesced. None if disabled."""
+
+    minutes = settings.READING_UPDATE_COALESCE_MINUTES
+
+    return timedelta(minutes=minutes) if minutes else None
+
+
+def updates_to_coalesce(rows, window):
+    """
+    Yield those of 'rows' (ReadingUpdates) to remove, so that of each run of updates less
+    than 'window' apart only the first and last remain. 'rows' are tuples starting with
+    (id, reading_id, date), sorted by reading_id and date.
+    """
+    run = []
+    for row in rows:
+        if run and (row[1] != run[-1][1] or row[2] - run[-1][2] > window):
+            yield from run[1:-1]
+            run = []
+        run.append(row)
+
+    yield from run[1:-1]
+
+
+def updates_to_downsample(reading_ids, timestamps):
+    """
+    Boolean mask of ReadingUpdates to remove so that only the first and last update of
+    each Reading on each local day remain. Pages read between them are within that day,
+    so daily totals don't change. Arrays are of ReadingUpdates sorted by Reading and date,
+    with complete Readings.
+    """
+    if len(timestamps) == 0:
+        return np.zeros(0, dtype=bool)
+
+    _, midnights = timeseries.local_midnights(timestamps.min(), timestamps.max())
+    days = np.searchsorted(midnights, timestamps, side="right")
+
+    new_group = np.ones(len(days), dtype=bool)
+    new_group[1:] = (reading_ids[1:] != reading_ids[:-1]) | (days[1:] != days[:-1])
+    ends_group = np.roll(new_group, -1)
+    ends_group[-1] = True
+
+    return ~(new_group | ends_group)
+
+
+def chunks_of(readings, chunk_size):
+    """
+    Yield lists of 'readings' (tuples of id, reader_id, n_updates) with about 'chunk_size'
+    ReadingUpdates, for commands to process (and delete) a chunk at a time.
+    """
+    chunk, n_updates = [], 0
+    for reading in readings:
+        if chunk and n_updates + reading[2] > chunk_size:
+            yield chunk
+            chunk, n_updates = [], 0
+        chunk.append(reading)
+        n_updates += reading[2]
+
+    if chunk:
+        yield chunk
+
+
+def delete_reading_updates(update_ids_by_user):
+    """
+    Delete ReadingUpdates ({user_id: [ids]}) in bulk, with QuerySet.delete() of chunks of
+    ids. Signal receivers leave bulk deletes to their caller (see apps/books/signals.py),
+    since they would refresh derived data once per row. So only for updates that are neither
+    the first nor the last of a Reading (which is all YearlyReadingStats and current_page
+    depend on): caches are invalidated, and tombstones logged for sync, here. Return amount
+    of rows deleted.
+    """
+    deleted = 0
+    with transaction.atomic():
+        for user_id, update_ids in update_ids_by_user.items():
+            for start in range(0, len(update_ids), 500):
+                chunk = update_ids[start:start + 500]
+                deleted += ReadingUpdate.objects.filter(id__in=chunk).delete()[0]
+
+                record_changes([ReadingUpdate(id=update_id) for update_id in chunk], user_id,
+                               deleted=True)
+
+    if update_ids_by_user:
+        bump_data_version(*update_ids_by_user)
+
+    return deleted
@@ -1,27 +1,40 @@
 from typing import Optional
 
+from django.db import transaction
+from django.db.models import Case, IntegerField, OuterRef, Subquery, Value, When
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
+from apps.books.statistics import refresh_yearly_stats
+from apps.readings.lib.compaction import coalesce_window
+from apps.readings.lib.snapshot import invalidate_snapshot
+from apps.readings.lib.sync import record_changes
 from apps.readings.models import Reading, ReadingUpdate
+from biblio.core import bump_data_version
 
 
 def update_reading_progress(
     reading: Reading,
     pages: Optional[int] = None,
     percent: Optional[float] = None,
-) -> None:
+) -> bool:
     """
     If a valid amount of pages, or read percent, is given, then update the
     Reading. This actually means to create a new ReadingUpdate object
     with te adequate amount of pages.
 
+    The check and the write are a single conditional UPDATE, so concurrent
+    updates (e.g. from two devices) can never move a Reading backwards.
+    Along with the sync log and YearlyReadingStats kept by signals, that is
+    5 queries in a transaction.
+
     Args:
         reading (Reading): Reading object to update.
         pages (int): if specified, amount of pages read.
         percent (float): if specified, percentage of book read.
 
     Returns:
-        Nothing.
+        Whether the update was applied.
     """
     max_pages = reading.edition.pages
     new_pages = 0
@@ -29,10 +42,147 @@ def update_reading_progress(
     if percent is not None and percent <= 100:
         new_pages = int(percent * max_pages / 100)
 
-    new_pages = max(pages, new_pages)
+    new_pages = max(pages or 0, new_pages)
+
+    if not 0 < new_pages <= max_pages:  # only valid updates (less than max)
+        return False
+
+    with transaction.atomic():  # together with rollups updated by signals
+        applied = Reading.objects.filter(
+            pk=reading.pk,
+            current_page__lt=new_pages,  # only save if an update
+        ).update(current_page=new_pages)
 
-    if reading.page_progress < new_pages <= max_pages:  # only save if an update, and valid (less than max)
-        ReadingUpdate(reading=reading, page=new_pages, date=timezone.now()).save()
+        if applied:  # update() sends no post_save: the ReadingUpdate logs the Reading
+            _save_reading_update(reading, new_pages)
+
+    if applied:
         reading.current_page = new_pages
-        reading.save()
 
+    return bool(applied)
+
+
+def _save_reading_update(reading: Reading, page: int) -> None:
+    """
+    Save a ReadingUpdate of 'page' for 'reading'. If the latest one is within the coalesce
+    window, and not the first of its run (see lib/compaction.py), replace it instead.
+    """
+    now = timezone.now()
+    window = coalesce_window()
+
+    if window is not None:
+        latest = list(ReadingUpdate.objects.filter(reading=reading).order_by("-date", "-id")[:2])
+        if len(latest) == 2:
+            last, previous = latest
+            if now - last.date <= window and last.date - previous.date <= window:
+                last.reading, last.page, last.date = reading, page, now
+                last.save(update_fields=["page", "date"])
+                return
+
+    ReadingUpdate(reading=reading, page=page, date=now).save()
+
+
+def bulk_update_reading_progress(user, updates: list[dict]) -> tuple[list[Reading], list[dict]]:
+    """
+    Apply a batch of progress updates of Readings of 'user' at once, e.g. queued by a client
+    while offline. Each update is a dict with "reading" (id), and "pages" and/or "percent",
+    and optionally "date" (ISO 8601, in the current time zone if naive; default: now). They
+    are validated in order, in memory: an update is rejected unless it moves its Reading
+    forward, up to the page count, at a date between its latest update and now.
+
+    The Readings are locked (SELECT ... FOR UPDATE) while validated, so a concurrent update
+    cannot move them past what was validated. All ReadingUpdates are created with one
+    bulk_create(), and Readings updated with one conditional UPDATE (as in
+    update_reading_progress, so they never go backwards), in the same transaction. Since
+    that sends no signals, derived data (current year stats, caches, sync log) is refreshed
+    here.
+
+    Returns:
+        The Readings updated, and a list of {"index", "error"} for rejected updates.
+    """
+    reading_ids = {update.get("reading") for update in updates}
+    latest_update = ReadingUpdate.objects.filter(reading=OuterRef("id")).order_by("-date")
+
+    with transaction.atomic():
+        # Locked until commit, so updates validated against them are all applied:
+        readings = {
+            reading.id: reading
+            for reading in Reading.objects.filter(reader=user, id__in=reading_ids - {None})
+            .select_related("edition")
+            .select_for_update(of=("self",))
+            .annotate(latest_date=Subquery(latest_update.values("date")[:1]))
+        }
+        new_updates, rejected, changed = _validate_progress_updates(updates, readings)
+
+        if new_updates:
+            ReadingUpdate.objects.bulk_create(new_updates)
+            new_pages = Case(
+                *(When(id=reading.id, then=Value(reading.current_page))
+                  for reading in changed.values()),
+                output_field=IntegerField(),
+            )
+            Reading.objects.filter(id__in=changed, current_page__lt=new_pages).update(
+                current_page=new_pages,
+            )
+            record_changes([*new_updates, *changed.values()], user.id)
+            refresh_yearly_stats(user.id)
+
+    if new_updates:
+        bump_data_version(user.id)
+        invalidate_snapshot()
+
+    return list(changed.values()), rejected
+
+
+def _validate_progress_updates(updates, readings):
+    """
+    Validate 'updates' in order against 'readings' (by id), moving them forward in memory.
+    Return the new ReadingUpdates, the rejected updates, and the Readings changed (by id).
+    """
+    new_updates, rejected, changed = [], [], {}
+    now = timezone.now()
+    for index, update in enumerate(updates):
+        reading = readings.get(update.get("reading"))
+        if reading is None:
+            rejected.append({"index": index, "error": "Unknown reading"})
+            continue
+
+        try:
+            new_pages = _pages_of(update, reading.edition.pages)
+            date = parse_datetime(update["date"]) if update.get("date") else now
+        except (TypeError, ValueError):
+            rejected.append({"index": index, "error": "Invalid pages, percent or date"})
+            continue
+
+        if date is None:
+            rejected.append({"index": index, "error": "Invalid date"})
+            continue
+
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+
+        if not (reading.latest_date or date) <= date <= now:
+            rejected.append({"index": index, "error": "Date must be after the latest update"
+                             " and not in the future"})
+            continue
+
+        if not reading.current_page < new_pages <= reading.edition.pages:
+            rejected.append({"index": index, "error": "Progress must go forward"})
+            continue
+
+        reading.current_page, reading.latest_date = new_pages, date
+        new_updates.append(ReadingUpdate(reading=reading, page=new_pages, date=date))
+        changed[reading.id] = reading
+
+    return new_updates, rejected, changed
+
+
+def _pages_of(update, max_pages):
+    """Pages read according to 'update' dict (with "pages" and/or "percent")."""
+
+    pages = int(update.get("pages") or 0)
+    percent = update.get("percent")
+    if percent is not None and float(percent) <= 100:
+        pages = max(pages, int(float(percent) * max_pages / 100))
+
+    return pages
@@ -0,0 +1,150 @@
+"""
+Request-scoped snapshot of the library of the logged-in user: their Readings (with latest
+progress) and owned Editions. It is loaded lazily, at most once per request (unless
+invalidated by a write), so that model helpers like Book.is_owned_by() or
+Reading.page_progress don't hit the database once per object rendered.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.readings.lib.custom_definitions import ReadingStatus
+
+
+_current_snapshot = ContextVar("library_snapshot", default=None)
+
+
+class LibrarySnapshot:
+    """What a User reads, has read and owns. Loaded on first use."""
+
+    def __init__(self, get_user):
+        self._get_user = get_user
+        self._loaded = False
+        self._latest_pages = {}
+        self._read_books = set()
+        self._reading_books = set()
+        self._owned_books = set()
+        self._owned_editions = set()
+
+    @property
+    def user(self):
+        return self._get_user()
+
+    def is_for(self, user):
+        """Whether self is the snapshot of 'user' (a User, or a User id)."""
+
+        user_id = getattr(user, "pk", user)
+        me = self.user
+
+        return me.is_authenticated and user_id is not None and user_id == me.pk
+
+    def has_read(self, book_id):
+        self._load()
+        return book_id in self._read_books
+
+    def is_reading(self, book_id):
+        self._load()
+        return book_id in self._reading_books
+
+    def owns_book(self, book_id):
+        self._load()
+        return book_id in self._owned_books
+
+    def owns_edition(self, edition_id):
+        self._load()
+        return edition_id in self._owned_editions
+
+    def page_progress(self, reading_id):
+        """Latest page read in Reading, or None if not a Reading of user."""
+
+        self._load()
+        return self._latest_pages.get(reading_id)
+
+    def invalidate(self):
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+
+        Reading = apps.get_model("readings", "Reading")
+        ReadingUpdate = apps.get_model("readings", "ReadingUpdate")
+        BookCopy = apps.get_model("books", "BookCopy")
+
+        latest_page = ReadingUpdate.objects.filter(reading=OuterRef("id")).order_by("-date")
+        readings = Reading.objects.filter(reader=self.user).annotate(
+            latest_page=Coalesce(Subquery(latest_page.values("page")[:1]), 0),
+        ).values_list("id", "edition__book_id", "status", "end", "latest_page")
+
+        self._latest_pages = {}
+        self._read_books = set()
+        self._reading_books = set()
+        for reading_id, book_id, status, end, latest_page in readings:
+            self._latest_pages[reading_id] = latest_page
+            if status == ReadingStatus.COMPLETED:
+                self._read_books.add(book_id)
+            if end is None:
+                self._reading_books.add(book_id)
+
+        copies = BookCopy.objects.filter(owner=self.user).values_list("edition_id",
+                                                                      "edition__book_id")
+        self._owned_editions = {edition_id for edition_id, _ in copies}
+        self._owned_books = {book_id for _, book_id in copies}
+
+        self._loaded = True
+
+
+def current_snapshot():
+    """
+    LibrarySnapshot active in current request (or library_snapshot() block), if any
+    and if it belongs to an authenticated user. None otherwise.
+    """
+    snapshot = _current_snapshot.get()
+    if snapshot is not None and snapshot.user.is_authenticated:
+        return snapshot
+
+    return None
+
+
+def snapshot_for(user):
+    """Active LibrarySnapshot, if any and if it is that of 'user' (or User id). None otherwise."""
+
+    snapshot = _current_snapshot.get()
+    if snapshot is not None and snapshot.is_for(user):
+        return snapshot
+
+    return None
+
+
+def invalidate_snapshot():
+    """Force active LibrarySnapshot, if any, to reload on next use. Call after writes."""
+
+    snapshot = _current_snapshot.get()
+    if snapshot is not None:
+        snapshot.invalidate()
+
+
+@contextmanager
+def library_snapshot(user):
+    """Make a LibrarySnapshot of 'user' (a User, or a callable returning one) active."""
+
+    get_user = user if callable(user) else (lambda: user)
+    token = _current_snapshot.set(LibrarySnapshot(get_user))
+    try:
+        yield _current_snapshot.get()
+    finally:
+        _current_snapshot.reset(token)
+
+
+class LibrarySnapshotMiddleware:
+    """Make a LibrarySnapshot of request.user active during each request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with library_snapshot(lambda: request.user):
+            return self.get_response(request)
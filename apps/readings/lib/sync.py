@@ -0,0 +1,179 @@
+"""
+Delta sync: which Readings, ReadingUpdates, Editions and BookCopies of a user were saved
+or deleted since a sync token. Writes are logged as SyncChange rows by signals (see
+apps/books/signals.py), and a token encodes the id of the last SyncChange a client saw, and
+when. Ids are taken before commit, so a change can become visible after one with a greater
+id was sent: changes of the last SYNC_OVERLAP_SECONDS before a token are sent again.
+SyncChanges older than SYNC_RETENTION_DAYS are pruned, and tokens that old have expired.
+ReadingUpdates deleted along with their Reading have no tombstones: clients drop them with it.
+"""
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from apps.readings.models import SyncChange
+
+
+SYNCED_MODELS = {
+    "reading": "readings.Reading",
+    "readingupdate": "readings.ReadingUpdate",
+    "edition": "books.Edition",
+    "bookcopy": "books.BookCopy",
+}
+MAX_CHANGES = 1000
+TOKEN_PREFIX = "sync:"
+
+
+@dataclass
+class SyncDelta:
+    """Rows saved and ids deleted, per model name, and the token to ask from next time."""
+
+    token: str
+    saved: dict
+    deleted: dict
+    more: bool = False
+
+
+def record_change(instance, user_id, deleted=False):
+    """Log that 'instance' (of a model in SYNCED_MODELS) was saved, or deleted."""
+
+    SyncChange.objects.create(
+        user_id=user_id,
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        deleted=deleted,
+    )
+
+
+def record_changes(instances, user_id, deleted=False):
+    """Log that 'instances' were saved (or deleted), in a single query. For bulk writes."""
+
+    SyncChange.objects.bulk_create(
+        SyncChange(user_id=user_id, model=instance._meta.model_name, object_id=instance.pk,
+                   deleted=deleted)
+        for instance in instances
+    )
+
+
+def changes_since(user, token=None, limit=MAX_CHANGES):
+    """
+    SyncDelta of 'user' since 'token', of at most 'limit' changes (if there are more,
+    'more' is True and the client should ask again right away). If no token, return all
+    rows of user, to start from. Raise ValueError if token is not valid, or has expired.
+    """
+    if token is None:
+        return _everything(user)
+
+    last_id, synced_at = decode_token(token)
+    now = timezone.now()
+    if synced_at < now - timedelta(days=settings.SYNC_RETENTION_DAYS):
+        raise ValueError(f"Expired sync token: {token}")
+
+    changes = SyncChange.objects.filter(_changes_of(user)).values_list("id", "model", "object_id")
+    entries = list(changes.filter(id__gt=last_id).order_by("id")[:limit + 1])
+    more = len(entries) > limit
+    entries = entries[:limit]
+
+    if settings.SYNC_OVERLAP_SECONDS:
+        overlap = synced_at - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+        entries += changes.filter(id__lte=last_id, date__gte=overlap)
+
+    changed = {name: set() for name in SYNCED_MODELS}
+    for _, model, object_id in entries:
+        changed[model].add(object_id)
+
+    saved, deleted = {}, {}
+    for name, object_ids in changed.items():
+        rows = list(_rows_of(name, user).filter(pk__in=object_ids)) if object_ids else []
+        saved[name] = rows
+        deleted[name] = sorted(object_ids - {row.pk for row in rows})
+
+    last_id = max([last_id, *(entry[0] for entry in entries)])
+
+    return SyncDelta(encode_token(last_id, now), saved, deleted, more)
+
+
+def prune_changes():
+    """Delete SyncChanges older than SYNC_RETENTION_DAYS. Return how many were deleted."""
+
+    horizon = timezone.now() - timedelta(days=settings.SYNC_RETENTION_DAYS)
+    deleted, _ = SyncChange.objects.filter(date__lt=horizon).delete()
+
+    return deleted
+
+
+def encode_token(change_id, synced_at):
+    """Sync token for SyncChanges after 'change_id', for a sync at 'synced_at'."""
+
+    decoded = f"{TOKEN_PREFIX}{change_id}:{int(synced_at.timestamp())}"
+
+    return base64.urlsafe_b64encode(decoded.encode()).decode()
+
+
+def decode_token(token):
+    """
+    Id of last SyncChange seen, and time of the sync, from sync 'token'. Raise ValueError
+    if not valid.
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(token.encode()).decode()
+        change_id, timestamp = map(int, decoded.removeprefix(TOKEN_PREFIX).split(":"))
+        synced_at = datetime.fromtimestamp(timestamp, dt_timezone.utc)
+    except (binascii.Error, UnicodeError, ValueError, OverflowError, OSError):
+        raise ValueError(f"Invalid sync token: {token}")
+
+    if not decoded.startswith(TOKEN_PREFIX):
+        raise ValueError(f"Invalid sync token: {token}")
+
+    return change_id, synced_at
+
+
+def _everything(user):
+    """SyncDelta with all rows of 'user', and the token of the latest change."""
+
+    # Take the token first: changes made while reading rows will be sent (again) next time.
+    now = timezone.now()
+    last_id = SyncChange.objects.aggregate(last=Max("id"))["last"] or 0
+    saved = {name: list(_rows_of(name, user)) for name in SYNCED_MODELS}
+
+    return SyncDelta(encode_token(last_id, now), saved, {name: [] for name in SYNCED_MODELS})
+
+
+def _rows_of(name, user):
+    """QuerySet of rows of model 'name' belonging to 'user'."""
+
+    model = apps.get_model(SYNCED_MODELS[name])
+
+    if name == "reading":
+        return model.objects.filter(reader=user)
+
+    if name == "readingupdate":
+        return model.objects.filter(reading__reader=user)
+
+    if name == "bookcopy":
+        return model.objects.filter(owner=user)
+
+    return model.objects.filter(pk__in=edition_ids_of(user))
+
+
+def edition_ids_of(user):
+    """Subquery of ids of Editions user reads or owns."""
+
+    Reading = apps.get_model(SYNCED_MODELS["reading"])
+    BookCopy = apps.get_model(SYNCED_MODELS["bookcopy"])
+
+    return Reading.objects.filter(reader=user).values("edition_id").union(
+        BookCopy.objects.filter(owner=user).values("edition_id")
+    )
+
+
+def _changes_of(user):
+    """Q for SyncChanges relevant to 'user': their own, and those of Editions they have."""
+
+    return Q(user=user) | Q(user=None, model="edition", object_id__in=edition_ids_of(user))
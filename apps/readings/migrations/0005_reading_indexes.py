@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0026_yearlyreadingstats'),
+        ('readings', '0004_reading_current_page'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reading',
+            index=models.Index(fields=['reader', 'start'], name='reading_reader_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='readingupdate',
+            index=models.Index(fields=['reading', 'date'], name='readingupdate_reading_date_idx'),
+        ),
+    ]
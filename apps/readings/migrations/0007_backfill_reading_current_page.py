@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_current_page(apps, schema_editor):
+    """
+    Progress writes are now conditional on current_page, so it must be no less than the
+    latest ReadingUpdate (Readings older than the field have 0).
+    """
+    Reading = apps.get_model("readings", "Reading")
+    ReadingUpdate = apps.get_model("readings", "ReadingUpdate")
+
+    max_page = ReadingUpdate.objects.filter(reading=OuterRef("pk")).values("reading").annotate(
+        max_page=Max("page"),
+    ).values("max_page")
+
+    Reading.objects.update(current_page=Coalesce(Subquery(max_page), "current_page"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0006_syncchange'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_current_page, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0007_backfill_reading_current_page'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='readingupdate',
+            index=models.Index(fields=['date', 'id'], name='readingupdate_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('readings', '0008_readingupdate_date_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['date'], name='syncchange_date_idx'),
+        ),
+    ]
@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
 from apps.readings.lib.custom_definitions import ReadingStatus
+from apps.readings.lib.snapshot import snapshot_for
 
 
 EditionType = "books.Edition"
@@ -27,9 +28,32 @@ class Reading(models.Model):
 
     class Meta:
         db_table = "books_reading"
+        indexes = [
+            models.Index(fields=["reader", "start"], name="reading_reader_start_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_state = instance.state_key  # to detect changes in post_save handlers
+
+        return instance
+
+    @property
+    def state_key(self):
+        """What Book the Reading is of, and how and when it ended. Used to detect changes."""
+
+        return tuple(self.__dict__.get(name) for name in ("edition_id", "status", "end"))
 
     @property
     def page_progress(self):
+        if "latest_page" in self.__dict__:  # annotated by ReadingBaseSerializer eager loading
+            return self.latest_page
+
+        snapshot = snapshot_for(self.reader_id)
+        if snapshot is not None and (page := snapshot.page_progress(self.pk)) is not None:
+            return page
+
         latest_update = ReadingUpdate.objects.filter(reading=self).order_by("date").last()
 
         return getattr(latest_update, "page", 0)
@@ -37,12 +61,14 @@ class Reading(models.Model):
     def mark_read(self):
         self.end = timezone.now()
         self.status = ReadingStatus.COMPLETED
-        self.save()
+        with transaction.atomic():  # together with rollups updated by signals
+            self.save(update_fields=["end", "status"])
 
     def mark_dnf(self):
         self.end = timezone.now()
         self.status = ReadingStatus.DNF
-        self.save()
+        with transaction.atomic():  # together with rollups updated by signals
+            self.save(update_fields=["end", "status"])
 
     def __str__(self):
         if self.end is None:
@@ -60,6 +86,36 @@ class ReadingUpdate(models.Model):
 
     class Meta:
         db_table = "books_readingupdate"
+        indexes = [
+            models.Index(fields=["reading", "date"], name="readingupdate_reading_date_idx"),
+            models.Index(fields=["date", "id"], name="readingupdate_date_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.page} pages on {self.reading} at {self.date}"
+
+
+class SyncChange(models.Model):
+    """
+    Log entry for a Reading, ReadingUpdate, Edition or BookCopy that was saved or deleted
+    (a tombstone). Clients sync by asking for the entries after the last one they saw.
+    Entries with no user are of the catalog (Editions), relevant to all users.
+    """
+    user = models.ForeignKey(User, blank=True, null=True, on_delete=models.CASCADE)
+    model = models.CharField("Model", max_length=20)
+    object_id = models.PositiveIntegerField("Object id")
+    deleted = models.BooleanField("Deleted", default=False)
+    date = models.DateTimeField("Date", default=timezone.now)
+
+    objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="syncchange_user_id_idx"),
+            models.Index(fields=["date"], name="syncchange_date_idx"),
+        ]
+
+    def __str__(self):
+        action = "deleted" if self.deleted else "saved"
+
+        return f"{self.model} {self.object_id} {action} at {self.date}"
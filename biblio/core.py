@@ -1,21 +1,42 @@
 import time
 
-from django.db.models import FloatField
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, FloatField, Q
 from django.db.models.functions import Cast
 
 from .models import UserPreferences
 
 
+CATALOG_VERSION_KEY = "catalog-version"
+
+
 def save_user_preferences(data, user):
-    try:
-        prefs = UserPreferences.objects.get(user=user)
-    except UserPreferences.DoesNotExist:  # create new, if it doesn't exist
-        prefs = UserPreferences()
+    # There is one per user and year (see UserPreferences): update it, or create it.
+    UserPreferences.objects.update_or_create(
+        user=user,
+        year=data.get("year"),
+        defaults={
+            "books_per_year": data["books_per_year"],
+            "pages_per_year": data["pages_per_year"],
+        },
+    )
+
+
+def user_preferences_by_year(user):
+    """
+    Return {year: UserPreferences} for user. Preferences for all years
+    (the default ones) come under year None.
+    """
+    return {prefs.year: prefs for prefs in UserPreferences.objects.filter(user=user)}
+
+
+def user_preferences_for(user, year):
+    """UserPreferences of user for 'year', or default ones. None if user has neither."""
 
-    prefs.user = user
-    prefs.books_per_year = data["books_per_year"]
-    prefs.pages_per_year = data["pages_per_year"]
-    prefs.save()
+    prefs = UserPreferences.objects.filter(user=user).filter(Q(year=year) | Q(year=None))
+
+    return prefs.order_by(F("year").asc(nulls_last=True)).first()
 
 
 def as_float(x):
@@ -39,3 +60,54 @@ class TicToc:
     @staticmethod
     def _now():
         return time.time()
+
+
+def data_version(user_id):
+    """
+    Current version of the reading data of user with id 'user_id'. Include it in cache
+    keys of anything derived from that data, so that bump_data_version() invalidates them.
+    """
+    return cache.get_or_set(_data_version_key(user_id), time.time_ns, timeout=None)
+
+
+def bump_data_version(*user_ids):
+    """
+    Invalidate everything cached from the reading data of given users. Inside a transaction,
+    bump again on commit: other requests could cache uncommitted figures in between.
+    """
+    def bump():
+        version = time.time_ns()  # never reused, even if the cache is flushed
+        cache.set_many({_data_version_key(user_id): version for user_id in user_ids},
+                       timeout=None)
+
+    _now_and_on_commit(bump)
+
+
+def catalog_version():
+    """
+    Current version of the catalog (Books, Authors and Sagas), shared by all users. Like
+    data_version(), but bumped by bump_catalog_version().
+    """
+    return cache.get_or_set(CATALOG_VERSION_KEY, time.time_ns, timeout=None)
+
+
+def bump_catalog_version():
+    """Invalidate everything cached from the catalog. Like bump_data_version()."""
+
+    _now_and_on_commit(lambda: cache.set(CATALOG_VERSION_KEY, time.time_ns(), timeout=None))
+
+
+def _now_and_on_commit(bump):
+    """
+    Call 'bump' now, so that the writing request itself doesn't read stale cached data,
+    and again on commit, if in a transaction (outside one, on_commit() calls it right away).
+    """
+    bump()
+
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def _data_version_key(user_id):
+    return f"data-version:{user_id}"
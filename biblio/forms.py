@@ -9,7 +9,7 @@ class UserPreferencesForm(forms.ModelForm):
 
     class Meta:
         model = UserPreferences
-        fields = ["books_per_year", "pages_per_year"]
+        fields = ["books_per_year", "pages_per_year", "year"]
 
     def save(self, pk):
         data = self.cleaned_data
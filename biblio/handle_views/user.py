@@ -6,7 +6,7 @@ from biblio.forms import UserPreferencesForm
 
 def handle_user_get(request):
     initial = {}
-    prefs = UserPreferences.objects.filter(user=request.user).first()  # there should be 1 or 0
+    prefs = UserPreferences.objects.filter(user=request.user, year=None).first()  # 1 or 0
     if prefs is not None:
         initial = {
             "books_per_year": prefs.books_per_year,
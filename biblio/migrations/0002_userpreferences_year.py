@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userpreferences',
+            name='year',
+            field=models.IntegerField(blank=True, default=None, null=True, verbose_name='Year (empty for all years)'),
+        ),
+    ]
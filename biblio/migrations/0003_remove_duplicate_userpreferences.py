@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:08
+
+from django.db import migrations
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep the latest saved UserPreferences of each user and year (or default ones)."""
+
+    UserPreferences = apps.get_model("biblio", "UserPreferences")
+
+    seen, duplicates = set(), []
+    for pk, user_id, year in UserPreferences.objects.order_by("-id").values_list(
+        "id", "user_id", "year",
+    ).iterator():
+        if (user_id, year) in seen:
+            duplicates.append(pk)
+        seen.add((user_id, year))
+
+    UserPreferences.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblio', '0002_userpreferences_year'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblio', '0003_remove_duplicate_userpreferences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='userpreferences',
+            constraint=models.UniqueConstraint(fields=('user', 'year'), name='unique_preferences_per_year'),
+        ),
+        migrations.AddConstraint(
+            model_name='userpreferences',
+            constraint=models.UniqueConstraint(condition=models.Q(('year', None)), fields=('user',), name='unique_default_preferences'),
+        ),
+    ]
@@ -6,6 +6,18 @@ class UserPreferences(models.Model):
     user = models.ForeignKey(User, blank=False, on_delete=models.CASCADE, default=1)
     books_per_year = models.IntegerField("Books per year", default=1)
     pages_per_year = models.IntegerField("Pages per year", default=100)
+    year = models.IntegerField("Year (empty for all years)", blank=True, default=None, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "year"], name="unique_preferences_per_year"),
+            # NULLs are distinct in the one above, so default ones need a constraint of their own:
+            models.UniqueConstraint(fields=["user"], condition=models.Q(year=None),
+                                    name="unique_default_preferences"),
+        ]
 
     def __str__(self):
-        return f"{self.user}"
+        if self.year is None:
+            return f"{self.user}"
+
+        return f"{self.user} ({self.year})"
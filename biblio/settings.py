@@ -1,5 +1,6 @@
 import os
 import json
+import tempfile
 from pathlib import Path
 
 
@@ -61,6 +62,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.readings.lib.snapshot.LibrarySnapshotMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "django_components.middleware.ComponentDependencyMiddleware",
@@ -126,6 +128,38 @@ else:
     DATABASES["default"] = AVAILABLE_DATABASES["heroku"]
     DATABASES['default'].update(db_from_env)
 
+# Cache. It must be shared by all worker processes, as it holds per-user data versions.
+# A file based one is only shared within a host, so it is not an option for Heroku, where
+# "CACHE" should be configured (e.g. Redis or Memcached). Failing that, the database is
+# shared by all hosts: its cache table is created with "python -m manage createcachetable".
+if conf.get("CACHE"):
+    CACHES = {"default": conf["CACHE"]}
+elif conf.get("WHICH_DB"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(tempfile.gettempdir(), f"{PROJECT_NAME}-cache"),
+            # The default (300) is easily reached, and culling drops data versions too:
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": f"{PROJECT_NAME}_cache",
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        },
+    }
+
+# Progress updates of a Reading closer in time than this are coalesced into one (0: never):
+READING_UPDATE_COALESCE_MINUTES = conf.get("READING_UPDATE_COALESCE_MINUTES", 5)
+
+# Sync changes this recent are sent again, in case an earlier one committed late:
+SYNC_OVERLAP_SECONDS = conf.get("SYNC_OVERLAP_SECONDS", 60)
+# Sync changes older than this are pruned, and tokens this old have expired:
+SYNC_RETENTION_DAYS = conf.get("SYNC_RETENTION_DAYS", 90)
+
 # Password validation:
 AUTH_PASSWORD_VALIDATORS = [
     {